@@ -1,83 +1,231 @@
-from io import BytesIO
-from flask import Flask, render_template, request, send_file, jsonify, session, redirect, url_for
-import pandas as pd
-import openpyxl
-from openpyxl.utils import get_column_letter
-from datetime import datetime
+from flask import Flask, Response, render_template, request, send_file, jsonify, session, redirect, url_for
+from datetime import datetime, timezone
+import hashlib
 import os
 import secrets
 import sqlite3
+import threading
+import time
+
+from con_a_export import ExportJobQueue, ExportQueueFull
+from con_a_session import DownloadCache, create_session_backend
+from con_a_source import (
+    source_cache, ensure_source_watcher, build_selector_index, DAEGA_COLUMNS, JIPGYE_COLUMNS,
+)
+from tabular_export import EXPORT_FORMATS, ExportUnavailable, iter_export, parquet_available
+from xlsx_stream import XLSX_MIMETYPE, attachment_headers, iter_xlsx
 
 app = Flask(__name__)
+
+
+def _data_dir():
+    """실행 중 생성되는 파일(SQLite 등) 저장 위치"""
+    # Vercel serverless 환경에서는 /tmp 디렉토리 사용
+    if os.environ.get('VERCEL'):
+        return '/tmp'
+    instance_dir = os.path.join(app.root_path, "instance")
+    os.makedirs(instance_dir, exist_ok=True)
+    return instance_dir
+
+
+def _load_secret_key():
+    """
+    시크릿 키 (환경 변수 → instance/secret_key 파일 → 랜덤 생성)
+    여러 워커가 같은 세션 쿠키를 읽을 수 있도록 생성한 키는 파일로 공유한다.
+    """
+    key = os.environ.get('SECRET_KEY')
+    if key:
+        return key
+    if os.environ.get('VERCEL'):
+        return secrets.token_hex(16)
+
+    key_path = os.path.join(_data_dir(), "secret_key")
+    try:
+        # 먼저 만든 프로세스의 키를 모두가 쓰도록 O_EXCL 로 한 번만 생성
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(key_path) as f:
+            key = f.read().strip()
+        if key:
+            return key
+        # 다른 프로세스가 아직 쓰는 중이면 잠시 후 다시 읽음
+        time.sleep(0.1)
+        with open(key_path) as f:
+            return f.read().strip() or secrets.token_hex(16)
+    key = secrets.token_hex(16)
+    with os.fdopen(fd, "w") as f:
+        f.write(key)
+    return key
+
+
 # Vercel 배포를 위한 시크릿 키 (환경 변수 또는 랜덤 생성)
-app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(16))
+app.secret_key = _load_secret_key()
+
+# 생성된 결과 저장소 (세션별)
+# 세션 ID를 키로 사용하여 각 사용자별로 독립적인 결과(대가/집계 행 목록) 관리
+# CONA_SESSION_BACKEND=memory (기본): 프로세스 메모리, 오래 쓰지 않은 세션부터 정리
+# CONA_SESSION_BACKEND=sqlite: 로컬 SQLite 파일 공유 (gunicorn 워커 여러 개)
+session_backend = create_session_backend(os.path.join(_data_dir(), "cona_sessions.db"))
 
-# 전역 변수: 생성된 엑셀 워크북 저장 (세션별)
-# 세션 ID를 키로 사용하여 각 사용자별로 독립적인 워크북 관리
-workbooks = {}
+# (세션 ID, 세션 epoch + 버전, 형식) 별로 생성된 다운로드 파일 캐시
+# 세션이 정리되면 그 세션의 캐시도 함께 삭제
+download_cache = DownloadCache()
+session_backend.set_evict_listener(download_cache.discard_session)
+
+# 큰 결과 파일을 요청 밖에서 만드는 내보내기 작업 큐 (결과는 cona_exports 디렉터리, 보관 기간/저장 한도 적용)
+export_queue = ExportJobQueue(os.path.join(_data_dir(), "cona_exports"))
+
+# 시작 시 원본 엑셀 스냅샷 준비 (저장된 스냅샷의 해시가 같으면 파싱 없이 로드)
+# 원본 파일이 바뀌면 감시 스레드가 선택 번호 인덱스까지 미리 만든 뒤 교체 (요청은 이전 버전으로 응답)
+source_cache.register_prewarm("selector_index", build_selector_index)
+source_cache.warm()
+
+
+@app.before_request
+def _ensure_source_watcher():
+    # 감시 스레드는 import 시점이 아니라 프로세스(워커)마다 첫 요청에서 시작
+    ensure_source_watcher(source_cache.path)
 
 #############################################
 # QUAZ 갤러리 (간단 게시판) - SQLite 기반
 #############################################
 
 def _quaz_db_path():
-    # Vercel serverless 환경에서는 /tmp 디렉토리 사용
-    if os.environ.get('VERCEL'):
-        db_dir = '/tmp'
-    else:
-        instance_dir = os.path.join(app.root_path, "instance")
-        os.makedirs(instance_dir, exist_ok=True)
-        db_dir = instance_dir
-    return os.path.join(db_dir, "quaz_gallery.db")
+    return os.path.join(_data_dir(), "quaz_gallery.db")
+
+
+# 연결 설정 (처음 연결할 때 한 번만 적용)
+QUAZ_BUSY_TIMEOUT_MS = 5000
+QUAZ_MMAP_SIZE = 64 * 1024 * 1024
+QUAZ_CACHE_KIB = 8 * 1024
+QUAZ_CACHED_STATEMENTS = 128
+
+# 스레드(및 프로세스)마다 연결 하나씩 재사용 (요청마다 connect/close 하지 않음)
+_quaz_local = threading.local()
 
 
 def quaz_get_db():
-    conn = sqlite3.connect(_quaz_db_path())
+    """
+    현재 스레드의 QUAZ 연결
+    WAL 모드라 댓글이 몰려 쓰기가 이어져도 목록/상세 읽기는 기다리지 않는다.
+    같은 SQL 은 sqlite3 문장 캐시(cached_statements)로 다시 준비하지 않는다.
+    """
+    path = _quaz_db_path()
+    conn = getattr(_quaz_local, "conn", None)
+    if conn is not None and _quaz_local.pid == os.getpid() and _quaz_local.path == path:
+        return conn
+    conn = sqlite3.connect(
+        path, timeout=QUAZ_BUSY_TIMEOUT_MS / 1000, cached_statements=QUAZ_CACHED_STATEMENTS,
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {QUAZ_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA mmap_size = {QUAZ_MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size = -{QUAZ_CACHE_KIB}")
+    # 스키마 준비는 요청마다가 아니라 프로세스에서 처음 연결할 때 한 번만 (QUAZ 경로만 DB 를 연다)
+    _quaz_ensure_schema(conn, path)
+    _quaz_local.conn = conn
+    _quaz_local.pid = os.getpid()
+    _quaz_local.path = path
     return conn
 
 
-def quaz_init_db():
-    conn = quaz_get_db()
-    try:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS posts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                media_url TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT,
-                views INTEGER NOT NULL DEFAULT 0
-            )
-            """
+@app.teardown_request
+def _quaz_release_db(exc):
+    # 요청이 중간에 실패해 커밋되지 않은 트랜잭션이 다음 요청으로 넘어가지 않도록 되돌림 (연결은 유지)
+    conn = getattr(_quaz_local, "conn", None)
+    if conn is not None and _quaz_local.pid == os.getpid() and conn.in_transaction:
+        conn.rollback()
+
+
+# 순서대로 적용할 QUAZ 스키마 변경 단계 (버전 = 목록 위치 + 1)
+# 이미 배포된 단계는 고치지 말고 새 단계를 뒤에 추가한다.
+# 1단계는 schema_version 이 생기기 전에 만든 DB 에도 적용되도록 IF NOT EXISTS 를 쓴다.
+QUAZ_MIGRATIONS = (
+    ("게시물/댓글 테이블", (
+        """
+        CREATE TABLE IF NOT EXISTS posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            media_url TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            views INTEGER NOT NULL DEFAULT 0
         )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS comments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                post_id INTEGER NOT NULL,
-                parent_id INTEGER,
-                author TEXT,
-                content TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY(post_id) REFERENCES posts(id)
-            )
-            """
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id INTEGER NOT NULL,
+            parent_id INTEGER,
+            author TEXT,
+            content TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(post_id) REFERENCES posts(id)
         )
+        """,
+    )),
+    ("게시물별 댓글 조회 인덱스", (
+        "CREATE INDEX IF NOT EXISTS idx_comments_post ON comments(post_id)",
+    )),
+)
+
+
+def quaz_migrate(conn):
+    """
+    schema_version 에 기록된 버전 다음 단계부터 적용하고 현재 버전 반환
+    BEGIN IMMEDIATE 로 쓰기 잠금을 먼저 잡으므로 여러 워커가 동시에 시작해도 한 번씩만 적용된다.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.commit()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+        for version, (description, statements) in enumerate(QUAZ_MIGRATIONS, start=1):
+            if version <= current:
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version(version, description, applied_at) VALUES(?,?,?)",
+                (version, description, _now_iso()),
+            )
+            current = version
         conn.commit()
-    finally:
-        conn.close()
+    except Exception:
+        conn.rollback()
+        raise
+    return current
 
 
-def _now_iso():
-    return datetime.now().isoformat(timespec="seconds")
+# 스키마를 확인한 (프로세스 ID, DB 경로) - 프로세스마다 처음 연결할 때 한 번만 quaz_migrate
+_quaz_schema_lock = threading.Lock()
+_quaz_schema_ready = set()
 
 
-@app.before_request
-def _ensure_quaz_db():
-    quaz_init_db()
+def _quaz_ensure_schema(conn, path):
+    key = (os.getpid(), path)
+    if key in _quaz_schema_ready:
+        return
+    with _quaz_schema_lock:
+        if key not in _quaz_schema_ready:
+            quaz_migrate(conn)
+            _quaz_schema_ready.add(key)
+
+
+def _now_iso():
+    return datetime.now().isoformat(timespec="seconds")
 
 
 @app.route("/", methods=["GET"])
@@ -85,28 +233,25 @@ def quaz_index():
     """QUAZ 갤러리 - 게시물 목록 (최신글 내림차순)"""
     q = (request.args.get("q") or "").strip()
     conn = quaz_get_db()
-    try:
-        if q:
-            like = f"%{q}%"
-            posts = conn.execute(
-                """
-                SELECT id, title, created_at, views
-                FROM posts
-                WHERE title LIKE ? OR content LIKE ?
-                ORDER BY datetime(created_at) DESC, id DESC
-                """,
-                (like, like),
-            ).fetchall()
-        else:
-            posts = conn.execute(
-                """
-                SELECT id, title, created_at, views
-                FROM posts
-                ORDER BY datetime(created_at) DESC, id DESC
-                """
-            ).fetchall()
-    finally:
-        conn.close()
+    if q:
+        like = f"%{q}%"
+        posts = conn.execute(
+            """
+            SELECT id, title, created_at, views
+            FROM posts
+            WHERE title LIKE ? OR content LIKE ?
+            ORDER BY datetime(created_at) DESC, id DESC
+            """,
+            (like, like),
+        ).fetchall()
+    else:
+        posts = conn.execute(
+            """
+            SELECT id, title, created_at, views
+            FROM posts
+            ORDER BY datetime(created_at) DESC, id DESC
+            """
+        ).fetchall()
     return render_template("quaz_index.html", posts=posts, q=q)
 
 
@@ -127,14 +272,11 @@ def quaz_write():
             )
 
         conn = quaz_get_db()
-        try:
-            conn.execute(
-                "INSERT INTO posts(title, content, media_url, created_at) VALUES(?,?,?,?)",
-                (title, content, media_url, _now_iso()),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        conn.execute(
+            "INSERT INTO posts(title, content, media_url, created_at) VALUES(?,?,?,?)",
+            (title, content, media_url, _now_iso()),
+        )
+        conn.commit()
 
         return redirect(url_for("quaz_index"))
 
@@ -145,25 +287,22 @@ def quaz_write():
 def quaz_post_detail(post_id: int):
     """게시물 상세 + 조회수 증가 + 댓글/대댓글"""
     conn = quaz_get_db()
-    try:
-        conn.execute("UPDATE posts SET views = views + 1 WHERE id = ?", (post_id,))
-        conn.commit()
-
-        post = conn.execute("SELECT * FROM posts WHERE id = ?", (post_id,)).fetchone()
-        if not post:
-            return "게시물을 찾을 수 없습니다.", 404
-
-        comments = conn.execute(
-            """
-            SELECT id, post_id, parent_id, author, content, created_at
-            FROM comments
-            WHERE post_id = ?
-            ORDER BY datetime(created_at) ASC, id ASC
-            """,
-            (post_id,),
-        ).fetchall()
-    finally:
-        conn.close()
+    conn.execute("UPDATE posts SET views = views + 1 WHERE id = ?", (post_id,))
+    conn.commit()
+
+    post = conn.execute("SELECT * FROM posts WHERE id = ?", (post_id,)).fetchone()
+    if not post:
+        return "게시물을 찾을 수 없습니다.", 404
+
+    comments = conn.execute(
+        """
+        SELECT id, post_id, parent_id, author, content, created_at
+        FROM comments
+        WHERE post_id = ?
+        ORDER BY datetime(created_at) ASC, id ASC
+        """,
+        (post_id,),
+    ).fetchall()
 
     by_parent = {}
     for c in comments:
@@ -190,14 +329,11 @@ def quaz_add_comment(post_id: int):
         return redirect(url_for("quaz_post_detail", post_id=post_id))
 
     conn = quaz_get_db()
-    try:
-        conn.execute(
-            "INSERT INTO comments(post_id, parent_id, author, content, created_at) VALUES(?,?,?,?,?)",
-            (post_id, parent_id, author, content, _now_iso()),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    conn.execute(
+        "INSERT INTO comments(post_id, parent_id, author, content, created_at) VALUES(?,?,?,?,?)",
+        (post_id, parent_id, author, content, _now_iso()),
+    )
+    conn.commit()
 
     return redirect(url_for("quaz_post_detail", post_id=post_id))
 
@@ -205,32 +341,29 @@ def quaz_add_comment(post_id: int):
 @app.route("/post/<int:post_id>/edit", methods=["GET", "POST"])
 def quaz_edit_post(post_id: int):
     conn = quaz_get_db()
-    try:
-        post = conn.execute("SELECT * FROM posts WHERE id = ?", (post_id,)).fetchone()
-        if not post:
-            return "게시물을 찾을 수 없습니다.", 404
-
-        if request.method == "POST":
-            title = (request.form.get("title") or "").strip()
-            content = (request.form.get("content") or "").strip()
-            media_url = (request.form.get("media_url") or "").strip() or None
-
-            if not title or not content:
-                return render_template(
-                    "quaz_form.html",
-                    mode="edit",
-                    error="제목과 내용을 입력해주세요.",
-                    post={"id": post_id, "title": title, "content": content, "media_url": media_url or ""},
-                )
+    post = conn.execute("SELECT * FROM posts WHERE id = ?", (post_id,)).fetchone()
+    if not post:
+        return "게시물을 찾을 수 없습니다.", 404
 
-            conn.execute(
-                "UPDATE posts SET title=?, content=?, media_url=?, updated_at=? WHERE id=?",
-                (title, content, media_url, _now_iso(), post_id),
+    if request.method == "POST":
+        title = (request.form.get("title") or "").strip()
+        content = (request.form.get("content") or "").strip()
+        media_url = (request.form.get("media_url") or "").strip() or None
+
+        if not title or not content:
+            return render_template(
+                "quaz_form.html",
+                mode="edit",
+                error="제목과 내용을 입력해주세요.",
+                post={"id": post_id, "title": title, "content": content, "media_url": media_url or ""},
             )
-            conn.commit()
-            return redirect(url_for("quaz_post_detail", post_id=post_id))
-    finally:
-        conn.close()
+
+        conn.execute(
+            "UPDATE posts SET title=?, content=?, media_url=?, updated_at=? WHERE id=?",
+            (title, content, media_url, _now_iso(), post_id),
+        )
+        conn.commit()
+        return redirect(url_for("quaz_post_detail", post_id=post_id))
 
     return render_template(
         "quaz_form.html",
@@ -242,12 +375,9 @@ def quaz_edit_post(post_id: int):
 @app.route("/post/<int:post_id>/delete", methods=["POST"])
 def quaz_delete_post(post_id: int):
     conn = quaz_get_db()
-    try:
-        conn.execute("DELETE FROM comments WHERE post_id = ?", (post_id,))
-        conn.execute("DELETE FROM posts WHERE id = ?", (post_id,))
-        conn.commit()
-    finally:
-        conn.close()
+    conn.execute("DELETE FROM comments WHERE post_id = ?", (post_id,))
+    conn.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+    conn.commit()
     return redirect(url_for("quaz_index"))
 
 
@@ -255,17 +385,14 @@ def quaz_delete_post(post_id: int):
 def quaz_trends():
     """요즘 트렌드 - 조회수 높은 게시물 목록"""
     conn = quaz_get_db()
-    try:
-        posts = conn.execute(
-            """
-            SELECT id, title, created_at, views
-            FROM posts
-            ORDER BY views DESC, datetime(created_at) DESC
-            LIMIT 50
-            """
-        ).fetchall()
-    finally:
-        conn.close()
+    posts = conn.execute(
+        """
+        SELECT id, title, created_at, views
+        FROM posts
+        ORDER BY views DESC, datetime(created_at) DESC
+        LIMIT 50
+        """
+    ).fetchall()
     return render_template("quaz_trends.html", posts=posts)
 
 
@@ -274,243 +401,112 @@ def quaz_admin():
     return render_template("quaz_admin.html")
 
 
-def get_or_create_workbook(session_id):
-    """세션별 워크북 가져오기 또는 생성"""
-    if session_id not in workbooks:
-        # 새 워크북 생성
-        wb = openpyxl.Workbook()
-        # 기본 시트 삭제
-        if 'Sheet' in wb.sheetnames:
-            wb.remove(wb['Sheet'])
-        workbooks[session_id] = wb
-    return workbooks[session_id]
+def read_data_from_excel(number_input, index=None):
+    """
+    CON-A DB1.xlsx에서 지정된 번호(또는 선택문자)에 해당하는 데이터를 읽어옴
 
+    집계 시트(첫 번째 시트)의 A열 번호 / B열 선택문자로 항목을 찾고,
+    - 대가 시트: 대가/참조 시트에서 같은 선택문자로 시작하는 블록 (예: A → 3~5번 줄, B → 7~9번 줄)
+    - 집계 시트: 집계 시트의 해당 행 (예: 1 → 4번 줄, 2 → 5번 줄)
 
-def read_data_from_excel(number_input):
+    index를 넘기지 않으면 원본 스냅샷의 선택 번호 인덱스(파일 버전마다 한 번 생성)를 사용한다.
     """
-    CON-A DB1.xlsx에서 지정된 번호(1 또는 2)에 해당하는 데이터를 읽어옴
-    
-    A의 정보(번호 1):
-    - 대가 시트: 대가 시트의 3, 4, 5번 줄
-    - 집계 시트: 대가 시트의 4번 줄
-    
-    B의 정보(번호 2):
-    - 대가 시트: 참조 시트의 7, 8, 9번 줄
-    - 집계 시트: 대가 시트의 5번 줄
-    """
-    excel_path = "data/CON-A DB1.xlsx"
-    
-    # openpyxl로 원본 파일 읽기
-    wb = openpyxl.load_workbook(excel_path, data_only=True)
-    
+    if index is None:
+        index = source_cache.selector_index()
+
     daega_data = []  # 대가 시트 데이터
     jipgye_data = []  # 집계 시트 데이터
-    
-    if number_input == '1':  # A의 정보
-        # 대가 시트 찾기
-        daega_sheet_name = None
-        for name in wb.sheetnames:
-            if '대가' in name:
-                daega_sheet_name = name
-                break
-        if daega_sheet_name is None:
-            daega_sheet_name = wb.sheetnames[0]  # 첫 번째 시트 사용
-        
-        # 대가 시트: 대가 시트의 3, 4, 5번 줄
-        if daega_sheet_name:
-            ws_daega = wb[daega_sheet_name]
-            for row_num in [3, 4, 5]:
-                row_data = {}
-                has_data = False
-                for col_idx in range(1, 12):  # A부터 K까지 (11개 컬럼)
-                    col_letter = get_column_letter(col_idx)
-                    cell = ws_daega.cell(row=row_num, column=col_idx)
-                    value = cell.value if cell.value is not None else ''
-                    row_data[col_letter] = value
-                    if value != '':
-                        has_data = True
-                if has_data:  # 데이터가 있는 행만 추가
-                    row_data['원본시트'] = daega_sheet_name
-                    row_data['원본행'] = row_num
-                    daega_data.append(row_data)
-        
-        # 집계 시트: 첫 번째 시트에서 A열=1, B열='A'인 행 찾기 (A의 정보)
-        # 사용자 요구사항: A,5,2.5,12.5,3,15,4,20.9.5,47.5
-        # 실제 Excel 데이터: 첫 번째 시트 Row 4 = [1, 'A', 5, 2.5, 12.5, 3, 15, 4, 20, 9.5, 47.5, None]
-        jipgye_sheet_name = wb.sheetnames[0]  # 첫 번째 시트 사용
-        ws_jipgye = wb[jipgye_sheet_name]
-        # 첫 번째 시트에서 A열=1, B열='A'인 행 찾기
-        target_row = None
-        for row_num in range(1, 15):
-            cell_a = ws_jipgye.cell(row=row_num, column=1)
-            cell_b = ws_jipgye.cell(row=row_num, column=2)
-            if cell_a.value == 1 and cell_b and str(cell_b.value).strip().upper() == 'A':
-                target_row = row_num
-                break
-        
-        # 찾지 못했으면 4번 줄 사용
-        if target_row is None:
-            target_row = 4
-        
-        row_data = {}
-        has_data = False
-        # A부터 L까지 (12개 컬럼) - 실제로는 A부터 K까지 데이터가 있음
-        for col_idx in range(1, 13):
-            col_letter = get_column_letter(col_idx)
-            cell = ws_jipgye.cell(row=target_row, column=col_idx)
-            value = cell.value if cell.value is not None else ''
-            row_data[col_letter] = value
-            if value != '':
-                has_data = True
-        if has_data:  # 데이터가 있는 경우만 추가
-            row_data['원본시트'] = jipgye_sheet_name
-            row_data['원본행'] = target_row
-            jipgye_data.append(row_data)
-    
-    elif number_input == '2':  # B의 정보
-        # 대가 시트: 참조 시트의 7, 8, 9번 줄
-        # 시트 이름 확인
-        sheet_name = None
-        for name in wb.sheetnames:
-            if '참조' in name:
-                sheet_name = name
-                break
-        
-        if sheet_name is None and len(wb.sheetnames) > 1:
-            # 두 번째 시트가 참조 시트일 가능성
-            sheet_name = wb.sheetnames[1]
-        
-        if sheet_name:
-            ws_daega = wb[sheet_name]
-            for row_num in [7, 8, 9]:
-                row_data = {}
-                has_data = False
-                for col_idx in range(1, 12):  # A부터 K까지
-                    col_letter = get_column_letter(col_idx)
-                    cell = ws_daega.cell(row=row_num, column=col_idx)
-                    value = cell.value if cell.value is not None else ''
-                    row_data[col_letter] = value
-                    if value != '':
-                        has_data = True
-                if has_data:  # 데이터가 있는 행만 추가
-                    row_data['원본시트'] = sheet_name
-                    row_data['원본행'] = row_num
-                    daega_data.append(row_data)
-        
-        # 집계 시트: 첫 번째 시트에서 A열=2, B열='B'인 행 찾기 (B의 정보)
-        # 사용자 요구사항: B,10,21,210,4.5,45,11,110,36.5,365
-        # 실제 Excel 데이터: 첫 번째 시트 Row 5 = [2, 'B', 10, 21, 210, 4.5, 45, 11, 110, 36.5, 365, None]
-        jipgye_sheet_name = wb.sheetnames[0]  # 첫 번째 시트 사용
-        ws_jipgye = wb[jipgye_sheet_name]
-        # 첫 번째 시트에서 A열=2, B열='B'인 행 찾기
-        target_row = None
-        for row_num in range(1, 15):
-            cell_a = ws_jipgye.cell(row=row_num, column=1)
-            cell_b = ws_jipgye.cell(row=row_num, column=2)
-            if cell_a.value == 2 and cell_b and str(cell_b.value).strip().upper() == 'B':
-                target_row = row_num
-                break
-        
-        # 찾지 못했으면 5번 줄 사용
-        if target_row is None:
-            target_row = 5
-        
-        row_data = {}
-        has_data = False
-        # A부터 L까지 (12개 컬럼) - 실제로는 A부터 K까지 데이터가 있음
-        for col_idx in range(1, 13):
-            col_letter = get_column_letter(col_idx)
-            cell = ws_jipgye.cell(row=target_row, column=col_idx)
-            value = cell.value if cell.value is not None else ''
-            row_data[col_letter] = value
-            if value != '':
-                has_data = True
-        if has_data:  # 데이터가 있는 경우만 추가
-            row_data['원본시트'] = jipgye_sheet_name
-            row_data['원본행'] = target_row
-            jipgye_data.append(row_data)
-    
+
+    entry = index.resolve(number_input)
+    if entry is None:
+        return daega_data, jipgye_data
+
+    for row_num, values in entry.daega_rows:
+        row_data = dict(zip(DAEGA_COLUMNS, values))
+        row_data['원본시트'] = entry.daega_sheet
+        row_data['원본행'] = row_num
+        daega_data.append(row_data)
+
+    if any(v != '' for v in entry.jipgye_values):  # 데이터가 있는 경우만 추가
+        row_data = dict(zip(JIPGYE_COLUMNS, entry.jipgye_values))
+        row_data['원본시트'] = entry.jipgye_sheet
+        row_data['원본행'] = entry.jipgye_row
+        jipgye_data.append(row_data)
+
     return daega_data, jipgye_data
 
 
-def create_daega_sheet(wb, data_list, sheet_name="대가"):
-    """대가 시트 생성 또는 기존 시트에 데이터 추가"""
-    if sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        # 기존 데이터의 마지막 행 찾기 (헤더가 있으면 그 다음부터)
-        if ws.max_row > 0:
-            start_row = ws.max_row + 1
-        else:
-            start_row = 2  # 헤더 행 다음
-            # 헤더 작성
-            headers = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
-            for col_idx, header in enumerate(headers, start=1):
-                ws.cell(row=1, column=col_idx, value=header)
-    else:
-        ws = wb.create_sheet(sheet_name)
-        start_row = 2
-        # 헤더 작성 - A부터 K까지
-        headers = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K']
-        for col_idx, header in enumerate(headers, start=1):
-            ws.cell(row=1, column=col_idx, value=header)
-    
-    # 데이터 추가
-    for row_data in data_list:
-        # A부터 K까지 최대 11개 컬럼 처리
-        for col_idx, col_letter in enumerate(['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K'], start=1):
-            value = row_data.get(col_letter, '')
-            # 빈 문자열이 아닌 경우에만 값 설정
-            if value != '':
-                ws.cell(row=start_row, column=col_idx, value=value)
-        start_row += 1
-    
-    return ws
+# 세션 시트별 헤더와 기록 함수
+# 대가는 A~K, 집계는 A열(번호)을 비우고 B~L 에 원본 값을 기록한다
+SESSION_SHEET_HEADERS = {
+    "대가": list(DAEGA_COLUMNS),
+    "집계": list(JIPGYE_COLUMNS),
+}
 
+# CSV / JSONL / Parquet 필드 이름 (열 문자 → 이름, 원본 3행 헤더 기준)
+# 세션에서 항상 비어 있는 열(대가 A·K, 집계 A·L)은 내보내지 않는다. 대가의 소계 행은 수량에 '계'
+EXPORT_FIELD_NAMES = {
+    "대가": {
+        "B": "선택문자", "C": "수량",
+        "D": "가_단가", "E": "가_금액", "F": "나_단가", "G": "나_금액", "H": "다_단가", "I": "다_금액",
+        "J": "계_금액",
+    },
+    "집계": {
+        "B": "선택문자", "C": "수량",
+        "D": "가_단가", "E": "가_금액", "F": "나_단가", "G": "나_금액", "H": "다_단가", "I": "다_금액",
+        "J": "계_단가", "K": "계_금액",
+    },
+}
 
-def create_jipgye_sheet(wb, data_list, sheet_name="집계"):
-    """집계 시트 생성 또는 기존 시트에 데이터 추가"""
-    if sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        # 기존 데이터의 마지막 행 찾기 (헤더가 있으면 그 다음부터)
-        if ws.max_row > 0:
-            start_row = ws.max_row + 1
-        else:
-            start_row = 2  # 헤더 행 다음
-            # 헤더 작성 - B부터 시작 (A열 제외)
-            headers = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L']
-            for col_idx, header in enumerate(headers, start=1):
-                ws.cell(row=1, column=col_idx, value=header)
-    else:
-        ws = wb.create_sheet(sheet_name)
-        start_row = 2
-        # 헤더 작성 - A부터 L까지 (최대 12개 컬럼)
-        headers = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L']
-        for col_idx, header in enumerate(headers, start=1):
-            ws.cell(row=1, column=col_idx, value=header)
-    
-    # 집계 데이터 추가 - A열(숫자)을 제외하고 B열부터 시작
-    for row_data in data_list:
-        # B열부터 L까지 저장 (A열 제외)
-        # 원본 데이터: A열=1 또는 2, B열='A' 또는 'B', C열부터 데이터
-        # 집계 시트: B열부터 시작하여 저장
-        col_letters = ['B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L']
-        for col_idx, col_letter in enumerate(col_letters, start=2):  # B열부터 시작 (컬럼 인덱스 2)
-            value = row_data.get(col_letter, '')
-            # 빈 문자열이 아니고 None이 아닌 경우에만 값 설정
-            if value != '' and value is not None:
-                ws.cell(row=start_row, column=col_idx, value=value)
-        start_row += 1
-    
-    return ws
 
+def _export_fields(sheet_name):
+    """[(필드 이름, 세션 행 튜플의 열 위치), ...] (이름을 정하지 않은 시트는 열 문자 그대로)"""
+    names = EXPORT_FIELD_NAMES.get(sheet_name)
+    if names is None:
+        return [(col, i) for i, col in enumerate(SESSION_SHEET_HEADERS.get(sheet_name, JIPGYE_COLUMNS))]
+    return [(name, JIPGYE_COLUMNS.index(col)) for col, name in names.items()]
 
-@app.route("/excel", methods=["GET", "POST"])
-def index():
-    """(기존) CON-A 메인 페이지"""
+
+def daega_row_tuple(row_data):
+    """대가 행 dict → A~L 튜플 (A~K만, 빈 문자열은 None)"""
+    values = [row_data.get(col, '') for col in DAEGA_COLUMNS]
+    return tuple(None if v == '' else v for v in values) + (None,)
+
+
+def jipgye_row_tuple(row_data):
+    """집계 행 dict → A~L 튜플 (A열 제외, B~L만)"""
+    values = [row_data.get(col, '') for col in JIPGYE_COLUMNS[1:]]
+    return (None,) + tuple(None if v == '' else v for v in values)
+
+
+def _compact_rows(data_list, to_tuple):
+    # 기록할 칸이 하나도 없는 행은 시트에 행을 차지하지 않으므로 제외
+    rows = [to_tuple(row_data) for row_data in data_list]
+    return [row for row in rows if any(v is not None for v in row)]
+
+
+def append_results(session_id, daega_data, jipgye_data):
+    """세션 결과의 대가/집계 시트에 행 추가 (시트는 항상 생성), 새 세션 버전 반환"""
+    return session_backend.append(session_id, {
+        "대가": _compact_rows(daega_data, daega_row_tuple),
+        "집계": _compact_rows(jipgye_data, jipgye_row_tuple),
+    })
+
+
+def _get_session_id():
+    """현재 사용자의 세션 ID (없으면 새로 발급)"""
     session_id = session.get('session_id')
     if not session_id:
-        session_id = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        # 여러 워커에서 동시에 발급해도 겹치지 않도록 임의 값 추가
+        session_id = datetime.now().strftime('%Y%m%d%H%M%S%f') + secrets.token_hex(4)
         session['session_id'] = session_id
+    return session_id
+
+
+@app.route("/excel", methods=["GET", "POST"])
+def index():
+    """(기존) CON-A 메인 페이지"""
+    session_id = _get_session_id()
     
     message = None
     error = None
@@ -518,18 +514,15 @@ def index():
     if request.method == "POST":
         number_input = request.form.get("number_input", "").strip()
         
-        if number_input in ['1', '2']:
+        # 번호 → 집계/대가 행 인덱스 (원본 파일 버전마다 한 번만 생성)
+        index = source_cache.selector_index()
+
+        if number_input in index:
             # 엑셀에서 데이터 읽기
-            daega_data, jipgye_data = read_data_from_excel(number_input)
-            
-            # 워크북 가져오기 또는 생성
-            wb = get_or_create_workbook(session_id)
+            daega_data, jipgye_data = read_data_from_excel(number_input, index)
             
-            # 대가 시트 생성 또는 추가 (항상 생성)
-            create_daega_sheet(wb, daega_data, "대가")
-            
-            # 집계 시트 생성 또는 추가 (항상 생성)
-            create_jipgye_sheet(wb, jipgye_data, "집계")
+            # 대가/집계 시트에 추가 (항상 생성)
+            append_results(session_id, daega_data, jipgye_data)
             
             total_rows = len(daega_data) + len(jipgye_data)
             if total_rows > 0:
@@ -537,43 +530,18 @@ def index():
             else:
                 error = f"번호 {number_input}에 해당하는 데이터를 찾을 수 없습니다."
         else:
-            error = "번호는 1 또는 2만 입력 가능합니다."
+            numbers = index.numbers()
+            error = f"번호는 {', '.join(numbers)} 중에서 입력 가능합니다." if numbers else "원본 파일에 등록된 번호가 없습니다."
     
-    # 현재 워크북의 시트 정보 및 데이터 가져오기
-    wb = get_or_create_workbook(session_id)
+    # 현재 세션 결과의 시트 정보 및 첫 페이지 데이터
+    # (시트별 행 수는 추가할 때마다 갱신되어 있으므로 전체 행을 다시 읽지 않음, 나머지는 페이지에서 나눠 불러옴)
+    counts = session_backend.sheet_counts(session_id)
     sheet_info = {}
     sheet_data = {}  # 각 시트의 실제 데이터
-    
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        row_count = ws.max_row - 1 if ws.max_row > 1 else 0  # 헤더 제외
-        sheet_info[sheet_name] = {'row_count': row_count}
-        
-        # 시트 데이터 읽기
-        sheet_rows = []
-        headers = []
-        
-        if ws.max_row > 1:
-            # 헤더 읽기
-            max_col = ws.max_column if ws.max_column > 0 else 12  # 최소 12개 컬럼
-            for col_idx in range(1, max_col + 1):
-                cell = ws.cell(row=1, column=col_idx)
-                value = cell.value if cell.value is not None else ''
-                headers.append(value)
-            
-            # 데이터 행 읽기
-            for row_idx in range(2, ws.max_row + 1):
-                row_data = []
-                for col_idx in range(1, max_col + 1):
-                    cell = ws.cell(row=row_idx, column=col_idx)
-                    value = cell.value if cell.value is not None else ''
-                    row_data.append(value)
-                sheet_rows.append(row_data)
-        
-        sheet_data[sheet_name] = {
-            'headers': headers,
-            'rows': sheet_rows
-        }
+
+    for sheet_name, row_count in (counts[1].items() if counts else ()):
+        sheet_info[sheet_name] = {'row_count': row_count}  # 헤더 제외
+        sheet_data[sheet_name] = _sheet_page(session_id, sheet_name, 0, SHEET_PAGE_SIZE)
     
     return render_template(
         "index.html",
@@ -581,36 +549,374 @@ def index():
         error=error,
         sheet_info=sheet_info,
         sheet_data=sheet_data,
-        session_id=session_id
+        session_id=session_id,
+        selector_numbers=source_cache.selector_index().numbers(),
     )
 
 
+# 배치 요청 한 항목당 최대 반복 횟수, 요청 하나의 최대 항목 수와 추가 행 수 (대가 + 집계)
+BATCH_MAX_COUNT = 1000
+BATCH_MAX_ITEMS = 500
+BATCH_MAX_ROWS = 50000
+
+
+def _parse_batch_items(payload):
+    """
+    배치 요청 본문에서 (번호, 반복 횟수) 목록 추출
+    - {"items": ["1", {"number": "2", "count": 3}, ...]}
+    - {"numbers": ["1", "2", ...]}
+    """
+    if isinstance(payload, list):
+        raw_items = payload
+    elif isinstance(payload, dict):
+        raw_items = payload.get("items")
+        if raw_items is None:
+            raw_items = payload.get("numbers", [])
+    else:
+        raw_items = []
+
+    items = []
+    for raw in raw_items if isinstance(raw_items, list) else []:
+        if isinstance(raw, dict):
+            number = raw.get("number", "")
+            count = raw.get("count", 1)
+        else:
+            number, count = raw, 1
+        items.append((str(number).strip(), count))
+    return items
+
+
+@app.route("/excel/batch", methods=["POST"])
+def excel_batch():
+    """
+    여러 번호를 한 번에 추가 (JSON)
+    원본 인덱스를 한 번만 조회하고 대가/집계 시트에 각각 한 번씩만 기록한다.
+    """
+    started = time.perf_counter()
+    session_id = _get_session_id()
+
+    items = _parse_batch_items(request.get_json(silent=True))
+    if not items:
+        return jsonify({"error": "추가할 번호 목록(items 또는 numbers)이 없습니다."}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"한 번에 추가할 수 있는 항목은 최대 {BATCH_MAX_ITEMS}개입니다."}), 413
+
+    index = source_cache.selector_index()
+
+    daega_data = []
+    jipgye_data = []
+    results = []
+    for number, count in items:
+        result = {"number": number, "count": count}
+        if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= BATCH_MAX_COUNT:
+            result.update(status="error", error=f"count는 1~{BATCH_MAX_COUNT} 사이의 정수여야 합니다.")
+            results.append(result)
+            continue
+
+        item_daega, item_jipgye = read_data_from_excel(number, index)
+        if not item_daega and not item_jipgye:
+            result.update(status="error", error=f"번호 {number}에 해당하는 데이터를 찾을 수 없습니다.")
+            results.append(result)
+            continue
+
+        # 한도를 넘으면 일부만 추가하지 않고 요청 전체를 거절
+        if len(daega_data) + len(jipgye_data) + (len(item_daega) + len(item_jipgye)) * count > BATCH_MAX_ROWS:
+            return jsonify({
+                "error": f"한 번에 추가할 수 있는 행은 최대 {BATCH_MAX_ROWS}개입니다.",
+                "items": results,
+            }), 413
+
+        daega_data.extend(item_daega * count)
+        jipgye_data.extend(item_jipgye * count)
+        result.update(status="ok", daega_rows=len(item_daega) * count, jipgye_rows=len(item_jipgye) * count)
+        results.append(result)
+
+    if daega_data or jipgye_data:
+        append_results(session_id, daega_data, jipgye_data)
+
+    return jsonify({
+        "session_id": session_id,
+        "items": results,
+        "added": {"대가": len(daega_data), "집계": len(jipgye_data)},
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    })
+
+
+# 시트 데이터 한 페이지의 기본/최대 행 수
+SHEET_PAGE_SIZE = 200
+SHEET_PAGE_MAX = 2000
+
+
+def _sheet_page(session_id, sheet_name, offset, limit):
+    """
+    세션 시트의 한 페이지 (화면 표시용)
+    {'headers', 'rows', 'offset', 'total', 'next_cursor', 'version'} (없는 시트면 None)
+    """
+    page = session_backend.page(session_id, sheet_name, offset, limit)
+    if page is None:
+        return None
+    version, total, rows = page
+
+    headers = []
+    sheet_rows = []
+    if total:
+        headers = SESSION_SHEET_HEADERS.get(sheet_name, list(JIPGYE_COLUMNS))
+        width = len(headers)
+        sheet_rows = [['' if v is None else v for v in row[:width]] for row in rows]
+
+    next_offset = offset + len(rows)
+    return {
+        'headers': headers,
+        'rows': sheet_rows,
+        'offset': offset,
+        'total': total,
+        'next_cursor': str(next_offset) if next_offset < total else None,
+        'version': version,
+    }
+
+
+@app.route("/excel/sheets/<sheet_name>")
+def excel_sheet_rows(sheet_name):
+    """
+    세션 시트 데이터 페이지 조회 (JSON)
+    ?cursor= (이전 응답의 next_cursor) 또는 ?offset= 부터 ?limit= 개 행
+    """
+    session_id = session.get('session_id')
+    cursor = request.args.get("cursor") or request.args.get("offset") or "0"
+    try:
+        offset = max(int(cursor), 0)
+        limit = min(max(int(request.args.get("limit", SHEET_PAGE_SIZE)), 1), SHEET_PAGE_MAX)
+    except ValueError:
+        return jsonify({"error": "offset/cursor와 limit은 정수여야 합니다."}), 400
+
+    page = _sheet_page(session_id, sheet_name, offset, limit) if session_id else None
+    if page is None:
+        return jsonify({"error": f"'{sheet_name}' 시트가 없습니다."}), 404
+    return jsonify(dict(page, sheet=sheet_name, limit=limit))
+
+
+@app.route("/excel/cache/stats")
+def source_cache_stats():
+    """원본 스냅샷 캐시 상태 (해시, 적중/미스/재컴파일 횟수, 마지막 준비 시간, 감시 스레드)"""
+    return jsonify(source_cache.stats())
+
+
+@app.route("/excel/sessions/stats")
+def session_store_stats():
+    """세션 결과 저장소 상태 (저장 방식, 세션 수, 대략적인 크기, 정리 횟수, 다운로드 캐시, 내보내기 작업)"""
+    return jsonify(dict(
+        session_backend.stats(), download_cache=download_cache.stats(), export_jobs=export_queue.stats(),
+    ))
+
+
+def _session_revision(epoch, version):
+    """
+    세션 내용 식별자 (epoch + 버전)
+    세션이 정리된 뒤 같은 쿠키로 다시 만들어지면 버전은 1부터 다시 시작하지만 epoch 가 달라진다.
+    """
+    return f"{epoch}.{version}"
+
+
+def _download_etag(session_id, revision, fmt):
+    """세션 내용별 다운로드 ETag (세션 ID 자체는 노출하지 않음)"""
+    return hashlib.sha1(f"{session_id}:{revision}:{fmt}".encode("utf-8")).hexdigest()[:20]
+
+
+def _conditional_headers(response, etag, updated_at):
+    response.set_etag(etag)
+    response.last_modified = datetime.fromtimestamp(int(updated_at), tz=timezone.utc)
+    # 브라우저가 매번 ETag 로 다시 확인하도록 (변경이 없으면 304)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def _not_modified(etag):
+    # Last-Modified 는 초 단위라 같은 초 안의 변경을 구분하지 못하므로 ETag 로만 판단
+    return bool(request.if_none_match) and request.if_none_match.contains(etag)
+
+
+def _export_format(fmt, sheet_name):
+    """
+    format (xlsx | csv | jsonl | parquet) 와 sheet 로 실제 내보낼 형식 결정 → (형식, 시트 이름)
+    csv 는 sheet 를 지정하면 그 시트 하나, 아니면 시트별 CSV 를 묶은 zip (format=zip 도 같음)
+    지원하지 않는 형식이면 형식 자리에 None
+    """
+    fmt = (fmt or "xlsx").strip().lower()
+    sheet_name = sheet_name or None
+    if fmt in ("zip", "csv.zip") or (fmt == "csv" and sheet_name is None):
+        fmt = "csv.zip"
+    if fmt != "xlsx" and fmt not in EXPORT_FORMATS:
+        return None, sheet_name
+    return fmt, sheet_name
+
+
+def _export_file(fmt, sheet_name):
+    """(mimetype, 다운로드 파일 이름)"""
+    if fmt == "xlsx":
+        mimetype, ext = XLSX_MIMETYPE, "xlsx"
+    else:
+        mimetype, ext = EXPORT_FORMATS[fmt]
+    label = f"CON-A_결과_{sheet_name}" if sheet_name else "CON-A_결과"
+    return mimetype, f"{label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
+
+
+def _export_sheets(results, sheet_name=None):
+    """세션 결과 → [(시트 이름, 헤더 목록, 행 목록), ...] (sheet_name 을 주면 그 시트만)"""
+    return [
+        (name, SESSION_SHEET_HEADERS.get(name, list(JIPGYE_COLUMNS)), rows)
+        for name, rows in results.sheets.items()
+        if sheet_name is None or name == sheet_name
+    ]
+
+
+def iter_sheets_export(fmt, sheets):
+    """
+    시트 목록을 fmt 형식 조각으로 생성
+    xlsx 는 1행 헤더(열 문자), 2행부터 세션 행 (빈 칸은 비워 둠)
+    csv / jsonl / parquet 는 EXPORT_FIELD_NAMES 의 필드만 이름을 붙여 내보낸다.
+    """
+    if fmt == "xlsx":
+        return iter_xlsx(sheets)
+    return iter_export(fmt, [(name, _export_fields(name), rows) for name, _, rows in sheets])
+
+
 @app.route("/download")
 def download():
-    """엑셀 파일 다운로드"""
+    """
+    결과 파일 다운로드 (세션 버전이 같으면 캐시된 파일 또는 304 응답)
+    ?format=xlsx(기본) | csv | jsonl | parquet, ?sheet= 로 한 시트만 내보낼 수 있다.
+    """
     session_id = session.get('session_id')
     
-    if not session_id or session_id not in workbooks:
+    fmt, sheet_name = _export_format(request.args.get("format"), request.args.get("sheet"))
+    if fmt is None:
+        return "지원하지 않는 형식입니다. (xlsx, csv, zip, jsonl, parquet)", 400
+    if fmt == "parquet" and not parquet_available():
+        return "Parquet 내보내기에는 pyarrow 패키지가 필요합니다. 관리자에게 문의해주세요.", 501
+    # ETag / 캐시 키에 쓰는 형식 (시트를 지정한 경우 시트별로 따로)
+    variant = f"{fmt}:{sheet_name}" if sheet_name else fmt
+
+    head = session_backend.head(session_id) if session_id else None
+    if head is None:
         return "생성된 데이터가 없습니다. 먼저 번호를 입력해주세요.", 400
-    
-    wb = workbooks[session_id]
-    
-    if len(wb.sheetnames) == 0:
-        return "생성된 시트가 없습니다. 먼저 번호를 입력해주세요.", 400
-    
-    # 메모리 버퍼에 엑셀 파일 저장
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    filename = f"CON-A_결과_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=filename,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+
+    version, updated_at, epoch = head
+    revision = _session_revision(epoch, version)
+    etag = _download_etag(session_id, revision, variant)
+    if _not_modified(etag):
+        return _conditional_headers(Response(status=304), etag, updated_at)
+
+    mimetype, filename = _export_file(fmt, sheet_name)
+    cache_key = (session_id, revision, variant)
+
+    body = download_cache.get(cache_key)
+    if body is None:
+        results = session_backend.load(session_id)
+        if results is None:
+            return "생성된 데이터가 없습니다. 먼저 번호를 입력해주세요.", 400
+        if not results.sheets:
+            return "생성된 시트가 없습니다. 먼저 번호를 입력해주세요.", 400
+        if sheet_name is not None and sheet_name not in results.sheets:
+            return f"'{sheet_name}' 시트가 없습니다.", 404
+        # 불러오는 사이에 추가된 경우 실제 불러온 버전 기준으로 응답
+        revision, updated_at = _session_revision(results.epoch, results.version), results.updated_at
+        etag = _download_etag(session_id, revision, variant)
+        cache_key = (session_id, revision, variant)
+
+        # 워크북 객체를 만들지 않고 세션 행을 바로 시트 XML / CSV / JSON 줄로 써서 만들어지는 대로 전송
+        # (전송이 끝나면 같은 버전의 다음 다운로드를 위해 캐시에 저장)
+        # results 는 load 시점의 스냅샷이라 전송 중에 추가된 행이 이 버전의 캐시에 섞이지 않는다
+        try:
+            chunks = iter_sheets_export(fmt, _export_sheets(results, sheet_name))
+        except ExportUnavailable as e:
+            return str(e), 501
+        body = download_cache.tee(cache_key, chunks)
+
+    response = Response(
+        body,
+        mimetype=mimetype,
+        headers=attachment_headers(filename),
     )
+    return _conditional_headers(response, etag, updated_at)
+
+
+def _export_job_status(job):
+    status = dict(job.public(), status_url=url_for("excel_export_status", job_id=job.job_id))
+    if job.status == "done":
+        status["download_url"] = url_for("excel_export_file", job_id=job.job_id)
+    return status
+
+
+def _owned_export_job(job_id):
+    # 다른 세션의 작업은 없는 것으로 응답
+    job = export_queue.get(job_id)
+    if job is None or job.owner != session.get('session_id'):
+        return None
+    return job
+
+
+@app.route("/excel/export", methods=["POST"])
+def excel_export():
+    """
+    결과 파일 내보내기 작업 등록 (JSON 또는 폼: format, sheet — /download 와 같은 값)
+    파일은 내보내기 작업 큐에서 만들고, 요청은 작업 ID 와 상태 조회 URL 만 바로 돌려준다 (202)
+    """
+    session_id = session.get('session_id')
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        payload = request.form
+
+    fmt, sheet_name = _export_format(payload.get("format"), payload.get("sheet"))
+    if fmt is None:
+        return jsonify({"error": "지원하지 않는 형식입니다. (xlsx, csv, zip, jsonl, parquet)"}), 400
+    if fmt == "parquet" and not parquet_available():
+        return jsonify({"error": "Parquet 내보내기에는 pyarrow 패키지가 필요합니다. 관리자에게 문의해주세요."}), 501
+
+    results = session_backend.load(session_id) if session_id else None
+    if results is None or not results.sheets:
+        return jsonify({"error": "생성된 데이터가 없습니다. 먼저 번호를 입력해주세요."}), 400
+    if sheet_name is not None and sheet_name not in results.sheets:
+        return jsonify({"error": f"'{sheet_name}' 시트가 없습니다."}), 404
+
+    # load 는 불러온 시점의 행 목록 스냅샷을 돌려주므로, 작업이 도는 동안 행이 추가되어도 등록 시점의 버전으로 만든다
+    sheets = _export_sheets(results, sheet_name)
+    mimetype, filename = _export_file(fmt, sheet_name)
+    variant = f"{fmt}:{sheet_name}" if sheet_name else fmt
+    try:
+        job = export_queue.submit(
+            session_id, results.epoch, results.version, variant, filename, mimetype, sheets,
+            lambda job_sheets: iter_sheets_export(fmt, job_sheets),
+        )
+    except ExportQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+
+    status = _export_job_status(job)
+    return jsonify(status), 202, {"Location": status["status_url"]}
+
+
+@app.route("/excel/export/<job_id>")
+def excel_export_status(job_id):
+    """내보내기 작업 상태 (queued / running / done / failed, 진행률, 완료되면 download_url)"""
+    job = _owned_export_job(job_id)
+    if job is None:
+        return jsonify({"error": "내보내기 작업이 없거나 보관 기간이 지났습니다."}), 404
+    return jsonify(_export_job_status(job))
+
+
+@app.route("/excel/export/<job_id>/file")
+def excel_export_file(job_id):
+    """완료된 내보내기 작업의 결과 파일"""
+    job = _owned_export_job(job_id)
+    if job is None:
+        return jsonify({"error": "내보내기 작업이 없거나 보관 기간이 지났습니다."}), 404
+    if job.status != "done":
+        return jsonify(dict(_export_job_status(job), error="아직 파일이 준비되지 않았습니다.")), 409
+    try:
+        # 보낸 뒤 정리로 지워지더라도 열어 둔 파일은 끝까지 전송된다
+        f = open(export_queue.file_path(job), "rb")
+    except FileNotFoundError:
+        return jsonify({"error": "내보내기 작업이 없거나 보관 기간이 지났습니다."}), 404
+    return send_file(f, mimetype=job.mimetype, as_attachment=True, download_name=job.filename)
 
 
 @app.route("/clear", methods=["POST"])
@@ -618,8 +924,9 @@ def clear():
     """현재 세션의 워크북 초기화"""
     session_id = session.get('session_id')
     
-    if session_id and session_id in workbooks:
-        del workbooks[session_id]
+    if session_id:
+        session_backend.clear(session_id)
+        download_cache.discard_session(session_id)
     
     return redirect(url_for('index'))
 
@@ -0,0 +1,104 @@
+"""
+셀 단위 접근(ws.cell + get_column_letter) vs 범위 단위 접근(xlsx_table) 벤치마크
+
+10,000행 합성 시트(A~L)로 다음을 비교한다.
+- 읽기: 파일을 열어 행마다 열 이름별 dict 만들기 (ws.cell vs read_only + read_range)
+- DataFrame 행 변환: iterrows + get_column_letter vs itertuples + 미리 만든 열 이름
+
+    python benchmarks/bench_tabular.py          # 기본 10000행
+    python benchmarks/bench_tabular.py 50000
+"""
+import os
+import sys
+import tempfile
+import time
+
+import openpyxl
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xlsx_table import column_labels, read_range  # noqa: E402
+
+DEFAULT_ROWS = 10000
+WIDTH = 12
+REPEAT = 3
+
+
+def build_file(path, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for i in range(1, rows + 1):
+        ws.append([i, f"X{i % 50}", 0.5 * i, 1, 2.5, 2, 3, 2, 1, 3.5, None if i % 3 else '계', i % 7])
+    wb.save(path)
+
+
+def timed(func):
+    best = None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def read_per_cell(path):
+    ws = openpyxl.load_workbook(path, data_only=True).active
+    records = []
+    for row_idx in range(1, ws.max_row + 1):
+        row_data = {}
+        for col_idx in range(1, WIDTH + 1):
+            row_data[get_column_letter(col_idx)] = ws.cell(row=row_idx, column=col_idx).value
+        records.append(row_data)
+    return records
+
+
+def read_bulk(path):
+    wb = openpyxl.load_workbook(path, data_only=True, read_only=True)
+    try:
+        labels = column_labels(WIDTH)
+        return [dict(zip(labels, values)) for values in read_range(wb.active, max_col=WIDTH)]
+    finally:
+        wb.close()
+
+
+def frame_per_cell(df):
+    rows = []
+    for _, row in df.iterrows():
+        new_row = {}
+        for col_idx in range(len(df.columns)):
+            new_row[get_column_letter(col_idx + 1)] = row.iloc[col_idx]
+        rows.append(new_row)
+    return rows
+
+
+def frame_bulk(df):
+    labels = column_labels(len(df.columns))
+    return [dict(zip(labels, row)) for row in df.itertuples(index=False, name=None)]
+
+
+def main(argv):
+    rows = int(argv[0]) if argv else DEFAULT_ROWS
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.xlsx")
+        build_file(path, rows)
+        df = pd.DataFrame(read_bulk(path))
+
+        cases = [
+            ("파일 → 행 dict", lambda: read_per_cell(path), lambda: read_bulk(path)),
+            ("DataFrame 행 변환", lambda: frame_per_cell(df), lambda: frame_bulk(df)),
+        ]
+        print(f"{rows}행 × {WIDTH}열 (best of {REPEAT})")
+        print(f"{'항목':<24} {'셀 단위':>10} {'범위 단위':>10} {'배율':>7}")
+        for label, slow, fast in cases:
+            slow_ms, slow_result = timed(slow)
+            fast_ms, fast_result = timed(fast)
+            if isinstance(slow_result, list):
+                assert slow_result == fast_result
+            print(f"{label:<24} {slow_ms:>8.1f}ms {fast_ms:>8.1f}ms {slow_ms / fast_ms:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,105 @@
+"""
+xlsx 읽기 벤치마크: openpyxl.load_workbook vs LazyXlsxReader
+
+CON-A DB1.xlsx 와 같은 구조(집계/대가/참조 시트)의 합성 파일을 행 수별로 만들고,
+대가 시트의 한 블록(3행)을 읽는 시간을 비교한다.
+
+    python benchmarks/bench_xlsx_reader.py              # 기본 100 / 1000 / 10000 블록
+    python benchmarks/bench_xlsx_reader.py 500 50000
+"""
+import os
+import sys
+import tempfile
+import time
+
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xlsx_lazy import LazyXlsxReader  # noqa: E402
+
+DEFAULT_SIZES = (100, 1000, 10000)
+REPEAT = 3
+
+
+def build_workbook(path, blocks):
+    """선택문자 블록 blocks 개짜리 합성 원본 (대가/참조는 블록당 4행, 집계는 블록당 1행)"""
+    wb = openpyxl.Workbook()
+    jipgye = wb.active
+    jipgye.title = "집계"
+    jipgye.append([])
+    jipgye.append([])
+    jipgye.append([None, None, "수량", " 가", None, "나", None, "다", None, "계", None])
+    daega = wb.create_sheet("대가")
+    chamjo = wb.create_sheet("참조")
+    for ws in (daega, chamjo):
+        ws.append([])
+        ws.append([None, None, "수량", " 가", None, "나", None, "다", None, "계"])
+
+    for i in range(blocks):
+        letter = f"X{i}"
+        start = daega.max_row + 1
+        for ws in (daega, chamjo):
+            ws.append([None, letter, 0.5, 1, f"=D{start}*C{start}", 2, 2, 2, f"=H{start}*C{start}", 3.5])
+            ws.append([None, None, 1, 2, f"=D{start + 1}*C{start + 1}", 1, 1, 3, 3, 6])
+            ws.append([None, None, "계", None, f"=E{start}+E{start + 1}", None, 3, None, 4, 9.5])
+            ws.append([])
+        row = jipgye.max_row + 1
+        jipgye.append([i + 1, letter, 5, f"=대가!E{start + 2}", f"=D{row}*C{row}", 3, 15, 4, 20, 9.5, 47.5])
+    wb.save(path)
+
+
+def timed(func):
+    best = None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def read_openpyxl(path, rows):
+    wb = openpyxl.load_workbook(path, data_only=True)
+    ws = wb["대가"]
+    return [tuple(ws.cell(row=r, column=c).value for c in range(1, 12)) for r in rows]
+
+
+def read_openpyxl_readonly(path, rows):
+    wb = openpyxl.load_workbook(path, data_only=True, read_only=True)
+    try:
+        return list(wb["대가"].iter_rows(min_row=rows[0], max_row=rows[-1], max_col=11, values_only=True))
+    finally:
+        wb.close()
+
+
+def read_lazy(path, rows):
+    return [values for _, values in LazyXlsxReader(path).read_rows("대가", rows, "A:K")]
+
+
+def main(argv):
+    sizes = [int(a) for a in argv] or DEFAULT_SIZES
+    print(f"{'블록 수':>8} {'파일 크기':>10} {'위치':>6} {'load_workbook':>14} {'read_only':>10} "
+          f"{'lazy':>8} {'lazy(재사용)':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for blocks in sizes:
+            path = os.path.join(tmp, f"bench_{blocks}.xlsx")
+            build_workbook(path, blocks)
+            size_kb = os.path.getsize(path) / 1024
+            total_rows = 2 + blocks * 4
+            reader = LazyXlsxReader(path)
+            reader.read_rows("대가", [3], "A:K")  # 공유 문자열/시트 목록 미리 읽기
+
+            for label, first in (("앞", 3), ("끝", total_rows - 3)):
+                rows = [first, first + 1, first + 2]
+                full_ms, expected = timed(lambda: read_openpyxl(path, rows))
+                ro_ms, ro_rows = timed(lambda: read_openpyxl_readonly(path, rows))
+                lazy_ms, lazy_rows = timed(lambda: read_lazy(path, rows))
+                warm_ms, _ = timed(lambda: [v for _, v in reader.read_rows("대가", rows, "A:K")])
+                assert lazy_rows == expected == ro_rows, (lazy_rows, expected)
+                print(f"{blocks:>8} {size_kb:>8.0f}KB {label:>6} {full_ms:>12.1f}ms {ro_ms:>8.1f}ms "
+                      f"{lazy_ms:>6.1f}ms {warm_ms:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
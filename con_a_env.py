@@ -0,0 +1,28 @@
+"""
+CON-A 환경 변수 설정 읽기
+
+모듈을 import 할 때 읽는 한도/기간 설정에 숫자가 아닌 값이 들어 있어도 앱 전체가 죽지 않도록,
+잘못된 값은 경고를 출력하고 기본값을 쓴다.
+"""
+import os
+
+
+def _env_number(name, default, cast):
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return cast(raw.strip())
+    except ValueError:
+        print(f"환경 변수 {name} 값이 올바르지 않아 기본값 {default} 을(를) 사용합니다: {raw!r}")
+        return default
+
+
+def env_int(name, default):
+    """정수 환경 변수 (없거나 잘못된 값이면 default)"""
+    return _env_number(name, default, int)
+
+
+def env_float(name, default):
+    """실수 환경 변수 (없거나 잘못된 값이면 default)"""
+    return _env_number(name, default, float)
@@ -0,0 +1,312 @@
+"""
+결과 파일 내보내기 작업 큐
+
+큰 세션의 결과 파일을 /download 요청 안에서 만들면 워커를 몇 초씩 붙잡고 프록시 시간 제한에 끊긴다.
+POST /excel/export 는 작업만 등록하고 바로 작업 ID 를 돌려주며, 파일은 크기를 제한한 스레드 풀이
+임시 디렉터리에 만든다. 만들어진 파일은 보관 기간(TTL)과 전체 저장 한도 안에서만 남겨 둔다.
+
+작업 상태는 결과 파일 옆의 <작업 ID>.json 에도 기록하므로, 여러 워커가 같은 디렉터리를 쓰면
+다른 워커에서 등록한 작업도 조회/다운로드할 수 있다.
+"""
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from con_a_env import env_int
+
+# 동시에 파일을 만드는 작업 수 (0 이면 등록한 요청 안에서 바로 생성, Vercel 기본값)
+DEFAULT_EXPORT_WORKERS = env_int("CONA_EXPORT_WORKERS", 0 if os.environ.get("VERCEL") else 2)
+# 대기 + 실행 중인 작업 한도 (넘으면 새 작업을 받지 않음)
+DEFAULT_EXPORT_MAX_PENDING = env_int("CONA_EXPORT_MAX_PENDING", 16)
+# 보관 중인 결과 파일 전체 크기 한도 (바이트, 작업 하나의 파일도 이 크기를 넘을 수 없음)
+DEFAULT_EXPORT_MAX_BYTES = env_int("CONA_EXPORT_MAX_BYTES", 512 * 1024 * 1024)
+# 완료된 작업 결과 보관 기간 (초)
+DEFAULT_EXPORT_TTL = env_int("CONA_EXPORT_TTL", 3600)
+
+# 진행 상황을 상태 파일에 기록하는 최소 간격 (초)
+PROGRESS_INTERVAL = 0.5
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class ExportQueueFull(RuntimeError):
+    """대기 중인 내보내기 작업이 한도에 도달함"""
+
+
+class ExportJob:
+    """내보내기 작업 하나의 상태 (queued → running → done | failed)"""
+
+    FIELDS = (
+        "job_id", "owner", "epoch", "version", "variant", "filename", "mimetype", "status",
+        "rows_done", "rows_total", "size", "error", "created_at", "started_at", "finished_at",
+    )
+
+    def __init__(self, job_id, owner, epoch, version, variant, filename, mimetype, rows_total=0):
+        self.job_id = job_id
+        self.owner = owner
+        # 세션 epoch + 버전: 세션이 정리된 뒤 다시 만들어져 버전이 1부터 시작해도 구분된다
+        self.epoch = epoch
+        self.version = version
+        self.variant = variant
+        self.filename = filename
+        self.mimetype = mimetype
+        self.status = "queued"
+        self.rows_done = 0
+        self.rows_total = rows_total
+        self.size = 0
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    @property
+    def progress(self):
+        """0.0 ~ 1.0 (파일에 쓴 행 수 기준)"""
+        if self.status == "done":
+            return 1.0
+        if not self.rows_total:
+            return 0.0
+        return min(self.rows_done / self.rows_total, 1.0)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls.__new__(cls)
+        for field in cls.FIELDS:
+            setattr(job, field, data.get(field))
+        return job
+
+    def public(self):
+        """응답용 상태 (세션 ID, epoch 는 제외)"""
+        data = self.to_dict()
+        del data["owner"]
+        del data["epoch"]
+        data["progress"] = round(self.progress, 4)
+        return data
+
+
+class ExportJobQueue:
+    """
+    제한된 스레드 풀에서 결과 파일을 만드는 작업 큐
+    directory: 결과 파일과 상태 파일(<작업 ID>.json)을 저장할 디렉터리
+    """
+
+    def __init__(self, directory, max_workers=DEFAULT_EXPORT_WORKERS, max_pending=DEFAULT_EXPORT_MAX_PENDING,
+                 max_bytes=DEFAULT_EXPORT_MAX_BYTES, ttl_seconds=DEFAULT_EXPORT_TTL):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._executor = None
+        # 이 프로세스에서 등록한 작업 (작업 ID → ExportJob), (세션, epoch, 버전, 형식) → 작업 ID
+        self._jobs = {}
+        self._active = {}
+        self.stored_bytes = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.rejected = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def file_path(self, job):
+        return os.path.join(self.directory, f"{job.job_id}.out")
+
+    def _status_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _save(self, job):
+        # 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+        path = self._status_path(job.job_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _read(self, job_id):
+        try:
+            with open(self._status_path(job_id), encoding="utf-8") as f:
+                return ExportJob.from_dict(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def submit(self, owner, epoch, version, variant, filename, mimetype, sheets, make_chunks):
+        """
+        sheets: [(시트 이름, 헤더 목록, 행 목록), ...]
+        make_chunks(sheets) 가 만드는 bytes 조각을 결과 파일로 저장하는 작업을 등록하고 ExportJob 반환
+        같은 세션/epoch/버전/형식의 작업이 이미 대기 중이거나 완료되어 있으면 그 작업을 돌려준다.
+        """
+        self.prune()
+        key = (owner, epoch, version, variant)
+        with self._lock:
+            existing = self._jobs.get(self._active.get(key))
+            if existing is not None and existing.status != "failed" and self._available(existing):
+                return existing
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                self.rejected += 1
+                raise ExportQueueFull("대기 중인 내보내기 작업이 많습니다. 잠시 후 다시 시도해주세요.")
+
+            job = ExportJob(
+                secrets.token_hex(16), owner, epoch, version, variant, filename, mimetype,
+                rows_total=sum(len(rows) for _, _, rows in sheets),
+            )
+            self._jobs[job.job_id] = job
+            self._active[key] = job.job_id
+            self.submitted += 1
+            if self.max_workers and self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cona-export")
+        self._save(job)
+
+        if self._executor is None:
+            self._run(job, sheets, make_chunks)
+        else:
+            self._executor.submit(self._run, job, sheets, make_chunks)
+        return job
+
+    def _count_rows(self, job, rows):
+        # 생성기가 다음 행을 요청할 때 세므로, 행을 하나씩 쓰는 형식에서는 쓴 행 수와 같다
+        for values in rows:
+            yield values
+            job.rows_done += 1
+
+    def _run(self, job, sheets, make_chunks):
+        job.status = "running"
+        job.started_at = time.time()
+        self._save(job)
+
+        path = self.file_path(job)
+        tmp_path = path + ".part"
+        last_saved = time.monotonic()
+        try:
+            counted = [(name, headers, self._count_rows(job, rows)) for name, headers, rows in sheets]
+            with open(tmp_path, "wb") as f:
+                for chunk in make_chunks(counted):
+                    f.write(chunk)
+                    job.size += len(chunk)
+                    if job.size > self.max_bytes:
+                        raise ValueError("결과 파일이 내보내기 저장 한도를 넘었습니다.")
+                    if time.monotonic() - last_saved >= PROGRESS_INTERVAL:
+                        self._save(job)
+                        last_saved = time.monotonic()
+            os.replace(tmp_path, path)
+        except Exception as e:
+            _remove(tmp_path)
+            job.finished_at = time.time()
+            job.status = "failed"
+            job.error = str(e) or type(e).__name__
+            with self._lock:
+                self.failed += 1
+        else:
+            job.finished_at = time.time()
+            job.status = "done"
+            job.rows_done = job.rows_total
+            with self._lock:
+                self.completed += 1
+        self._save(job)
+        self.prune()
+
+    def get(self, job_id):
+        """작업 ID 로 ExportJob 조회 (다른 프로세스에서 등록한 작업 포함, 없거나 만료되면 None)"""
+        if not job_id or not _JOB_ID.fullmatch(job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            job = self._read(job_id)
+        if job is None or self._expired(job, time.time()) or not self._available(job):
+            return None
+        return job
+
+    def _available(self, job):
+        # 다른 프로세스의 정리로 결과 파일이 이미 지워진 작업은 없는 것으로 본다
+        return job.status != "done" or os.path.exists(self.file_path(job))
+
+    def _expired(self, job, now):
+        if job.finished:
+            return job.finished_at + self.ttl_seconds < now
+        # 등록한 프로세스가 끝나 버려 완료되지 못한 작업
+        return job.job_id not in self._jobs and (job.created_at or 0) + self.ttl_seconds < now
+
+    def _discard(self, job):
+        _remove(self.file_path(job))
+        _remove(self.file_path(job) + ".part")
+        _remove(self._status_path(job.job_id))
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+            key = (job.owner, job.epoch, job.version, job.variant)
+            if self._active.get(key) == job.job_id:
+                del self._active[key]
+
+    def prune(self):
+        """보관 기간이 지난 결과와, 저장 한도를 넘는 만큼 오래된 결과를 삭제"""
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        done = []
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            job = self._read(name[:-len(".json")])
+            if job is None:
+                continue
+            if self._expired(job, now):
+                self._discard(job)
+                with self._lock:
+                    self.expired += 1
+            elif job.status == "done":
+                done.append(job)
+
+        stored = sum(job.size for job in done)
+        for job in sorted(done, key=lambda j: j.finished_at):
+            if stored <= self.max_bytes:
+                break
+            self._discard(job)
+            stored -= job.size
+            with self._lock:
+                self.evicted += 1
+        self.stored_bytes = stored
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            return {
+                "directory": self.directory,
+                "workers": self.max_workers,
+                "queued": sum(1 for job in jobs if job.status == "queued"),
+                "running": sum(1 for job in jobs if job.status == "running"),
+                "jobs": len(jobs),
+                "stored_bytes": self.stored_bytes,
+                "max_bytes": self.max_bytes,
+                "max_pending": self.max_pending,
+                "ttl_seconds": self.ttl_seconds,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "rejected": self.rejected,
+            }
+
+
+def _remove(path):
+    # 다른 프로세스가 먼저 지웠거나 (Windows 에서) 아직 전송 중인 파일은 다음 정리 때 다시 시도
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,638 @@
+"""
+CON-A 세션 결과 저장소
+
+세션 ID별 결과를 프로세스 메모리에 보관하되, 최대 개수 / 유휴 만료 시간 /
+대략적인 메모리 예산을 넘으면 가장 오래 쓰지 않은 세션부터 내보낸다(LRU).
+
+세션 결과는 openpyxl Workbook 대신 시트별 A~L 고정 폭 튜플 목록(SessionResults)으로
+보관하고, 실제 xlsx 는 다운로드할 때만 만든다.
+
+저장 방식은 교체할 수 있다.
+- MemorySessionBackend: 프로세스 메모리 (워커 1개용, 기본값)
+- SQLiteSessionBackend: 로컬 SQLite 파일 (여러 gunicorn 워커가 같은 세션을 공유)
+"""
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from con_a_env import env_int
+
+# 기본 설정 (환경 변수로 변경 가능)
+DEFAULT_MAX_ENTRIES = env_int("CONA_SESSION_MAX_ENTRIES", 500)
+DEFAULT_TTL_SECONDS = env_int("CONA_SESSION_TTL", 6 * 60 * 60)
+DEFAULT_MAX_BYTES = env_int("CONA_SESSION_MAX_BYTES", 256 * 1024 * 1024)
+
+
+# 세션 결과 한 행의 폭 (A~L)
+ROW_WIDTH = 12
+
+# 행 튜플 하나의 대략적인 크기 (튜플 + 목록 슬롯, 값 객체는 원본 인덱스와 공유)
+_APPROX_ROW_BYTES = sys.getsizeof((None,) * ROW_WIDTH) + 8
+_APPROX_RESULTS_BYTES = 1024
+
+
+def new_session_epoch():
+    return secrets.token_hex(8)
+
+
+class SessionResults:
+    """
+    세션 하나의 결과 (시트 이름 → A~L 튜플 목록)
+    빈 칸은 None 으로 저장하며, 시트 순서는 처음 추가된 순서를 따른다.
+    """
+
+    __slots__ = ("sheets", "version", "updated_at", "epoch")
+
+    def __init__(self, sheets=None, version=0, updated_at=None, epoch=None):
+        self.sheets = sheets if sheets is not None else {}
+        # 추가/초기화할 때마다 증가하는 세션 버전과 마지막 변경 시각 (epoch 초)
+        self.version = version
+        self.updated_at = updated_at if updated_at is not None else time.time()
+        # 세션 레코드를 만들 때마다 새로 정하는 값 - 정리된 뒤 같은 쿠키로 다시 만들어지면
+        # 버전이 1부터 다시 시작하므로, 캐시/ETag 는 (epoch, 버전)으로 구분한다
+        self.epoch = new_session_epoch() if epoch is None else epoch
+
+    def append(self, sheet_name, rows):
+        """시트에 행 추가 (행이 없어도 시트는 만들어 둠)"""
+        self.sheets.setdefault(sheet_name, []).extend(rows)
+
+    def snapshot(self):
+        """시트별 행 목록을 얕게 복사한 결과 (이후 append 가 반영되지 않음)"""
+        return SessionResults(
+            {name: list(rows) for name, rows in self.sheets.items()},
+            self.version, self.updated_at, self.epoch,
+        )
+
+    def row_count(self, sheet_name):
+        return len(self.sheets.get(sheet_name, ()))
+
+    def approx_size(self):
+        """대략적인 메모리 사용량 (바이트)"""
+        return _APPROX_RESULTS_BYTES + sum(len(rows) for rows in self.sheets.values()) * _APPROX_ROW_BYTES
+
+
+class SessionStore:
+    """세션 ID → 값 저장소 (LRU + 유휴 TTL + 바이트 예산)"""
+
+    def __init__(self, sizeof, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES,
+                 clock=time.monotonic):
+        self._sizeof = sizeof
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.RLock()
+        # session_id → [value, size, last_access] (앞쪽이 가장 오래 쓰지 않은 세션)
+        self._entries = OrderedDict()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"lru": 0, "ttl": 0, "budget": 0}
+        # 세션을 내보낼 때 호출 (session_id) - 다운로드 캐시 정리 등
+        self.on_evict = None
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, session_id):
+        """세션 값 반환 (없거나 만료되었으면 None)"""
+        with self._lock:
+            self._expire()
+            item = self._entries.get(session_id)
+            if item is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            item[2] = self._clock()
+            self._entries.move_to_end(session_id)
+            return item[0]
+
+    def get_or_create(self, session_id, factory):
+        """세션 값 반환, 없으면 factory()로 만들어 저장"""
+        with self._lock:
+            value = self.get(session_id)
+            if value is None:
+                value = factory()
+                self.put(session_id, value)
+            return value
+
+    def put(self, session_id, value):
+        """세션 값 저장 (크기를 다시 측정하고 필요하면 다른 세션을 내보냄)"""
+        with self._lock:
+            old = self._entries.pop(session_id, None)
+            if old is not None:
+                self.resident_bytes -= old[1]
+            size = self._sizeof(value)
+            self._entries[session_id] = [value, size, self._clock()]
+            self.resident_bytes += size
+            self._expire()
+            self._enforce_limits(keep=session_id)
+
+    def update(self, session_id):
+        """세션 값을 제자리에서 수정한 뒤 크기만 다시 측정"""
+        with self._lock:
+            item = self._entries.get(session_id)
+            if item is not None:
+                self.put(session_id, item[0])
+
+    def mutate(self, session_id, fn, factory=None):
+        """
+        잠금 안에서 세션 값을 fn(value) 로 제자리 수정한 뒤 크기를 다시 측정하고 fn 의 반환값을 돌려줌
+        세션이 없으면 factory()로 만들어 수정하고, factory 가 없으면 fn 을 부르지 않고 None 반환
+        """
+        with self._lock:
+            value = self.get(session_id)
+            if value is None:
+                if factory is None:
+                    return None
+                value = factory()
+                self.put(session_id, value)
+            result = fn(value)
+            self.update(session_id)
+            return result
+
+    def view(self, session_id, fn):
+        """잠금 안에서 fn(value) 결과 반환 (세션이 없으면 None, 값은 수정하지 않음)"""
+        with self._lock:
+            value = self.get(session_id)
+            return fn(value) if value is not None else None
+
+    def remove(self, session_id):
+        """세션 삭제 (있었으면 True)"""
+        with self._lock:
+            item = self._entries.pop(session_id, None)
+            if item is None:
+                return False
+            self.resident_bytes -= item[1]
+            return True
+
+    def _evict_oldest(self, reason):
+        session_id, item = self._entries.popitem(last=False)
+        self.resident_bytes -= item[1]
+        self.evictions[reason] += 1
+        if self.on_evict is not None:
+            self.on_evict(session_id)
+
+    def _expire(self):
+        if not self.ttl_seconds:
+            return
+        deadline = self._clock() - self.ttl_seconds
+        # 접근 순서대로 정렬되어 있으므로 앞쪽부터 만료된 세션만 확인
+        while self._entries:
+            first = next(iter(self._entries.values()))
+            if first[2] > deadline:
+                break
+            self._evict_oldest("ttl")
+
+    def _enforce_limits(self, keep):
+        while len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            if self.max_entries and len(self._entries) > self.max_entries:
+                self._evict_oldest("lru")
+            elif self.max_bytes and self.resident_bytes > self.max_bytes:
+                self._evict_oldest("budget")
+            else:
+                break
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": dict(self.evictions),
+            }
+
+
+#############################################
+# 세션 저장 방식 (backend)
+#############################################
+
+class MemorySessionBackend:
+    """프로세스 메모리 저장 (SessionStore 의 LRU/TTL/예산 정책 적용)"""
+
+    name = "memory"
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else SessionStore(sizeof=SessionResults.approx_size)
+
+    def load(self, session_id):
+        """
+        세션 결과 스냅샷 반환 (없으면 None)
+        다운로드가 스트리밍되는 중에 행이 추가되어도 불러온 버전의 행만 쓰도록 목록을 복사한다.
+        """
+        return self.store.view(session_id, SessionResults.snapshot)
+
+    def append(self, session_id, sheet_rows):
+        """{시트 이름: [행 튜플, ...]} 을 세션에 추가하고 새 버전 반환"""
+        def add(results):
+            for sheet_name, rows in sheet_rows.items():
+                results.append(sheet_name, rows)
+            results.version += 1
+            results.updated_at = time.time()
+            return results.version
+
+        # 추가된 만큼 세션 크기는 store 가 다시 측정
+        return self.store.mutate(session_id, add, factory=SessionResults)
+
+    def clear(self, session_id):
+        """세션 행을 모두 지우고 버전 증가 (세션이 없었으면 False)"""
+        def reset(results):
+            results.sheets = {}
+            results.version += 1
+            results.updated_at = time.time()
+            return True
+
+        return bool(self.store.mutate(session_id, reset))
+
+    def head(self, session_id):
+        """(버전, 마지막 변경 시각, 세션 epoch) 반환 (세션이 없으면 None)"""
+        return self.store.view(session_id, lambda results: (results.version, results.updated_at, results.epoch))
+
+    def set_evict_listener(self, callback):
+        """LRU/TTL/예산으로 세션을 내보낼 때 callback(session_id) 호출"""
+        self.store.on_evict = callback
+
+    def sheet_counts(self, session_id):
+        """(버전, {시트 이름: 행 수}) 반환 (세션이 없으면 None)"""
+        return self.store.view(session_id, lambda results: (
+            results.version, {name: len(rows) for name, rows in results.sheets.items()}
+        ))
+
+    def page(self, session_id, sheet_name, offset, limit):
+        """(버전, 전체 행 수, offset 부터 limit 개 행) 반환 (세션/시트가 없으면 None)"""
+        def rows_page(results):
+            if sheet_name not in results.sheets:
+                return None
+            rows = results.sheets[sheet_name]
+            return results.version, len(rows), rows[offset:offset + limit]
+
+        return self.store.view(session_id, rows_page)
+
+    def version(self, session_id):
+        head = self.head(session_id)
+        return head[0] if head else 0
+
+    def stats(self):
+        return dict(self.store.stats(), backend=self.name)
+
+
+class SQLiteSessionBackend:
+    """
+    로컬 SQLite 파일 저장 (여러 프로세스가 같은 파일을 공유)
+    - WAL 모드 + busy_timeout 으로 동시 읽기/쓰기
+    - 추가는 BEGIN IMMEDIATE 트랜잭션 안에서 행 번호와 세션 버전을 함께 갱신
+    - 행은 A~L 값을 JSON 배열 하나로 저장
+    - 세션 행에는 시트 순서와 시트별 행 수를 {시트 이름: 행 수} JSON 으로 함께 저장
+    """
+
+    name = "sqlite"
+
+    # 만료 세션 정리 주기 (초)
+    PURGE_INTERVAL = 60
+
+    def __init__(self, path, ttl_seconds=DEFAULT_TTL_SECONDS, busy_timeout_ms=5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self.on_evict = None
+        self._init_schema()
+
+    def _connect(self):
+        # 스레드(및 프로세스)마다 연결 하나씩 재사용
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cona_sessions (
+                session_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                sheets TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                epoch TEXT
+            )
+            """
+        )
+        # epoch 열이 없던 이전 파일
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cona_sessions)")}
+        if "epoch" not in columns:
+            conn.execute("ALTER TABLE cona_sessions ADD COLUMN epoch TEXT")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cona_session_rows (
+                session_id TEXT NOT NULL,
+                sheet_name TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (session_id, sheet_name, seq)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def _sheet_counts(self, conn, session_id, raw):
+        sheets = json.loads(raw)
+        if isinstance(sheets, list):
+            # 시트 이름 목록만 저장하던 이전 형식
+            sheets = {
+                name: conn.execute(
+                    "SELECT COUNT(*) FROM cona_session_rows WHERE session_id = ? AND sheet_name = ?",
+                    (session_id, name),
+                ).fetchone()[0]
+                for name in sheets
+            }
+        return sheets
+
+    def load(self, session_id):
+        """세션 결과 반환 (없으면 None)"""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            head = conn.execute(
+                "SELECT version, sheets, updated_at, epoch FROM cona_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if head is None:
+                return None
+            sheets = {name: [] for name in json.loads(head[1])}
+            for sheet_name, data in conn.execute(
+                "SELECT sheet_name, data FROM cona_session_rows WHERE session_id = ? ORDER BY sheet_name, seq",
+                (session_id,),
+            ):
+                sheets.setdefault(sheet_name, []).append(tuple(json.loads(data)))
+            return SessionResults(sheets, head[0], head[2], head[3] or "")
+        finally:
+            conn.execute("COMMIT")
+
+    def append(self, session_id, sheet_rows):
+        """{시트 이름: [행 튜플, ...]} 을 세션에 추가하고 새 버전 반환"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            head = conn.execute(
+                "SELECT version, sheets FROM cona_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            version, counts = (head[0], self._sheet_counts(conn, session_id, head[1])) if head else (0, {})
+
+            for sheet_name, rows in sheet_rows.items():
+                start = counts.setdefault(sheet_name, 0)
+                if not rows:
+                    continue
+                conn.executemany(
+                    "INSERT INTO cona_session_rows(session_id, sheet_name, seq, data) VALUES(?,?,?,?)",
+                    (
+                        (session_id, sheet_name, start + i, json.dumps(row, ensure_ascii=False, default=str))
+                        for i, row in enumerate(rows)
+                    ),
+                )
+                counts[sheet_name] = start + len(rows)
+
+            version += 1
+            # epoch 는 세션 레코드를 처음 만들 때만 정함 (이미 있으면 유지)
+            conn.execute(
+                """
+                INSERT INTO cona_sessions(session_id, version, sheets, updated_at, epoch) VALUES(?,?,?,?,?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    version = excluded.version, sheets = excluded.sheets, updated_at = excluded.updated_at
+                """,
+                (session_id, version, json.dumps(counts, ensure_ascii=False), now, new_session_epoch()),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if now - self._last_purge > self.PURGE_INTERVAL:
+            self._last_purge = now
+            self.purge_expired()
+        return version
+
+    def clear(self, session_id):
+        """세션 행을 모두 지우고 버전 증가 (세션이 없었으면 False)"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cona_session_rows WHERE session_id = ?", (session_id,))
+            updated = conn.execute(
+                "UPDATE cona_sessions SET version = version + 1, sheets = '{}', updated_at = ? WHERE session_id = ?",
+                (time.time(), session_id),
+            ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return updated > 0
+
+    def head(self, session_id):
+        """(버전, 마지막 변경 시각, 세션 epoch) 반환 (세션이 없으면 None)"""
+        row = self._connect().execute(
+            "SELECT version, updated_at, epoch FROM cona_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return (row[0], row[1], row[2] or "") if row else None
+
+    def set_evict_listener(self, callback):
+        """만료 세션을 정리할 때 callback(session_id) 호출 (이 프로세스에서 정리한 세션만)"""
+        self.on_evict = callback
+
+    def sheet_counts(self, session_id):
+        """(버전, {시트 이름: 행 수}) 반환 (세션이 없으면 None)"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT version, sheets FROM cona_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return (row[0], self._sheet_counts(conn, session_id, row[1])) if row else None
+
+    def page(self, session_id, sheet_name, offset, limit):
+        """(버전, 전체 행 수, offset 부터 limit 개 행) 반환 (세션/시트가 없으면 None)"""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            head = self.sheet_counts(session_id)
+            if head is None or sheet_name not in head[1]:
+                return None
+            rows = [
+                tuple(json.loads(data))
+                for (data,) in conn.execute(
+                    """
+                    SELECT data FROM cona_session_rows
+                    WHERE session_id = ? AND sheet_name = ? AND seq >= ?
+                    ORDER BY seq LIMIT ?
+                    """,
+                    (session_id, sheet_name, offset, limit),
+                )
+            ]
+            return head[0], head[1][sheet_name], rows
+        finally:
+            conn.execute("COMMIT")
+
+    def version(self, session_id):
+        head = self.head(session_id)
+        return head[0] if head else 0
+
+    def purge_expired(self):
+        """유휴 시간이 TTL 을 넘은 세션 삭제 (삭제한 세션 수 반환)"""
+        if not self.ttl_seconds:
+            return 0
+        deadline = time.time() - self.ttl_seconds
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = [
+                session_id for (session_id,) in conn.execute(
+                    "SELECT session_id FROM cona_sessions WHERE updated_at < ?", (deadline,)
+                )
+            ]
+            conn.execute(
+                """
+                DELETE FROM cona_session_rows WHERE session_id IN (
+                    SELECT session_id FROM cona_sessions WHERE updated_at < ?
+                )
+                """,
+                (deadline,),
+            )
+            purged = conn.execute("DELETE FROM cona_sessions WHERE updated_at < ?", (deadline,)).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if self.on_evict is not None:
+            for session_id in expired:
+                self.on_evict(session_id)
+        return purged
+
+    def stats(self):
+        conn = self._connect()
+        sessions = conn.execute("SELECT COUNT(*) FROM cona_sessions").fetchone()[0]
+        rows = conn.execute("SELECT COUNT(*) FROM cona_session_rows").fetchone()[0]
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "entries": sessions,
+            "rows": rows,
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+#############################################
+# 다운로드 결과 캐시
+#############################################
+
+DEFAULT_DOWNLOAD_CACHE_BYTES = env_int("CONA_DOWNLOAD_CACHE_BYTES", 64 * 1024 * 1024)
+DEFAULT_DOWNLOAD_ENTRY_BYTES = env_int("CONA_DOWNLOAD_ENTRY_BYTES", 8 * 1024 * 1024)
+
+
+class DownloadCache:
+    """
+    (세션 ID, 세션 epoch + 버전, 형식) → 생성된 파일 bytes 캐시
+    전체 크기 예산을 넘으면 오래 쓰지 않은 항목부터 내보낸다.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_DOWNLOAD_CACHE_BYTES, max_entry_bytes=DEFAULT_DOWNLOAD_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_entry_bytes:
+            return
+        with self._lock:
+            # 같은 세션의 예전 버전은 다시 쓰이지 않으므로 함께 정리
+            for old_key in [k for k in self._entries if k[0] == key[0] and k[1] != key[1]]:
+                self.resident_bytes -= len(self._entries.pop(old_key))
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.resident_bytes -= len(old)
+            self._entries[key] = data
+            self.resident_bytes += len(data)
+            while self.resident_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.resident_bytes -= len(evicted)
+                self.evictions += 1
+
+    def discard_session(self, session_id):
+        """세션의 이전 버전 캐시 삭제"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == session_id]:
+                self.resident_bytes -= len(self._entries.pop(key))
+
+    def tee(self, key, chunks):
+        """조각을 그대로 내보내면서 모아 두었다가, 끝까지 전송되면 캐시에 저장"""
+        parts = []
+        size = 0
+        for chunk in chunks:
+            if parts is not None:
+                parts.append(chunk)
+                size += len(chunk)
+                if size > self.max_entry_bytes:
+                    parts = None
+            yield chunk
+        if parts is not None:
+            self.put(key, b"".join(parts))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entry_bytes": self.max_entry_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def create_session_backend(default_sqlite_path):
+    """
+    환경 변수 CONA_SESSION_BACKEND (memory | sqlite) 에 따라 저장 방식 생성
+    sqlite 파일 경로는 CONA_SESSION_DB 로 지정할 수 있다.
+    """
+    kind = os.environ.get("CONA_SESSION_BACKEND", "memory").strip().lower()
+    if kind == "sqlite":
+        return SQLiteSessionBackend(os.environ.get("CONA_SESSION_DB") or default_sqlite_path)
+    if kind != "memory":
+        raise ValueError(f"알 수 없는 CONA_SESSION_BACKEND 값입니다: {kind}")
+    return MemorySessionBackend()
@@ -0,0 +1,706 @@
+"""
+CON-A 원본 엑셀(data/CON-A DB1.xlsx) 스냅샷 캐시
+
+원본 엑셀은 거의 바뀌지 않는 작은 참조표이므로 요청마다 openpyxl/pandas 로 파싱하지 않고,
+한 번 컴파일한 스냅샷(시트별 값/수식 행 + header=2 DataFrame)을 pickle 파일로 저장해 두고 읽는다.
+스냅샷에는 원본 파일의 sha256 해시가 들어 있어 내용이 바뀐 경우에만 다시 컴파일한다.
+
+    python con_a_source.py compile            # 배포 전에 미리 컴파일
+    python con_a_source.py compile --force    # 해시가 같아도 다시 컴파일
+
+선택 번호 인덱스처럼 스냅샷에서 만들어지는 파생 데이터도 파일 버전마다 한 번만 만든다.
+"""
+import argparse
+import hashlib
+import io
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import openpyxl
+import pandas as pd
+
+from con_a_env import env_float
+from formula_engine import FormulaModel
+from xlsx_lazy import LazyXlsxReader
+from xlsx_table import read_range
+
+SOURCE_PATH = "data/CON-A DB1.xlsx"
+
+# 스냅샷 구조가 바뀌면 올려서 예전 파일을 무시하게 함
+SNAPSHOT_FORMAT = 2
+
+# pandas 헤더 행 (원본 3행) - cursor_excel0113 의 pd.read_excel(header=2) 와 동일
+FRAME_HEADER = 2
+
+
+def default_snapshot_path(source_path):
+    """
+    스냅샷 파일 위치 (CONA_SNAPSHOT_DIR 이 있으면 그 아래, 없으면 원본 옆)
+    예) data/CON-A DB1.xlsx → data/CON-A DB1.xlsx.snapshot
+    """
+    directory = os.environ.get("CONA_SNAPSHOT_DIR") or os.path.dirname(source_path)
+    return os.path.join(directory, os.path.basename(source_path) + ".snapshot")
+
+
+def _read_value_grid(data):
+    """시트별 계산된 값 행 튜플 (스타일을 읽지 않는 지연 리더로 시트 XML 만 파싱)"""
+    reader = LazyXlsxReader(data)
+    sheetnames = reader.sheetnames
+    return sheetnames, {name: reader.read_sheet(name) for name in sheetnames}
+
+
+def _read_formula_grid(data):
+    """시트별 수식 원문 행 튜플 (values_only=True 로 읽은 ws.iter_rows 와 동일)"""
+    wb = openpyxl.load_workbook(io.BytesIO(data), data_only=False, read_only=True)
+    try:
+        grid = {}
+        for ws in wb.worksheets:
+            rows = read_range(ws)
+            width = max((len(values) for values in rows), default=0)
+            grid[ws.title] = tuple(
+                values + (None,) * (width - len(values)) for values in rows
+            )
+        return wb.sheetnames, grid
+    finally:
+        wb.close()
+
+
+class SourceSnapshot:
+    """
+    컴파일된 원본 엑셀
+    values: 계산된 값(data_only=True), formulas: 수식 원문(data_only=False)
+    frames: pd.read_excel(header=2) 결과
+    """
+
+    __slots__ = ("content_hash", "source_size", "compiled_at",
+                 "sheetnames", "values", "formulas", "frames")
+
+    def __init__(self, content_hash, source_size, sheetnames, values, formulas, frames):
+        self.content_hash = content_hash
+        self.source_size = source_size
+        self.compiled_at = time.time()
+        self.sheetnames = tuple(sheetnames)
+        self.values = values
+        self.formulas = formulas
+        self.frames = frames
+
+    def rows(self, sheet_name, max_col=None):
+        """시트 값 행 목록 (max_col 을 주면 그 폭에 맞춰 자르거나 None 으로 채움)"""
+        rows = self.values[sheet_name]
+        if max_col is None:
+            return rows
+        return [
+            values[:max_col] + (None,) * (max_col - len(values)) for values in rows
+        ]
+
+    def value(self, sheet_name, row, column):
+        """ws.cell(row, column).value 와 같은 계산된 값 (1부터 시작, 범위 밖이면 None)"""
+        rows = self.values[sheet_name]
+        if row < 1 or row > len(rows):
+            return None
+        values = rows[row - 1]
+        if column < 1 or column > len(values):
+            return None
+        return values[column - 1]
+
+    def formula(self, sheet_name, row, column):
+        """수식 원문 (수식이 없으면 상수 값)"""
+        rows = self.formulas[sheet_name]
+        if row < 1 or row > len(rows):
+            return None
+        values = rows[row - 1]
+        if column < 1 or column > len(values):
+            return None
+        return values[column - 1]
+
+    def column(self, sheet_name, column, min_row=1, formulas=False):
+        """한 열의 값 목록 (min_row 행부터, formulas=True 면 수식 원문 기준)"""
+        rows = (self.formulas if formulas else self.values)[sheet_name]
+        return [
+            values[column - 1] if column <= len(values) else None
+            for values in rows[min_row - 1:]
+        ]
+
+    def frame(self, sheet_name):
+        """pd.read_excel(path, sheet_name=..., header=2) 와 같은 DataFrame (복사본)"""
+        return self.frames[sheet_name].copy()
+
+
+def compile_snapshot(data):
+    """원본 엑셀 바이트로 스냅샷 생성 (해시와 파싱을 같은 바이트로 해서 중간에 파일이 바뀌어도 짝이 맞음)"""
+    sheetnames, values = _read_value_grid(data)
+    _, formulas = _read_formula_grid(data)
+    frames = pd.read_excel(io.BytesIO(data), sheet_name=None, header=FRAME_HEADER)
+    return SourceSnapshot(
+        content_hash=hashlib.sha256(data).hexdigest(),
+        source_size=len(data),
+        sheetnames=sheetnames,
+        values=values,
+        formulas=formulas,
+        frames=frames,
+    )
+
+
+def _snapshot_header(content_hash):
+    # DataFrame pickle 은 pandas 버전에 묶여 있으므로 버전도 함께 비교
+    return {"format": SNAPSHOT_FORMAT, "pandas": pd.__version__, "content_hash": content_hash}
+
+
+def load_snapshot_file(path, content_hash):
+    """저장된 스냅샷이 주어진 해시와 일치하면 반환, 없거나 다르면 None"""
+    try:
+        with open(path, "rb") as f:
+            if pickle.load(f) != _snapshot_header(content_hash):
+                return None
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"스냅샷 로드 실패, 다시 컴파일합니다 ({path}): {e}")
+        return None
+    if not isinstance(snapshot, SourceSnapshot) or snapshot.content_hash != content_hash:
+        return None
+    return snapshot
+
+
+def save_snapshot_file(path, snapshot):
+    """임시 파일에 쓴 뒤 교체 (여러 워커가 동시에 써도 읽는 쪽은 완성된 파일만 봄)"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(_snapshot_header(snapshot.content_hash), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        # 읽기 전용 배포 환경, 직렬화 실패 등 - 메모리 스냅샷만 사용
+        print(f"스냅샷 저장 실패 ({path}): {e}")
+        return False
+    finally:
+        # 교체에 성공했으면 이미 없는 파일
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+# 원본 파일 한 버전: (os.stat 서명, 스냅샷, 파생 데이터 dict, 원본 바이트)
+SourceVersion = namedtuple("SourceVersion", "signature snapshot derived data")
+
+# 감시 스레드 기본 확인 주기 (초) - CONA_SOURCE_WATCH_INTERVAL, 0 이면 끔
+DEFAULT_WATCH_INTERVAL = 2.0
+
+
+class SourceCache:
+    """원본 엑셀 스냅샷 캐시 (파일 내용 해시가 바뀌었을 때만 다시 컴파일)"""
+
+    def __init__(self, path=SOURCE_PATH, snapshot_path=None):
+        self.path = path
+        self.snapshot_path = snapshot_path or default_snapshot_path(path)
+        # _lock: 파생 데이터 만들기, _build_lock: 새 파일 버전 만들기 (한 번에 하나만)
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        # SourceVersion 을 한 번에 교체해서 읽는 쪽이 항상 짝이 맞는 값을 보도록 함
+        self._entry = None
+        # 새 버전을 만들 때 함께 미리 만들 파생 데이터 {이름: builder}
+        self._prewarm = {}
+        self._watcher = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.compiles = 0
+        self.snapshot_loads = 0
+        self.stale_hits = 0
+        self.last_build = None
+        self.last_error = None
+
+    def _stat_signature(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, force=False):
+        """
+        원본 바이트 해시 → 저장된 스냅샷 재사용, 없거나 다르면 컴파일 후 저장
+        → (스냅샷, 파생 데이터, 원본 바이트)
+        """
+        with open(self.path, "rb") as f:
+            data = f.read()
+        content_hash = hashlib.sha256(data).hexdigest()
+
+        entry = self._entry
+        if not force and entry is not None and entry.snapshot.content_hash == content_hash:
+            # mtime 만 바뀐 경우 (touch, 같은 내용으로 다시 복사 등)
+            return entry.snapshot, entry.derived, data
+
+        snapshot = None if force else load_snapshot_file(self.snapshot_path, content_hash)
+        if snapshot is not None:
+            self.snapshot_loads += 1
+        else:
+            snapshot = compile_snapshot(data)
+            self.compiles += 1
+            save_snapshot_file(self.snapshot_path, snapshot)
+        return snapshot, {}, data
+
+    def _build(self, signature, trigger, force=False):
+        """
+        새 파일 버전 만들기: 스냅샷 + 등록된 파생 데이터를 모두 만든 뒤 한 번에 교체.
+        _build_lock 안에서 호출한다. 만드는 동안 읽는 쪽은 이전 버전을 그대로 본다.
+        """
+        started = time.perf_counter()
+        previous = self._entry
+        snapshot, derived, data = self._load(force=force)
+        for name, builder in list(self._prewarm.items()):
+            if name not in derived:
+                derived[name] = builder(snapshot)
+        entry = SourceVersion(signature, snapshot, derived, data)
+        self._entry = entry
+
+        if previous is None:
+            self.misses += 1
+        elif snapshot is not previous.snapshot:
+            self.reloads += 1
+        self.last_build = {
+            "trigger": trigger,
+            "content_hash": snapshot.content_hash,
+            "mtime_ns": signature[0],
+            "size": signature[1],
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "finished_at": time.time(),
+        }
+        self.last_error = None
+        return entry
+
+    def current(self):
+        """
+        현재 파일 버전 (SourceVersion). 한 요청 안에서 스냅샷/파생 데이터/원본 바이트를
+        같은 버전으로 맞춰 쓰려면 이 값을 받아서 derive(..., version=) 에 넘긴다.
+        """
+        signature = self._stat_signature()
+        entry = self._entry
+        if entry is not None and entry.signature == signature:
+            self.hits += 1
+            return entry
+        if entry is not None and self.watching():
+            # 감시 스레드가 새 버전을 만들어 교체할 때까지 이전 버전으로 응답
+            self.stale_hits += 1
+            return entry
+
+        with self._build_lock:
+            # 다른 스레드가 먼저 로드했을 수 있으므로 잠금 안에서 다시 확인
+            entry = self._entry
+            if entry is not None and entry.signature == signature:
+                self.hits += 1
+                return entry
+            return self._build(signature, "request")
+
+    def get(self):
+        """현재 파일 버전에 해당하는 스냅샷 반환 (필요할 때만 컴파일)"""
+        return self.current().snapshot
+
+    def source_bytes(self, version=None):
+        """스냅샷을 만든 원본 xlsx 바이트 (파일이 교체되어도 스냅샷과 같은 버전)"""
+        return (version or self.current()).data
+
+    def warm(self):
+        """시작 시 미리 스냅샷을 준비 (원본이 없으면 경고만 출력)"""
+        try:
+            return self.get()
+        except OSError as e:
+            print(f"원본 엑셀을 읽을 수 없습니다 ({self.path}): {e}")
+            return None
+
+    def compile(self, force=False):
+        """스냅샷을 준비하고 파일로 저장 (CLI 용). force=True 면 해시와 관계없이 다시 컴파일"""
+        with self._build_lock:
+            return self._build(self._stat_signature(), "compile", force=force).snapshot
+
+    def refresh(self, trigger="refresh"):
+        """
+        원본 파일이 바뀌었으면 새 버전을 만들어 교체 (감시 스레드가 호출).
+        바뀌어서 새로 만들었으면 True
+        """
+        signature = self._stat_signature()
+        entry = self._entry
+        if entry is not None and entry.signature == signature:
+            return False
+        with self._build_lock:
+            entry = self._entry
+            if entry is not None and entry.signature == signature:
+                return False
+            self._build(signature, trigger)
+            return True
+
+    def register_prewarm(self, name, builder):
+        """
+        새 파일 버전을 만들 때 함께 미리 만들 파생 데이터 등록 (derive(name, builder) 와 같은 이름).
+        이미 로드된 버전에는 다음 교체 때부터 적용된다.
+        """
+        self._prewarm[name] = builder
+
+    def derive(self, name, builder, version=None):
+        """
+        현재 파일 버전(또는 version)의 스냅샷으로 만든 파생 데이터 반환.
+        builder(snapshot)는 파일 버전마다 한 번만 호출된다.
+        """
+        _, snapshot, derived, _ = version or self.current()
+        value = derived.get(name)
+        if value is None:
+            with self._lock:
+                value = derived.get(name)
+                if value is None:
+                    value = builder(snapshot)
+                    derived[name] = value
+        return value
+
+    def selector_index(self, version=None):
+        """현재 파일 버전의 선택 번호 인덱스"""
+        return self.derive("selector_index", build_selector_index, version)
+
+    def formula_model(self, version=None):
+        """
+        현재 파일 버전의 수식 계산 모델 (요청 사이에 공유하므로 수정할 때는 fork() 해서 사용)
+        """
+        return self.derive("formula_model", build_formula_model, version)
+
+    def invalidate(self):
+        """다음 get() 호출 시 원본 해시를 다시 확인하도록 캐시 비우기"""
+        with self._build_lock:
+            self._entry = None
+
+    #############################################
+    # 원본 파일 감시 (백그라운드 미리 준비)
+    #############################################
+
+    def watching(self):
+        return self._watcher is not None and self._watcher.is_alive()
+
+    def start_watcher(self, interval=DEFAULT_WATCH_INTERVAL):
+        """원본 파일 감시 스레드 시작 (이미 실행 중이면 그대로 반환)"""
+        with self._lock:
+            if not self.watching():
+                self._watcher = SourceWatcher(self, interval)
+                self._watcher.start()
+            return self._watcher
+
+    def stop_watcher(self):
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.stop()
+            watcher.join()
+
+    def stats(self):
+        entry = self._entry
+        snapshot = entry.snapshot if entry else None
+        watcher = self._watcher
+        return {
+            "path": self.path,
+            "snapshot_path": self.snapshot_path,
+            "loaded": entry is not None,
+            "mtime_ns": entry.signature[0] if entry else None,
+            "size": entry.signature[1] if entry else None,
+            "content_hash": snapshot.content_hash if snapshot else None,
+            "compiled_at": snapshot.compiled_at if snapshot else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "compiles": self.compiles,
+            "snapshot_loads": self.snapshot_loads,
+            "stale_hits": self.stale_hits,
+            "prewarm": sorted(self._prewarm),
+            "last_build": self.last_build,
+            "last_error": self.last_error,
+            "watcher": watcher.stats() if watcher is not None else None,
+        }
+
+
+class SourceWatcher(threading.Thread):
+    """
+    원본 파일의 mtime/크기를 주기적으로 확인해서 바뀌었으면 새 버전을 백그라운드에서 준비.
+    복사 중인 파일을 읽지 않도록 두 번 연속 같은 서명을 본 뒤에 만든다.
+    만들다 실패하면 이전 버전을 계속 쓰고, 같은 서명으로는 다시 시도하지 않는다.
+    """
+
+    def __init__(self, cache, interval=DEFAULT_WATCH_INTERVAL):
+        super().__init__(name="source-watcher", daemon=True)
+        self.cache = cache
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._pending = None
+        self._failed = None
+        self.checks = 0
+        self.builds = 0
+        self.last_check = None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def check(self):
+        """한 번 확인 → 새 버전을 만들었으면 True"""
+        self.checks += 1
+        self.last_check = time.time()
+        try:
+            signature = self.cache._stat_signature()
+        except OSError:
+            return False   # 교체 중 잠시 없는 파일
+        entry = self.cache._entry
+        if entry is not None and entry.signature == signature:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            # 처음 본 서명: 다음 확인 때도 같으면 만듦
+            self._pending = signature
+            return False
+        if signature == self._failed:
+            return False
+        try:
+            built = self.cache.refresh(trigger="watcher")
+        except Exception as e:
+            self._failed = signature
+            self.cache.last_error = {"error": f"{type(e).__name__}: {e}", "at": time.time()}
+            print(f"원본 엑셀 새 버전 준비 실패 ({self.cache.path}): {e}")
+            return False
+        self._pending = None
+        self.builds += built
+        return built
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def stats(self):
+        return {
+            "running": self.is_alive(),
+            "interval": self.interval,
+            "checks": self.checks,
+            "builds": self.builds,
+            "last_check": self.last_check,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_source_cache(path=SOURCE_PATH):
+    """원본 경로별 프로세스 전역 캐시"""
+    key = os.path.abspath(path)
+    cache = _caches.get(key)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(key)
+            if cache is None:
+                cache = _caches[key] = SourceCache(path)
+    return cache
+
+
+def start_source_watcher(path=SOURCE_PATH, interval=None):
+    """
+    원본 파일 감시 시작 → SourceWatcher, 끈 경우 None
+    CONA_SOURCE_WATCH_INTERVAL(초, 기본 2, 0 이면 끔). Vercel 같은 서버리스 환경에서는
+    요청이 없을 때 스레드가 멈추므로 시작하지 않는다 (요청 시 확인하는 기존 방식 그대로).
+    """
+    if os.environ.get("VERCEL"):
+        return None
+    if interval is None:
+        interval = env_float("CONA_SOURCE_WATCH_INTERVAL", DEFAULT_WATCH_INTERVAL)
+    if interval <= 0:
+        return None
+    return get_source_cache(path).start_watcher(interval)
+
+
+# 원본 경로 → 감시 스레드를 시작한 프로세스 ID
+_watcher_pids = {}
+_watcher_pids_lock = threading.Lock()
+
+
+def ensure_source_watcher(path=SOURCE_PATH):
+    """
+    이 프로세스에서 아직 감시를 시작하지 않았으면 start_source_watcher 호출 (요청마다 불러도 됨)
+    import 할 때 스레드를 만들면 fork 하는 서버(gunicorn --preload 등)의 워커에는 스레드가 없으므로,
+    각 프로세스의 첫 요청에서 시작한다.
+    """
+    key = os.path.abspath(path)
+    pid = os.getpid()
+    if _watcher_pids.get(key) == pid:
+        return
+    with _watcher_pids_lock:
+        if _watcher_pids.get(key) != pid:
+            start_source_watcher(path)
+            _watcher_pids[key] = pid
+
+
+#############################################
+# 선택 번호 인덱스
+#############################################
+
+# 집계 시트: A~L (12개 컬럼), 대가/참조 시트: A~K (11개 컬럼)
+JIPGYE_COLUMNS = ('A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L')
+DAEGA_COLUMNS = JIPGYE_COLUMNS[:11]
+
+# number: 집계 A열 번호(문자열), letter: 집계 B열 선택문자
+# jipgye_values: 집계 행 A~L 값, daega_rows: ((행번호, A~K 값), ...)
+SelectorEntry = namedtuple(
+    "SelectorEntry",
+    "number letter jipgye_sheet jipgye_row jipgye_values daega_sheet daega_rows",
+)
+
+
+def _blank(value):
+    return '' if value is None else value
+
+
+def _number_key(value):
+    """집계 A열 값을 '1', '2' 같은 번호 문자열로 변환 (정수가 아니면 None)"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)) and float(value).is_integer():
+        return str(int(value))
+    if isinstance(value, str) and value.strip().isdigit():
+        return str(int(value.strip()))
+    return None
+
+
+def _block_sheet_names(snapshot):
+    """대가/참조 블록을 찾을 시트 목록 (이름에 '대가'/'참조'가 있는 시트 우선)"""
+    names = [name for name in snapshot.sheetnames if '대가' in name or '참조' in name]
+    if not names:
+        names = list(snapshot.sheetnames[1:] or snapshot.sheetnames[:1])
+    return names
+
+
+def _scan_blocks(sheet_rows):
+    """
+    대가/참조 시트에서 B열 선택문자로 시작하는 블록을 찾는다.
+    블록은 선택문자 행부터 C열이 '계'인 행까지 (빈 행이나 다음 선택문자가 나오면 종료).
+    """
+    blocks = {}
+    letter = None
+    rows = []
+
+    for row_num, values in enumerate(sheet_rows, start=1):
+        values = tuple(_blank(v) for v in values)
+        has_data = any(v != '' for v in values)
+        marker = str(values[1]).strip().upper() if values[1] != '' else ''
+
+        if marker and letter is not None:
+            blocks.setdefault(letter, tuple(rows))
+            letter = None
+        if marker:
+            letter, rows = marker, []
+
+        if letter is None:
+            continue
+        if not has_data:
+            blocks.setdefault(letter, tuple(rows))
+            letter = None
+            continue
+
+        rows.append((row_num, values))
+        if str(values[2]).strip() == '계':
+            blocks.setdefault(letter, tuple(rows))
+            letter = None
+
+    if letter is not None:
+        blocks.setdefault(letter, tuple(rows))
+    return blocks
+
+
+class SelectorIndex:
+    """집계 시트의 (번호, 선택문자) → 집계 행 / 대가·참조 행 범위 인덱스"""
+
+    def __init__(self, entries):
+        self.by_number = {}
+        self.by_letter = {}
+        for entry in entries:
+            self.by_number.setdefault(entry.number, entry)
+            self.by_letter.setdefault(entry.letter, entry)
+
+    def resolve(self, code):
+        """번호('1') 또는 선택문자('A')로 항목 조회. 없으면 None"""
+        code = str(code).strip()
+        number = _number_key(code)
+        if number is not None:
+            return self.by_number.get(number)
+        return self.by_letter.get(code.upper())
+
+    def __contains__(self, code):
+        return self.resolve(code) is not None
+
+    def __len__(self):
+        return len(self.by_number)
+
+    def numbers(self):
+        """사용 가능한 번호 목록 (숫자 순)"""
+        return sorted(self.by_number, key=int)
+
+
+def build_selector_index(snapshot):
+    """스냅샷 한 번 순회로 선택 번호 인덱스 생성"""
+    jipgye_sheet = snapshot.sheetnames[0]
+
+    blocks = {}
+    block_sheet = {}
+    for name in _block_sheet_names(snapshot):
+        for letter, rows in _scan_blocks(snapshot.rows(name, len(DAEGA_COLUMNS))).items():
+            if letter not in blocks:
+                blocks[letter] = rows
+                block_sheet[letter] = name
+
+    entries = []
+    for row_num, values in enumerate(snapshot.rows(jipgye_sheet, len(JIPGYE_COLUMNS)), start=1):
+        number = _number_key(values[0])
+        if number is None or values[1] is None or str(values[1]).strip() == '':
+            continue
+        letter = str(values[1]).strip().upper()
+        values = tuple(_blank(v) for v in values)
+        entries.append(SelectorEntry(
+            number=number,
+            letter=letter,
+            jipgye_sheet=jipgye_sheet,
+            jipgye_row=row_num,
+            jipgye_values=values,
+            daega_sheet=block_sheet.get(letter),
+            daega_rows=blocks.get(letter, ()),
+        ))
+    return SelectorIndex(entries)
+
+
+def build_formula_model(snapshot):
+    """스냅샷의 수식 원문으로 계산 모델 생성 (계산하지 못하는 수식은 저장된 값 사용)"""
+    return FormulaModel.from_grids(snapshot.sheetnames, snapshot.formulas, snapshot.values)
+
+
+# 프로세스 전역 캐시 (기본 원본 파일)
+source_cache = get_source_cache()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CON-A 원본 엑셀 스냅샷 컴파일")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compile_parser = sub.add_parser("compile", help="원본 엑셀을 스냅샷 파일로 컴파일")
+    compile_parser.add_argument("--source", default=SOURCE_PATH, help="원본 xlsx 경로")
+    compile_parser.add_argument("--output", default=None, help="스냅샷 파일 경로")
+    compile_parser.add_argument("--force", action="store_true", help="해시가 같아도 다시 컴파일")
+    args = parser.parse_args(argv)
+
+    cache = SourceCache(args.source, snapshot_path=args.output)
+    started = time.perf_counter()
+    snapshot = cache.compile(force=args.force)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    action = "컴파일" if cache.compiles else "기존 스냅샷 사용"
+    print(f"{action}: {cache.snapshot_path} ({elapsed_ms:.1f}ms)")
+    print(f"  sha256={snapshot.content_hash}")
+    for name in snapshot.sheetnames:
+        print(f"  {name}: {len(snapshot.values[name])}행")
+    return 0
+
+
+if __name__ == "__main__":
+    # pickle 에 __main__.SourceSnapshot 이 아닌 con_a_source.SourceSnapshot 으로 저장되도록
+    # 모듈 이름으로 다시 불러와서 실행
+    from con_a_source import main as _main
+    sys.exit(_main())
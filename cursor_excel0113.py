@@ -1,98 +1,243 @@
-from io import BytesIO
 from typing import List
 
+import io
+import math
+
+import numpy as np
 import pandas as pd
 import openpyxl
-from openpyxl.utils import get_column_letter
-from flask import Flask, render_template, request, send_file
+from openpyxl.utils import column_index_from_string, get_column_letter
+from flask import Flask, Response, jsonify, render_template, request
+
+from con_a_source import build_formula_model, ensure_source_watcher, get_source_cache
+from formula_engine import ExcelError
+from xlsx_stream import XLSX_MIMETYPE, attachment_headers, iter_saved_workbook
+from xlsx_patch import KEEP_FORMULA, CellPatch, PatchNotPossible, XlsxPatch
+from xlsx_table import column_labels
 
 app = Flask(__name__)
 
+# 숫자를 선택문자로 매핑: 1 → A, 2 → B
+CHAR_MAPPING = {
+    '1': 'A',
+    '2': 'B',
+}
+
+# 한 번에 조회할 수 있는 선택문자 최대 개수 (범위를 펼친 뒤 기준)
+MAX_SELECTORS = 500
+
+# 가/나/다 원본 값(D/F/H열) 키와 열 번호
+ORIGINAL_KEYS = (('가', '_가_원본'), ('나', '_나_원본'), ('다', '_다_원본'))
+ORIGINAL_COLUMNS = {'_가_원본': 4, '_나_원본': 6, '_다_원본': 8}
+
+# 다운로드 시 다시 계산하는 결과 칸: (결과 열 번호, 원본 열) - E=C×D, G=C×F, I=C×H
+RESULT_COLUMNS = ((5, 'D'), (7, 'F'), (9, 'H'))
+
+def resolve_selected_char(selected_input):
+    """입력값이 숫자면 선택문자로 변환, 아니면 그대로 사용"""
+    return CHAR_MAPPING.get(selected_input, selected_input)
+
+
+def _selector_range(first, last):
+    """범위 "D-F" / "1-3" → 선택문자 목록, 범위가 아니면 None"""
+    if first.isdigit() and last.isdigit():
+        start, end = int(first), int(last)
+        to_values = lambda: [str(n) for n in range(start, end + 1)]
+    elif first.isascii() and first.isalpha() and last.isascii() and last.isalpha():
+        try:
+            start, end = column_index_from_string(first.upper()), column_index_from_string(last.upper())
+        except ValueError:
+            return None
+        to_values = lambda: list(column_labels(end - start + 1, start))
+    else:
+        return None
+    if end < start:
+        raise ValueError(f"범위가 잘못되었습니다: {first}-{last}")
+    if end - start >= MAX_SELECTORS:
+        raise ValueError(f"한 번에 조회할 수 있는 선택문자는 {MAX_SELECTORS}개까지입니다: {first}-{last}")
+    return to_values()
+
+
+def parse_selectors(selected_input):
+    """
+    선택문자 입력 → 선택문자 목록 (입력 순서, 대소문자 구분 없이 중복 제거)
+    쉼표로 여러 개를 받고 "D-F" 같은 문자 범위, "1-3" 같은 번호 범위는 펼친다.
+    번호는 resolve_selected_char 로 선택문자로 바꾼다.
+    잘못된 범위거나 MAX_SELECTORS 개를 넘으면 ValueError
+    """
+    selectors = {}
+    for token in str(selected_input or "").split(","):
+        token = token.strip()
+        if not token:
+            continue
+        first, sep, last = token.partition("-")
+        values = _selector_range(first.strip(), last.strip()) if sep else None
+        for value in values or [token]:
+            selector = resolve_selected_char(value)
+            selectors.setdefault(selector.upper(), selector)
+        if len(selectors) > MAX_SELECTORS:
+            raise ValueError(f"한 번에 조회할 수 있는 선택문자는 {MAX_SELECTORS}개까지입니다.")
+    return list(selectors.values())
+
 
 def load_excel_sheets(path: str) -> List[str]:
     """
     CON-A DB1.xlsx에 존재하는 시트 이름 목록을 반환한다.
     """
-    xls = pd.ExcelFile(path)
-    return xls.sheet_names
+    return list(get_source_cache(path).get().sheetnames)
+
+
+def _original_number(value):
+    """D/F/H열 계산 값 → 숫자 (빈 칸/숫자가 아닌 값은 0)"""
+    try:
+        return float(value) if value else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def build_sheet_frames(snapshot):
+    """
+    시트별 조회용 데이터 (원본 버전마다 한 번 만듦)
+    {시트: (header=2 DataFrame 에서 빈 행을 뺀 것, 같은 인덱스의 원본 행 번호/D·F·H 계산 값 DataFrame)}
+    요청 사이에 공유하므로 수정하지 않고 필터링한 새 DataFrame 만 만들어 쓴다.
+    """
+    frames = {}
+    for sheet_name in snapshot.sheetnames:
+        try:
+            df = snapshot.frame(sheet_name).dropna(how='all')
+        except Exception as e:
+            print(f"시트 {sheet_name} 로드 오류: {e}")
+            continue
+        # 헤더가 3번째 행이므로 DataFrame 인덱스 0 = 원본 4행
+        actual_rows = [int(label) + 4 for label in df.index]
+        extra = pd.DataFrame({'_행': actual_rows}, index=df.index)
+        for key, col in ORIGINAL_COLUMNS.items():
+            if len(df.columns) > col - 1:
+                extra[key] = [_original_number(snapshot.value(sheet_name, r, col)) for r in actual_rows]
+        frames[sheet_name] = (df, extra)
+    return frames
+
+
+def normalize_selector(values):
+    """선택문자 비교용 정규화 (문자열, 앞뒤 공백 제거, 대문자) - pandas Series"""
+    return values.astype(str).str.strip().str.upper()
+
+
+def build_selector_rows(frames):
+    """
+    선택문자 역색인 {정규화한 B열 값: {시트: 행 위치 배열}}
+    행 위치는 sheet_frames() DataFrame 의 iloc 위치 (시트 안에서 원본 순서)
+    """
+    index = {}
+    for sheet_name, (df, _) in frames.items():
+        if len(df.columns) <= 1:
+            continue
+        keys = normalize_selector(df.iloc[:, 1])
+        for key, positions in pd.Series(range(len(keys))).groupby(keys.values).indices.items():
+            index.setdefault(key, {})[sheet_name] = positions
+    return index
+
+
+def _build_cursor_source(snapshot):
+    frames = build_sheet_frames(snapshot)
+    # 시트별 {원본 행 번호: iloc 위치} - 행 ID 로 바로 찾기
+    row_positions = {
+        sheet_name: {row_idx: position for position, row_idx in enumerate(extra['_행'].tolist())}
+        for sheet_name, (_, extra) in frames.items()
+    }
+    return frames, build_selector_rows(frames), row_positions
+
+
+def _cursor_source(path, version=None):
+    """
+    현재 파일 버전(또는 version)의 (시트별 조회용 데이터, 선택문자 역색인, 행 번호 → 위치)
+    같은 버전에서 함께 만듦
+    """
+    return get_source_cache(path).derive("cursor_sheet_frames", _build_cursor_source, version)
+
 
+def row_id(sheet_name, row_idx):
+    """원본 행의 고정 ID "시트!행번호" (예: "대가!7") - 조회 순서와 관계없이 같은 행"""
+    return f"{sheet_name}!{row_idx}"
 
-def query_data_multi_sheet(selected_char: str):
+
+def sheet_frames(path="data/CON-A DB1.xlsx"):
+    """현재 파일 버전의 시트별 조회용 데이터 (build_sheet_frames)"""
+    return _cursor_source(path)[0]
+
+
+def select_rows(selectors, path="data/CON-A DB1.xlsx", version=None):
+    """
+    선택문자(B열)에 해당하는 행 → [(시트, DataFrame, 부가 DataFrame), ...] 시트 순서대로
+    selectors 는 선택문자 하나(str) 또는 목록. 여러 개면 시트마다 원본 행 순서로 합친다.
+    역색인으로 찾으므로 전체 행 수가 아니라 찾은 행 수만큼만 처리한다.
+    선택문자가 없으면(또는 B열이 없는 시트는) 모든 행.
+    """
+    if isinstance(selectors, str):
+        selectors = [selectors] if selectors else []
+    frames, index, _ = _cursor_source(path, version)
+    if not selectors:
+        return [(sheet_name, df, extra) for sheet_name, (df, extra) in frames.items()]
+    # 대소문자 구분 없이 비교
+    matches = [index.get(key, {}) for key in dict.fromkeys(str(s).strip().upper() for s in selectors)]
+    selected = []
+    for sheet_name, (df, extra) in frames.items():
+        if len(df.columns) > 1:
+            found = [match[sheet_name] for match in matches if sheet_name in match]
+            if len(found) == 1:
+                positions = found[0]
+            else:
+                positions = np.unique(np.concatenate(found)) if found else []
+            df, extra = df.iloc[positions], extra.iloc[positions]
+        selected.append((sheet_name, df, extra))
+    return selected
+
+
+def query_data_multi_sheet(selected_char):
     """
     선택문자를 기준으로 집계와 대가 시트에서 데이터를 조회한다.
     원본 파일을 그대로 불러와서 표시한다.
+    selected_char 는 "A,B,D-F" 같은 입력(parse_selectors) 또는 선택문자 목록.
     """
-    excel_path = "data/CON-A DB1.xlsx"
-    
-    # 모든 시트에서 데이터 조회
+    if isinstance(selected_char, str):
+        selected_char = parse_selectors(selected_char)
+
+    # 모든 시트에서 데이터 조회 (시트별 DataFrame 과 D/F/H 계산 값은 파일 버전마다 한 번만 읽음)
     all_rows = []
-    sheet_names = load_excel_sheets(excel_path)
     
-    # 계산된 값을 가져오기 위해 data_only=True로 읽기
-    wb_data = openpyxl.load_workbook(excel_path, data_only=True)
-    
-    for sheet_name in sheet_names:
+    for sheet_name, df, extra in select_rows(selected_char):
         try:
-            # 헤더 행이 3번째 행(인덱스 2)에 있으므로 header=2로 설정
-            df = pd.read_excel(excel_path, sheet_name=sheet_name, header=2)
-            df = df.dropna(how='all')
-            
-            # 선택문자 필터링 (B열, 인덱스 1 = 두 번째 컬럼)
-            # 대소문자 구분 없이 비교
-            if selected_char and len(df.columns) > 1:
-                char_col = df.columns[1]  # B열
-                selected_char_upper = str(selected_char).strip().upper()
-                df = df[df[char_col].astype(str).str.strip().str.upper() == selected_char_upper]
+            # 열 이름(A, B, C ...)은 시트마다 한 번만 만듦
+            labels = column_labels(len(df.columns))
+            originals = [key for key in ('_가_원본', '_나_원본', '_다_원본') if key in extra.columns]
             
-            ws_data = wb_data[sheet_name]
-            
-            # 각 행을 처리 - 원본 구조 그대로
-            for idx, (_, row) in enumerate(df.iterrows()):
+            # 각 행을 처리 - 원본 구조 그대로 (iterrows 대신 값 튜플로 순회)
+            for row, actual_row_idx, original in zip(df.itertuples(index=False, name=None),
+                                                     extra['_행'].tolist(),
+                                                     extra[originals].itertuples(index=False, name=None)):
                 new_row = {}
                 new_row['시트'] = sheet_name
                 
-                # 원본 파일의 실제 행 번호 (헤더가 3번째 행이므로 +3)
-                actual_row_idx = idx + 4  # pandas 인덱스 + 헤더 3행 + 1
+                # 행 ID (시트!원본 행 번호) - 숫자 입력 키로 사용
+                new_row['_행ID'] = row_id(sheet_name, actual_row_idx)
                 
                 # 모든 컬럼을 원본 그대로 저장 (A, B, C, D, E, F, G, H, I, J, K...)
-                for col_idx in range(len(df.columns)):
-                    col_letter = get_column_letter(col_idx + 1)
-                    cell_value = row.iloc[col_idx] if col_idx < len(row) else ''
-                    new_row[col_letter] = cell_value
+                new_row.update(zip(labels, row))
                 
                 # 행번호 (A열)
-                if len(df.columns) > 0:
-                    new_row['행번호'] = row.iloc[0] if pd.notna(row.iloc[0]) else ''
+                if len(labels) > 0:
+                    new_row['행번호'] = row[0] if pd.notna(row[0]) else ''
                 
                 # 선택문자 (B열)
-                if len(df.columns) > 1:
-                    new_row['선택문자'] = row.iloc[1] if pd.notna(row.iloc[1]) else ''
+                if len(labels) > 1:
+                    new_row['선택문자'] = row[1] if pd.notna(row[1]) else ''
                 
                 # 숫자 (C열) - 입력 가능하게 하기 위해 별도 저장
-                if len(df.columns) > 2:
-                    new_row['숫자'] = row.iloc[2] if pd.notna(row.iloc[2]) else ''
-                
-                # 원본 값 저장 (D, F, H열의 계산된 값)
-                if len(df.columns) > 3:
-                    d_cell = ws_data.cell(row=actual_row_idx, column=4)
-                    try:
-                        new_row['_가_원본'] = float(d_cell.value) if d_cell.value else 0
-                    except:
-                        new_row['_가_원본'] = 0
+                if len(labels) > 2:
+                    new_row['숫자'] = row[2] if pd.notna(row[2]) else ''
                 
-                if len(df.columns) > 5:
-                    f_cell = ws_data.cell(row=actual_row_idx, column=6)
-                    try:
-                        new_row['_나_원본'] = float(f_cell.value) if f_cell.value else 0
-                    except:
-                        new_row['_나_원본'] = 0
-                
-                if len(df.columns) > 7:
-                    h_cell = ws_data.cell(row=actual_row_idx, column=8)
-                    try:
-                        new_row['_다_원본'] = float(h_cell.value) if h_cell.value else 0
-                    except:
-                        new_row['_다_원본'] = 0
+                # 원본 값 저장 (D, F, H열의 계산된 값 - 원본 행 번호 기준)
+                new_row.update(zip(originals, original))
                 
                 all_rows.append(new_row)
         except Exception as e:
@@ -106,6 +251,106 @@ def query_data_multi_sheet(selected_char: str):
     return result_df
 
 
+def _blank_to_zero(col):
+    """빈 칸(NaN)과 빈 문자열을 0으로"""
+    return col.where(col.notna() & ~col.eq(''), 0)
+
+
+def _to_float(col):
+    """
+    열 전체를 float 로 변환 → (값, 변환 실패 마스크)
+    pd.to_numeric 으로 한 번에 바꾸고, 숫자로 읽히지 않은 칸만 float() 로 다시 확인
+    """
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype(float), pd.Series(False, index=col.index)
+    col = col.astype(object)
+    numbers = pd.to_numeric(col, errors='coerce').astype(float)
+    failed = numbers.isna()
+    for label in col.index[failed]:
+        try:
+            numbers[label] = float(col[label])
+            failed[label] = False
+        except (TypeError, ValueError):
+            pass
+    return numbers, failed
+
+
+def _sum_columns(first, second):
+    """
+    두 열 합계 (예: 가열 = D + E) → (합계 열, 원본 열)
+    숫자로 바꿀 수 없는 칸이 있는 행은 "d + e" 문자열, 원본 값은 0
+    """
+    first_blank, second_blank = first.eq(''), second.eq('')
+    first_num, first_failed = _to_float(_blank_to_zero(first))
+    second_num, second_failed = _to_float(_blank_to_zero(second))
+    failed = first_failed | second_failed
+
+    total = first_num + second_num
+    original = first_num
+    # 빈 문자열/변환 실패 칸은 정수 0 (열 전체가 그런 경우 정수 열로 표시됨)
+    total_zero = ~failed & first_blank & second_blank
+    if total_zero.all():
+        total = total.astype(int)
+    if (failed | first_blank).all():
+        original = original.where(~failed, 0).astype(int)
+    if failed.any():
+        total = total.astype(object)
+        total[total_zero] = 0
+        # 빈 칸은 0, 빈 문자열은 그대로 표시
+        first, second = first[failed].astype(object), second[failed].astype(object)
+        total[failed] = (first.where(first.notna(), 0).map(str) + " + "
+                         + second.where(second.notna(), 0).map(str))
+        original = original.where(~failed, 0)
+    return total, original
+
+
+def consolidate_columns(df, sheet_name):
+    """
+    시트 DataFrame → 가열(D+E)/나열(F+G)/다열(H+I)/합계(J) 로 통합한 표시용 DataFrame
+    (행 단위 반복 없이 열 단위로 계산)
+    """
+    if df.empty:
+        return pd.DataFrame()
+    # 모든 열이 숫자 열이면 행 단위로 읽을 때처럼 공통 타입(float 등)으로 맞춤
+    row_dtype = df.iloc[0].dtype
+    if row_dtype != object:
+        df = df.astype(row_dtype)
+
+    def column(position):
+        if len(df.columns) > position:
+            col = df.iloc[:, position]
+            return col.astype(object).where(col.notna(), '')
+        return pd.Series('', index=df.index)
+
+    result = pd.DataFrame({
+        '시트': sheet_name,
+        '행번호': column(0),
+        '선택문자': column(1),
+        '숫자': column(2),
+    }, index=df.index)
+    for name, original_name, position in (('가열', '_가_원본', 3), ('나열', '_나_원본', 5), ('다열', '_다_원본', 7)):
+        if len(df.columns) > position + 1:
+            result[name], result[original_name] = _sum_columns(df.iloc[:, position], df.iloc[:, position + 1])
+    # 합계: J
+    if len(df.columns) > 9:
+        result['합계'] = column(9)
+    # 행 dict 로 만든 DataFrame 과 같은 열 타입이 되도록 object 열 타입 추론
+    for name in result.columns:
+        if result[name].dtype == object:
+            result[name] = result[name].infer_objects()
+    return result.reset_index(drop=True)
+
+
+def consolidated_frame(sheet_name, path="data/CON-A DB1.xlsx"):
+    """현재 파일 버전의 시트별 통합 DataFrame (시트마다 처음 요청할 때 한 번 계산)"""
+    cache = get_source_cache(path).derive("cursor_consolidated", lambda snapshot: {})
+    frame = cache.get(sheet_name)
+    if frame is None:
+        df, _ = sheet_frames(path)[sheet_name]
+        frame = cache[sheet_name] = consolidate_columns(df, sheet_name)
+    return frame
+
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     excel_path = "data/CON-A DB1.xlsx"
@@ -130,81 +375,25 @@ def index():
     # 선택문자 입력 시 모든 시트에서 조회
     selected_input = request.form.get("selected_char", "").strip()
     
-    # 숫자를 선택문자로 매핑: 1 → A, 2 → B
-    char_mapping = {
-        '1': 'A',
-        '2': 'B',
-    }
-    
-    # 입력값이 숫자면 선택문자로 변환, 아니면 그대로 사용
-    if selected_input in char_mapping:
-        selected_char = char_mapping[selected_input]
-    else:
-        selected_char = selected_input
+    # 쉼표로 여러 개, 범위(D-F, 1-3) 입력 가능. 숫자는 선택문자로 변환
+    error = None
+    try:
+        selectors = parse_selectors(selected_input)
+    except ValueError as e:
+        selectors = []
+        error = str(e)
+    selected_char = ",".join(selectors)
     
     # 선택문자가 있으면 모든 시트에서 조회, 없으면 첫 번째 시트만 표시
     if selected_char:
-        # 선택문자가 있으면 모든 시트에서 조회하고 컬럼 통합
-        df = query_data_multi_sheet(selected_char)
+        # 선택문자가 있으면 모든 시트에서 한 번에 조회하고 컬럼 통합
+        df = query_data_multi_sheet(selectors)
         current_sheet = "전체"
     else:
         # 선택문자가 없으면 첫 번째 시트만 표시하되 컬럼 통합 적용
         current_sheet = request.form.get("sheet_name") or sheet_names[0]
-        df = pd.read_excel(excel_path, sheet_name=current_sheet, header=2)
-        df = df.dropna(how='all')
-        
         # 컬럼 통합: E, G, I, K 열 삭제하고 D+E를 가열, F+G를 나열, H+I를 다열로 통합
-        result_rows = []
-        for _, row in df.iterrows():
-            new_row = {}
-            new_row['시트'] = current_sheet
-            new_row['행번호'] = row.iloc[0] if len(df.columns) > 0 and pd.notna(row.iloc[0]) else ''
-            new_row['선택문자'] = row.iloc[1] if len(df.columns) > 1 and pd.notna(row.iloc[1]) else ''
-            new_row['숫자'] = row.iloc[2] if len(df.columns) > 2 and pd.notna(row.iloc[2]) else ''
-            
-            # 가열: D+E
-            if len(df.columns) > 4:
-                d_val = row.iloc[3] if pd.notna(row.iloc[3]) else 0
-                e_val = row.iloc[4] if pd.notna(row.iloc[4]) else 0
-                try:
-                    d_num = float(d_val) if d_val != '' else 0
-                    new_row['가열'] = d_num + float(e_val) if e_val != '' else d_num
-                    new_row['_가_원본'] = d_num
-                except:
-                    new_row['가열'] = f"{d_val} + {e_val}"
-                    new_row['_가_원본'] = 0
-            
-            # 나열: F+G
-            if len(df.columns) > 6:
-                f_val = row.iloc[5] if pd.notna(row.iloc[5]) else 0
-                g_val = row.iloc[6] if pd.notna(row.iloc[6]) else 0
-                try:
-                    f_num = float(f_val) if f_val != '' else 0
-                    new_row['나열'] = f_num + float(g_val) if g_val != '' else f_num
-                    new_row['_나_원본'] = f_num
-                except:
-                    new_row['나열'] = f"{f_val} + {g_val}"
-                    new_row['_나_원본'] = 0
-            
-            # 다열: H+I
-            if len(df.columns) > 8:
-                h_val = row.iloc[7] if pd.notna(row.iloc[7]) else 0
-                i_val = row.iloc[8] if pd.notna(row.iloc[8]) else 0
-                try:
-                    h_num = float(h_val) if h_val != '' else 0
-                    new_row['다열'] = h_num + float(i_val) if i_val != '' else h_num
-                    new_row['_다_원본'] = h_num
-                except:
-                    new_row['다열'] = f"{h_val} + {i_val}"
-                    new_row['_다_원본'] = 0
-            
-            # 합계: J
-            if len(df.columns) > 9:
-                new_row['합계'] = row.iloc[9] if pd.notna(row.iloc[9]) else ''
-            
-            result_rows.append(new_row)
-        
-        df = pd.DataFrame(result_rows)
+        df = consolidated_frame(current_sheet, excel_path)
 
     # 템플릿으로 넘길 데이터 준비
     rows = df.to_dict(orient="records")
@@ -245,10 +434,16 @@ def index():
         columns=columns,
         column_labels=column_labels,
         sheet_groups=sheet_groups,
-        error=None,
+        error=error,
     )
 
 
+@app.route("/cache/status")
+def cache_status():
+    """원본 캐시 상태 (현재 버전 해시, 마지막 준비 시간, 감시 스레드)"""
+    return jsonify(get_source_cache("data/CON-A DB1.xlsx").stats())
+
+
 @app.route("/download", methods=["POST"])
 def download():
     """
@@ -260,107 +455,251 @@ def download():
     if not selected_input:
         return "선택문자를 입력해주세요.", 400
 
-    # 숫자를 선택문자로 매핑: 1 → A, 2 → B
-    char_mapping = {
-        '1': 'A',
-        '2': 'B',
-    }
-    
-    # 입력값이 숫자면 선택문자로 변환, 아니면 그대로 사용
-    if selected_input in char_mapping:
-        selected_char = char_mapping[selected_input]
-    else:
-        selected_char = selected_input
+    # 쉼표로 여러 개, 범위(D-F, 1-3) 입력 가능 - 조회한 선택문자 전체를 한 파일로 다운로드
+    try:
+        selectors = parse_selectors(selected_input)
+    except ValueError as e:
+        return str(e), 400
 
     # 웹에서 입력한 숫자 값들을 받아옴 (JSON 형식)
     import json
     number_values_json = request.form.get("number_values", "{}")
     try:
         number_values = json.loads(number_values_json)
-    except:
+    except (TypeError, ValueError):
+        number_values = {}
+    if not isinstance(number_values, dict):
         number_values = {}
 
     excel_path = "data/CON-A DB1.xlsx"
+    source = get_source_cache(excel_path)
+    # 조회용 데이터, 수식 모델, 원본 바이트를 모두 같은 파일 버전으로 사용
+    version = source.current()
     
-    # 원본 엑셀 파일을 그대로 복사 (아무것도 건드리지 않음)
-    wb = openpyxl.load_workbook(excel_path, data_only=False)
+    # 수식 계산 모델 (원본 버전마다 한 번 만든 모델을 복사해서 수정)
+    model = source.formula_model(version).fork()
     
-    # 계산된 값을 가져오기 위해 data_only=True로도 읽기
-    wb_data = openpyxl.load_workbook(excel_path, data_only=True)
+    # 키 형식: 행 ID "시트!행번호" (예전 형식 "시트명_행인덱스" 도 받음) → 원본 행 번호
+    try:
+        edits, _ = resolve_edits(selectors, number_values, excel_path, version)
+    except ValueError as e:
+        return str(e), 400
+    
+    # 수정한 칸과 그 칸을 참조하는 수식(계 행, 합계, 다른 시트 참조)만 다시 계산
+    input_values, input_formulas = edit_inputs(edits)
+    changed = model.update(values=input_values, formulas=input_formulas)
     
-    # 각 시트 처리
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        ws_data = wb_data[sheet_name]  # 계산된 값을 가져오기 위한 시트
-        
-        # 헤더 행이 3번째 행이므로 데이터는 4번째 행부터
-        # 선택문자로 필터링된 행만 처리
-        matched_row_index = 0  # 웹에서 표시된 행 인덱스 (0부터 시작)
-        for row_idx in range(4, ws.max_row + 1):
-            # B열(컬럼 2)이 선택문자
-            char_cell = ws.cell(row=row_idx, column=2)
-            if char_cell.value:
-                char_value = str(char_cell.value).strip().upper()
-                if char_value == selected_char.upper():
-                    # 웹에서 입력한 숫자 값 가져오기
-                    # 키 형식: "시트명_행인덱스" (0부터 시작)
-                    sheet_key = f"{sheet_name}_{matched_row_index}"
-                    if sheet_key in number_values:
-                        number_value = float(number_values[sheet_key])
-                        
-                        # C열(컬럼 3)이 숫자 칸 - 숫자 칸만 수정
-                        number_cell = ws.cell(row=row_idx, column=3)
-                        number_cell.value = number_value
-                        
-                        # D열(컬럼 4)이 가 원본 - 계산된 값 가져오기
-                        d_cell_data = ws_data.cell(row=row_idx, column=4)
-                        try:
-                            d_value = float(d_cell_data.value) if d_cell_data.value else 0
-                        except:
-                            d_value = 0
-                        
-                        # E열(컬럼 5)에 가열 결과: 숫자 × D열 (원본 위치에 출력)
-                        e_cell = ws.cell(row=row_idx, column=5)
-                        e_cell.value = number_value * d_value
-                        
-                        # F열(컬럼 6)이 나 원본 - 계산된 값 가져오기
-                        f_cell_data = ws_data.cell(row=row_idx, column=6)
-                        try:
-                            f_value = float(f_cell_data.value) if f_cell_data.value else 0
-                        except:
-                            f_value = 0
-                        
-                        # G열(컬럼 7)에 나열 결과: 숫자 × F열 (원본 위치에 출력)
-                        g_cell = ws.cell(row=row_idx, column=7)
-                        g_cell.value = number_value * f_value
-                        
-                        # H열(컬럼 8)이 다 원본 - 계산된 값 가져오기
-                        h_cell_data = ws_data.cell(row=row_idx, column=8)
-                        try:
-                            h_value = float(h_cell_data.value) if h_cell_data.value else 0
-                        except:
-                            h_value = 0
-                        
-                        # I열(컬럼 9)에 다열 결과: 숫자 × H열 (원본 위치에 출력)
-                        i_cell = ws.cell(row=row_idx, column=9)
-                        i_cell.value = number_value * h_value
-                    
-                    matched_row_index += 1
-
-    # 메모리 버퍼에 엑셀 파일 저장
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-
     filename = "CON-A_result.xlsx"
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=filename,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    try:
+        # 원본 zip 을 그대로 복사하면서 바뀐 셀의 <c> 요소만 다시 씀 (서식 등 원본 기능 유지)
+        inputs = set(input_values) | set(input_formulas)
+        patch = XlsxPatch(version.data, _cell_patches(model, changed, inputs))
+        body = patch.iter_bytes()
+    except PatchNotPossible as e:
+        print(f"템플릿 패치 불가, openpyxl 로 저장합니다: {e}")
+        body = iter_saved_workbook(_patched_workbook(version.data, model, input_values, input_formulas))
+    
+    return Response(
+        body,
+        mimetype=XLSX_MIMETYPE,
+        headers=attachment_headers(filename),
     )
 
 
+def _editable_rows(selected):
+    """
+    조회 결과 [(시트, DataFrame, 부가 DataFrame)] → {시트: [원본 행 번호, ...]} (조회 순서)
+    소계('계') 행은 수량 칸이 아니므로 None 으로 둔다 (예전 형식 키의 순서는 유지).
+    """
+    rows = {}
+    for sheet_name, df, extra in selected:
+        actual_rows = extra['_행'].tolist()
+        if len(df.columns) > 2:
+            labels = df.iloc[:, 2].astype(str).str.strip().tolist()
+            actual_rows = [None if label == '계' else row for row, label in zip(actual_rows, labels)]
+        rows[sheet_name] = actual_rows
+    return rows
+
+
+def resolve_edits(selectors, number_values, path="data/CON-A DB1.xlsx", version=None):
+    """
+    웹에서 입력한 숫자 {키: 숫자} → ([(키, 시트, 원본 행 번호, 숫자)], 찾지 못한 키 목록)
+    키는 행 ID("시트!행번호")이고 수정한 행 수만큼만 처리한다.
+    예전 형식 "시트명_행인덱스"(selectors 조회 결과 안의 순서)도 받는다.
+    selectors 로 조회한 행(소계 행 제외)이 아닌 키는 수정하지 않고 찾지 못한 키로 돌려준다.
+    숫자가 아닌 값이 있으면 ValueError
+    """
+    selected = _editable_rows(select_rows(selectors, path, version))
+    allowed = {sheet_name: set(rows) - {None} for sheet_name, rows in selected.items()}
+    edits = []
+    unknown = []
+    for key, value in number_values.items():
+        key = str(key)
+        try:
+            number_value = float(value)
+        except (TypeError, ValueError):
+            number_value = math.nan
+        if not math.isfinite(number_value):
+            raise ValueError(f"{key}: 숫자가 아닙니다 ({value!r})")
+
+        sheet_name, sep, row = key.rpartition("!")
+        if sep:
+            if row.isdigit() and int(row) in allowed.get(sheet_name, ()):
+                edits.append((key, sheet_name, int(row), number_value))
+            else:
+                unknown.append(key)
+            continue
+        # 예전 형식: 조회 결과 안의 순서 → 원본 행 번호
+        sheet_name, sep, row_index = key.rpartition("_")
+        actual_rows = selected.get(sheet_name, ()) if sep and row_index.isdigit() else ()
+        if row_index.isdigit() and int(row_index) < len(actual_rows) and actual_rows[int(row_index)] is not None:
+            edits.append((key, sheet_name, actual_rows[int(row_index)], number_value))
+        else:
+            unknown.append(key)
+    return edits, unknown
+
+
+def edit_inputs(edits):
+    """
+    수정 목록 [(키, 시트, 원본 행 번호, 숫자)] → 수식 모델 입력 (입력 값, 입력 수식)
+    C열(컬럼 3)이 숫자 칸, E/G/I열(컬럼 5/7/9)에 가열/나열/다열 결과: 숫자 × D/F/H열
+    """
+    input_values = {}
+    input_formulas = {}
+    for _, sheet_name, row_idx, number_value in edits:
+        input_values[(sheet_name, row_idx, 3)] = number_value
+        for result_col, source_col in RESULT_COLUMNS:
+            input_formulas[(sheet_name, row_idx, result_col)] = f"={source_col}{row_idx}*C{row_idx}"
+    return input_values, input_formulas
+
+
+@app.route("/recalc", methods=["POST"])
+def recalc():
+    """
+    수량을 바꿨을 때의 가/나/다(숫자 × D/F/H열)와 행 합계를 JSON 으로 반환한다.
+    /download 와 같은 selected_char, number_values(행 ID "시트!행번호" → 숫자)를 받지만
+    워크북을 열거나 만들지 않고 캐시한 D/F/H 계산 값으로 시트 단위로 한 번에 계산한다.
+    """
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        selected_input = str(data.get("selected_char", "")).strip()
+        number_values = data.get("number_values") or {}
+    else:
+        import json
+        selected_input = request.form.get("selected_char", "").strip()
+        try:
+            number_values = json.loads(request.form.get("number_values", "{}"))
+        except ValueError:
+            return jsonify({"error": "number_values 는 JSON 이어야 합니다."}), 400
+
+    if not selected_input:
+        return jsonify({"error": "선택문자를 입력해주세요."}), 400
+    if not isinstance(number_values, dict):
+        return jsonify({"error": "number_values 는 {\"시트!행번호\": 숫자} 형식이어야 합니다."}), 400
+    try:
+        selectors = parse_selectors(selected_input)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    excel_path = "data/CON-A DB1.xlsx"
+    source = get_source_cache(excel_path)
+    version = source.current()
+    try:
+        edits, unknown = resolve_edits(selectors, number_values, excel_path, version)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # 다른 행/시트의 결과를 참조하는 D/F/H (예: 집계 D = 대가 계 행)는 다운로드와 같게
+    # 수식 모델에 입력을 반영해서 바뀐 칸만 덮어씀 (워크북은 열지 않음)
+    model = source.formula_model(version).fork()
+    input_values, input_formulas = edit_inputs(edits)
+    changed = model.update(values=input_values, formulas=input_formulas)
+
+    # 시트별 수정 목록
+    by_sheet = {}
+    for edit in edits:
+        by_sheet.setdefault(edit[1], []).append(edit)
+
+    frames, _, row_positions = _cursor_source(excel_path, version)
+    rows = {}
+    sheets = {}
+    for sheet_name, sheet_edits in by_sheet.items():
+        extra = frames[sheet_name][1]
+        keys = [(name, column) for name, column in ORIGINAL_KEYS if column in extra.columns]
+        if not keys:
+            continue
+
+        # (수정한 행 수 × 가/나/다) 원본 값 행렬
+        positions = np.array([row_positions[sheet_name][row_idx] for _, _, row_idx, _ in sheet_edits])
+        quantities = np.array([number_value for _, _, _, number_value in sheet_edits])
+        originals = extra[[column for _, column in keys]].to_numpy(dtype=float)[positions]
+        for i, (_, _, row_idx, _) in enumerate(sheet_edits):
+            for j, (_, column) in enumerate(keys):
+                cell = (sheet_name, row_idx, ORIGINAL_COLUMNS[column])
+                if cell in changed:
+                    originals[i, j] = _original_number(model.value(*cell))
+
+        # × 숫자 열 벡터
+        products = originals * quantities[:, None]
+        totals = products.sum(axis=1)
+
+        names = [name for name, _ in keys]
+        for (key, _, _, _), values, total in zip(sheet_edits, products.tolist(), totals.tolist()):
+            rows[key] = dict(zip(names, values), 합계=total)
+        sheet_sums = products.sum(axis=0).tolist()
+        sheets[sheet_name] = dict(zip(names, sheet_sums), 합계=float(totals.sum()))
+
+    return jsonify({
+        "selected_char": ",".join(selectors),
+        "rows": rows,
+        "sheets": sheets,
+        "unknown": unknown,
+    })
+
+
+def _cell_patches(model, changed, inputs):
+    """
+    다시 계산한 결과 → 시트별 셀 패치
+    수정한 칸(C/E/G/I)은 계산한 값으로 덮어쓰고, 영향을 받은 나머지 수식 셀은 수식을 두고 저장 값만 갱신
+    """
+    sheet_patches = {}
+    for key in set(changed) | set(inputs):
+        sheet_name, row, col = key
+        value = model.value(sheet_name, row, col)
+        error = isinstance(value, ExcelError)
+        sheet_patches.setdefault(sheet_name, {})[(row, col)] = CellPatch(
+            str(value) if error else value,
+            None if key in inputs else KEEP_FORMULA,
+            error,
+        )
+    return sheet_patches
+
+
+def _patched_workbook(source_bytes, model, input_values, input_formulas):
+    """템플릿 패치를 할 수 없을 때: openpyxl 로 원본을 열어 C/E/G/I 칸에 값 반영"""
+    wb = openpyxl.load_workbook(io.BytesIO(source_bytes), data_only=False)
+    for sheet_name, row_idx, col in list(input_values) + list(input_formulas):
+        value = model.value(sheet_name, row_idx, col)
+        wb[sheet_name].cell(row=row_idx, column=col).value = (
+            str(value) if isinstance(value, ExcelError) else value
+        )
+    return wb
+
+
+# 시작 시 원본 엑셀 스냅샷 준비 (이후 요청은 스냅샷만 읽음)
+# 원본 파일이 바뀌면 감시 스레드가 조회용 데이터까지 미리 만든 뒤 교체 (요청은 이전 버전으로 응답)
+_source = get_source_cache("data/CON-A DB1.xlsx")
+_source.register_prewarm("cursor_sheet_frames", _build_cursor_source)
+_source.register_prewarm("formula_model", build_formula_model)
+_source.warm()
+
+
+@app.before_request
+def _ensure_source_watcher():
+    # 감시 스레드는 import 시점이 아니라 프로세스(워커)마다 첫 요청에서 시작
+    ensure_source_watcher("data/CON-A DB1.xlsx")
+
+
 if __name__ == "__main__":
     # 개발 편의를 위해 debug 모드 사용 (배포 시 False로 변경)
     try:
@@ -0,0 +1,591 @@
+"""
+CON-A 워크북 수식 계산
+
+엑셀이 저장해 둔 계산 값(data_only=True)에만 기대지 않고, 원본 DB 가 쓰는 수식 범위
+(사칙연산/거듭제곱, SUM, 다른 시트 참조 '대가!E5')를 직접 계산한다.
+셀 사이의 의존 관계 그래프를 만들어 두고, 입력이 바뀌면 영향을 받는 셀만 다시 계산한다.
+
+    model = FormulaModel.from_grids(snapshot.sheetnames, snapshot.formulas, snapshot.values)
+    edited = model.fork()
+    edited.update(values={("대가", 3, 3): 2})     # 대가!C3 = 2
+    edited.value("집계", 4, 4)                     # =대가!E5 → 다시 계산된 값
+
+지원하지 않는 수식은 저장된 계산 값을 그대로 상수처럼 사용한다 (model.unsupported 에 기록).
+"""
+import re
+
+from openpyxl.utils import column_index_from_string
+
+
+class ExcelError:
+    """#VALUE!, #DIV/0! 같은 엑셀 오류 값"""
+
+    __slots__ = ("code",)
+
+    def __init__(self, code):
+        self.code = code
+
+    def __eq__(self, other):
+        return isinstance(other, ExcelError) and other.code == self.code
+
+    def __hash__(self):
+        return hash(self.code)
+
+    def __repr__(self):
+        return self.code
+
+    __str__ = __repr__
+
+
+VALUE_ERROR = ExcelError("#VALUE!")
+DIV0_ERROR = ExcelError("#DIV/0!")
+REF_ERROR = ExcelError("#REF!")
+NAME_ERROR = ExcelError("#NAME?")
+CYCLE_ERROR = ExcelError("#CYCLE!")
+
+_ERROR_CODES = {e.code: e for e in (VALUE_ERROR, DIV0_ERROR, REF_ERROR, NAME_ERROR)}
+_ERROR_CODES.update({code: ExcelError(code) for code in ("#N/A", "#NUM!", "#NULL!")})
+
+
+class UnsupportedFormula(ValueError):
+    """이 엔진이 계산하지 못하는 수식"""
+
+
+#############################################
+# 파싱
+#############################################
+
+_TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<sheet>(?:'(?:[^']|'')+'|[^\s!:()+\-*/^,&=<>'"%]+)!)
+  | (?P<func>[A-Za-z_][A-Za-z0-9_.]*(?=\())
+  | (?P<cell>\$?[A-Za-z]{1,3}\$?\d+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<string>"(?:[^"]|"")*")
+  | (?P<error>\#(?:VALUE!|DIV/0!|REF!|NAME\?|N/A|NUM!|NULL!))
+  | (?P<op>[-+*/^(),:%])
+""", re.VERBOSE)
+
+_CELL = re.compile(r"\$?([A-Za-z]{1,3})\$?(\d+)$")
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise UnsupportedFormula(f"해석할 수 없는 수식: {text!r} ({pos}번째 글자)")
+        kind = match.lastgroup
+        if kind != "ws":
+            tokens.append((kind, match.group()))
+        pos = match.end()
+    return tokens
+
+
+def _cell_position(ref):
+    match = _CELL.match(ref)
+    return int(match.group(2)), column_index_from_string(match.group(1).upper())
+
+
+class _Parser:
+    """
+    재귀 하강 파서 → AST 튜플
+    ('num', v) ('str', s) ('err', e) ('ref', sheet, row, col) ('range', sheet, r1, c1, r2, c2)
+    ('neg', x) ('pct', x) ('bin', op, a, b) ('call', name, args)
+    """
+
+    def __init__(self, text, sheet):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.sheet = sheet
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _next(self):
+        token = self._peek()
+        self.pos += 1
+        return token
+
+    def _expect(self, value):
+        kind, text = self._next()
+        if text != value:
+            raise UnsupportedFormula(f"'{value}' 가 필요합니다 (받은 값: {text!r})")
+
+    def parse(self):
+        node = self._additive()
+        if self.pos != len(self.tokens):
+            raise UnsupportedFormula(f"지원하지 않는 연산자: {self._peek()[1]!r}")
+        return node
+
+    def _additive(self):
+        node = self._term()
+        while self._peek() in (("op", "+"), ("op", "-")):
+            op = self._next()[1]
+            node = ("bin", op, node, self._term())
+        return node
+
+    def _term(self):
+        node = self._power()
+        while self._peek() in (("op", "*"), ("op", "/")):
+            op = self._next()[1]
+            node = ("bin", op, node, self._power())
+        return node
+
+    def _power(self):
+        node = self._unary()
+        while self._peek() == ("op", "^"):
+            self._next()
+            node = ("bin", "^", node, self._unary())
+        return node
+
+    def _unary(self):
+        # 엑셀은 단항 마이너스가 ^ 보다 먼저 적용됨 (-2^2 = 4)
+        if self._peek() == ("op", "-"):
+            self._next()
+            return ("neg", self._unary())
+        if self._peek() == ("op", "+"):
+            self._next()
+            return self._unary()
+        node = self._primary()
+        while self._peek() == ("op", "%"):
+            self._next()
+            node = ("pct", node)
+        return node
+
+    def _reference(self, sheet):
+        kind, text = self._next()
+        if kind != "cell":
+            raise UnsupportedFormula(f"셀 참조가 필요합니다 (받은 값: {text!r})")
+        row, col = _cell_position(text)
+        if self._peek() == ("op", ":"):
+            self._next()
+            kind, text = self._next()
+            if kind != "cell":
+                raise UnsupportedFormula(f"범위 끝 셀이 필요합니다 (받은 값: {text!r})")
+            row2, col2 = _cell_position(text)
+            return ("range", sheet, min(row, row2), min(col, col2), max(row, row2), max(col, col2))
+        return ("ref", sheet, row, col)
+
+    def _primary(self):
+        kind, text = self._peek()
+        if kind == "number":
+            self._next()
+            value = float(text)
+            return ("num", int(value) if value.is_integer() else value)
+        if kind == "string":
+            self._next()
+            return ("str", text[1:-1].replace('""', '"'))
+        if kind == "error":
+            self._next()
+            return ("err", _ERROR_CODES[text.upper()])
+        if kind == "sheet":
+            self._next()
+            name = text[:-1]
+            if name.startswith("'"):
+                name = name[1:-1].replace("''", "'")
+            return self._reference(name)
+        if kind == "cell":
+            return self._reference(self.sheet)
+        if kind == "func":
+            self._next()
+            name = text.upper()
+            if name not in FUNCTIONS:
+                raise UnsupportedFormula(f"지원하지 않는 함수: {name}")
+            self._expect("(")
+            args = []
+            if self._peek() != ("op", ")"):
+                args.append(self._additive())
+                while self._peek() == ("op", ","):
+                    self._next()
+                    args.append(self._additive())
+            self._expect(")")
+            return ("call", name, tuple(args))
+        if (kind, text) == ("op", "("):
+            self._next()
+            node = self._additive()
+            self._expect(")")
+            return node
+        raise UnsupportedFormula(f"예상하지 못한 값: {text!r}")
+
+
+def _check_ranges(node, in_call=False):
+    # 범위(A1:B3)는 SUM 같은 함수 인수로만 허용
+    kind = node[0]
+    if kind == "range" and not in_call:
+        raise UnsupportedFormula("범위는 함수 인수로만 사용할 수 있습니다")
+    if kind in ("neg", "pct"):
+        _check_ranges(node[1])
+    elif kind == "bin":
+        _check_ranges(node[2])
+        _check_ranges(node[3])
+    elif kind == "call":
+        for arg in node[2]:
+            _check_ranges(arg, in_call=True)
+
+
+def parse_formula(text, sheet):
+    """'=D4*C4' 같은 수식 → AST (sheet: 시트 이름 없는 참조가 가리킬 시트)"""
+    if not isinstance(text, str) or not text.startswith("="):
+        raise UnsupportedFormula(f"수식이 아닙니다: {text!r}")
+    ast = _Parser(text[1:], sheet).parse()
+    _check_ranges(ast)
+    return ast
+
+
+def _precedents(node, out):
+    kind = node[0]
+    if kind == "ref":
+        out.add((node[1], node[2], node[3]))
+    elif kind == "range":
+        _, sheet, r1, c1, r2, c2 = node
+        for row in range(r1, r2 + 1):
+            for col in range(c1, c2 + 1):
+                out.add((sheet, row, col))
+    elif kind in ("neg", "pct"):
+        _precedents(node[1], out)
+    elif kind == "bin":
+        _precedents(node[2], out)
+        _precedents(node[3], out)
+    elif kind == "call":
+        for arg in node[2]:
+            _precedents(arg, out)
+    return out
+
+
+#############################################
+# 계산
+#############################################
+
+def _to_number(value):
+    """산술 연산용 숫자 변환 (빈 칸 = 0, 숫자 문자열 허용, 그 밖의 문자열은 #VALUE!)"""
+    if value is None:
+        return 0
+    if isinstance(value, ExcelError):
+        return value
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.strip()) if value.strip() else VALUE_ERROR
+        except ValueError:
+            return VALUE_ERROR
+    return VALUE_ERROR
+
+
+def _normalize(value):
+    # 정수로 떨어지는 결과는 int 로 (openpyxl 이 엑셀 계산 값을 읽는 모양과 같게)
+    if isinstance(value, float):
+        if value != value or value in (float("inf"), float("-inf")):
+            return _ERROR_CODES["#NUM!"]
+        if value.is_integer() and abs(value) < 2 ** 53:
+            return int(value)
+    return value
+
+
+def _binary(op, a, b):
+    a = _to_number(a)
+    if isinstance(a, ExcelError):
+        return a
+    b = _to_number(b)
+    if isinstance(b, ExcelError):
+        return b
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if op == "/":
+        return DIV0_ERROR if b == 0 else a / b
+    try:
+        return float(a) ** b
+    except (OverflowError, ZeroDivisionError, ValueError):
+        return _ERROR_CODES["#NUM!"]
+
+
+def _fn_sum(args):
+    total = 0
+    for is_range, value in args:
+        if is_range:
+            # 범위 안의 문자열/논리값/빈 칸은 무시
+            for item in value:
+                if isinstance(item, ExcelError):
+                    return item
+                if isinstance(item, (int, float)) and not isinstance(item, bool):
+                    total += item
+        else:
+            number = _to_number(value)
+            if isinstance(number, ExcelError):
+                return number
+            total += number
+    return total
+
+
+# 함수 이름 → fn([(범위 여부, 값 또는 값 목록), ...])
+FUNCTIONS = {
+    "SUM": _fn_sum,
+}
+
+
+def _evaluate(node, get):
+    kind = node[0]
+    if kind in ("num", "str", "err"):
+        return node[1]
+    if kind == "ref":
+        return get(node[1], node[2], node[3])
+    if kind == "neg":
+        value = _to_number(_evaluate(node[1], get))
+        return value if isinstance(value, ExcelError) else -value
+    if kind == "pct":
+        value = _to_number(_evaluate(node[1], get))
+        return value if isinstance(value, ExcelError) else value / 100
+    if kind == "bin":
+        return _binary(node[1], _evaluate(node[2], get), _evaluate(node[3], get))
+    if kind == "call":
+        args = []
+        for arg in node[2]:
+            if arg[0] == "range":
+                _, sheet, r1, c1, r2, c2 = arg
+                args.append((True, [
+                    get(sheet, row, col)
+                    for row in range(r1, r2 + 1) for col in range(c1, c2 + 1)
+                ]))
+            else:
+                args.append((False, _evaluate(arg, get)))
+        return FUNCTIONS[node[1]](args)
+    raise UnsupportedFormula(f"계산할 수 없는 노드: {kind}")
+
+
+class _Formula:
+    __slots__ = ("text", "ast", "precedents")
+
+    def __init__(self, text, ast, precedents):
+        self.text = text
+        self.ast = ast
+        self.precedents = precedents
+
+
+class FormulaModel:
+    """
+    셀 값/수식과 의존 관계 그래프
+    셀 키는 (시트 이름, 행, 열) - 행/열은 1부터
+    """
+
+    def __init__(self, sheetnames):
+        self.sheetnames = tuple(sheetnames)
+        # 수식 안의 시트 이름은 대소문자 구분 없이 찾음
+        self._sheet_lookup = {name.lower(): name for name in self.sheetnames}
+        self.inputs = {}        # 상수 셀
+        self.formulas = {}      # 수식 셀 → _Formula
+        self.unsupported = {}   # 계산하지 못한 수식 → 원문 (저장된 값을 상수로 사용)
+        self.dependents = {}    # 셀 → 그 셀을 참조하는 수식 셀 집합
+        self.values = {}        # 계산된 값
+        self._shared_graph = False
+
+    @classmethod
+    def from_grids(cls, sheetnames, formulas, cached_values=None):
+        """
+        snapshot.formulas(수식 원문 행 목록)로 모델 생성 후 전체 계산.
+        cached_values 는 지원하지 않는 수식 셀의 값으로 사용한다.
+        """
+        model = cls(sheetnames)
+        for sheet in model.sheetnames:
+            cached_rows = cached_values.get(sheet, ()) if cached_values else ()
+            for row_num, values in enumerate(formulas.get(sheet, ()), start=1):
+                for col_num, value in enumerate(values, start=1):
+                    if value is None:
+                        continue
+                    key = (sheet, row_num, col_num)
+                    if isinstance(value, str) and value.startswith("="):
+                        try:
+                            model._add_formula(key, value)
+                        except UnsupportedFormula:
+                            cached = None
+                            if row_num <= len(cached_rows) and col_num <= len(cached_rows[row_num - 1]):
+                                cached = cached_rows[row_num - 1][col_num - 1]
+                            model.unsupported[key] = value
+                            model.inputs[key] = cached
+                    else:
+                        model.inputs[key] = value
+        model.recalculate()
+        return model
+
+    #############################################
+    # 그래프
+    #############################################
+
+    def _resolve_sheet(self, name):
+        return self._sheet_lookup.get(name.lower())
+
+    def _compile(self, key, text):
+        ast = parse_formula(text, key[0])
+        precedents = set()
+        for sheet, row, col in _precedents(ast, set()):
+            resolved = self._resolve_sheet(sheet)
+            if resolved is None:
+                # 없는 시트 참조 → #REF!
+                return _Formula(text, ("err", REF_ERROR), frozenset())
+            precedents.add((resolved, row, col))
+        ast = self._resolve_ast(ast)
+        return _Formula(text, ast, frozenset(precedents))
+
+    def _resolve_ast(self, node):
+        kind = node[0]
+        if kind == "ref":
+            return ("ref", self._resolve_sheet(node[1]), node[2], node[3])
+        if kind == "range":
+            return ("range", self._resolve_sheet(node[1])) + node[2:]
+        if kind in ("neg", "pct"):
+            return (kind, self._resolve_ast(node[1]))
+        if kind == "bin":
+            return ("bin", node[1], self._resolve_ast(node[2]), self._resolve_ast(node[3]))
+        if kind == "call":
+            return ("call", node[1], tuple(self._resolve_ast(arg) for arg in node[2]))
+        return node
+
+    def _own_graph(self):
+        # fork() 한 모델은 처음 그래프를 바꿀 때 복사 (그 전까지는 원본과 공유)
+        if self._shared_graph:
+            self.formulas = dict(self.formulas)
+            self.dependents = {key: set(cells) for key, cells in self.dependents.items()}
+            self.unsupported = dict(self.unsupported)
+            self._shared_graph = False
+
+    def _add_formula(self, key, text):
+        formula = self._compile(key, text)
+        self._remove_formula(key)
+        self.formulas[key] = formula
+        self.inputs.pop(key, None)
+        self.unsupported.pop(key, None)
+        for precedent in formula.precedents:
+            self.dependents.setdefault(precedent, set()).add(key)
+
+    def _remove_formula(self, key):
+        formula = self.formulas.pop(key, None)
+        if formula is None:
+            return
+        for precedent in formula.precedents:
+            cells = self.dependents.get(precedent)
+            if cells is not None:
+                cells.discard(key)
+
+    def _order(self, cells):
+        """수식 셀 목록을 참조 순서대로 정렬 (순환 참조 셀은 따로 반환)"""
+        order = []
+        state = {}      # 1: 방문 중, 2: 완료
+        cyclic = set()
+        for start in cells:
+            if state.get(start):
+                continue
+            stack = [(start, iter(self.formulas[start].precedents))]
+            state[start] = 1
+            while stack:
+                key, children = stack[-1]
+                for child in children:
+                    if child not in self.formulas or child not in cells:
+                        continue
+                    if state.get(child) == 1:
+                        cyclic.add(child)
+                        cyclic.add(key)
+                        continue
+                    if not state.get(child):
+                        state[child] = 1
+                        stack.append((child, iter(self.formulas[child].precedents)))
+                        break
+                else:
+                    stack.pop()
+                    state[key] = 2
+                    order.append(key)
+        return order, cyclic
+
+    #############################################
+    # 계산
+    #############################################
+
+    def _get(self, sheet, row, col):
+        key = (sheet, row, col)
+        if key in self.values:
+            return self.values[key]
+        return self.inputs.get(key)
+
+    def _calculate(self, cells):
+        order, cyclic = self._order(cells)
+        changed = {}
+        for key in order:
+            if key in cyclic:
+                value = CYCLE_ERROR
+            else:
+                value = _normalize(_evaluate(self.formulas[key].ast, self._get))
+                if value is None:
+                    # 빈 칸만 참조하는 수식은 엑셀처럼 0
+                    value = 0
+            if key not in self.values or self.values[key] != value:
+                changed[key] = value
+            self.values[key] = value
+        return changed
+
+    def recalculate(self):
+        """모든 수식 다시 계산"""
+        self.values = dict(self.inputs)
+        return self._calculate(set(self.formulas))
+
+    def _affected(self, keys):
+        """keys 가 바뀌었을 때 다시 계산해야 하는 수식 셀 (전이적 참조 포함)"""
+        affected = set()
+        pending = list(keys)
+        while pending:
+            key = pending.pop()
+            for dependent in self.dependents.get(key, ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    pending.append(dependent)
+        return affected
+
+    def update(self, values=None, formulas=None):
+        """
+        values: {(시트, 행, 열): 상수}, formulas: {(시트, 행, 열): '=수식'}
+        바뀐 셀과 그 셀에 의존하는 수식만 다시 계산하고 {셀: 새 값} 반환
+        """
+        touched = set()
+        if formulas:
+            self._own_graph()
+            for key, text in formulas.items():
+                self._add_formula(key, text)
+                touched.add(key)
+        for key, value in (values or {}).items():
+            if key in self.formulas or key in self.unsupported:
+                self._own_graph()
+                self._remove_formula(key)
+                self.unsupported.pop(key, None)
+            self.inputs[key] = value
+            self.values[key] = value
+            touched.add(key)
+
+        cells = self._affected(touched) | {key for key in touched if key in self.formulas}
+        changed = {key: self.values[key] for key in (values or {})}
+        changed.update(self._calculate(cells))
+        return changed
+
+    def value(self, sheet, row, col):
+        """셀 값 (수식이면 계산된 값, 빈 칸이면 None)"""
+        return self._get(sheet, row, col)
+
+    def fork(self):
+        """
+        값만 복사한 작업용 모델 (파싱된 수식과 그래프는 바꾸기 전까지 공유)
+        원본 모델은 요청 사이에 공유하고, 요청마다 fork 해서 수정한다.
+        """
+        other = FormulaModel.__new__(FormulaModel)
+        other.sheetnames = self.sheetnames
+        other._sheet_lookup = self._sheet_lookup
+        other.inputs = dict(self.inputs)
+        other.formulas = self.formulas
+        other.unsupported = self.unsupported
+        other.dependents = self.dependents
+        other.values = dict(self.values)
+        other._shared_graph = True
+        return other
@@ -0,0 +1,216 @@
+"""
+세션 결과 CSV / JSONL / Parquet 내보내기
+
+다른 시스템으로 다시 가져갈 용도라면 xlsx 를 만들었다가 다시 파싱할 필요가 없으므로,
+세션에 저장된 행 튜플을 그대로 행 단위 텍스트로 바꿔 조각이 만들어지는 대로 내보낸다.
+필드 이름과 열 위치는 호출하는 쪽이 fields [(필드 이름, 열 위치), ...] 로 정한다.
+Parquet 은 pyarrow 가 설치된 경우에만 지원한다 (선택 의존성).
+"""
+import csv
+import io
+import json
+import math
+import tempfile
+import zipfile
+from datetime import date, datetime, time
+
+from xlsx_stream import DEFAULT_CHUNK_SIZE, ChunkSink
+
+# 형식 → (mimetype, 확장자)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "csv.zip": ("application/zip", "zip"),
+    "jsonl": ("application/x-ndjson; charset=utf-8", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# JSONL / Parquet 에서 시트 이름을 담는 열
+SHEET_FIELD = "시트"
+
+
+class ExportUnavailable(RuntimeError):
+    """요청한 형식을 만들 수 없음 (선택 의존성 미설치 등)"""
+
+
+def _is_blank(value):
+    return value is None or value == ''
+
+
+def _project(values, fields):
+    """행 튜플에서 fields [(필드 이름, 열 위치), ...] 순서대로 값 목록"""
+    return [values[index] if index < len(values) else None for _, index in fields]
+
+
+def _text(value):
+    if _is_blank(value):
+        return ''
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _iter_csv_text(fields, rows, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([name for name, _ in fields])
+    for values in rows:
+        writer.writerow([_text(v) for v in _project(values, fields)])
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_csv(fields, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    한 시트를 UTF-8 CSV bytes 조각으로 생성 (1행은 필드 이름, 빈 칸은 빈 문자열)
+    fields: [(필드 이름, 행 튜플의 열 위치), ...]
+    """
+    for text in _iter_csv_text(fields, rows, chunk_size):
+        if text:
+            yield text.encode("utf-8")
+
+
+def iter_csv_zip(sheets, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    sheets: [(시트 이름, fields, 행 iterable), ...]
+    시트마다 '<시트 이름>.csv' 하나씩 담은 zip 파일을 bytes 조각으로 생성한다.
+    """
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, fields, rows in sheets:
+            with zf.open(f"{name}.csv", "w", force_zip64=True) as entry:
+                for text in _iter_csv_text(fields, rows, chunk_size):
+                    entry.write(text.encode("utf-8"))
+                    if sink.size >= chunk_size:
+                        yield sink.drain()
+            yield sink.drain()
+    # 중앙 디렉터리
+    yield sink.drain()
+
+
+def _json_value(value):
+    if _is_blank(value):
+        return None
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def iter_jsonl(sheets, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    sheets: [(시트 이름, fields, 행 iterable), ...]
+    행마다 {"시트": 시트 이름, 필드 이름: 값, ...} JSON 한 줄 (빈 칸은 null)
+    """
+    pending = []
+    pending_size = 0
+    for name, fields, rows in sheets:
+        names = [field for field, _ in fields]
+        for values in rows:
+            record = {SHEET_FIELD: name}
+            record.update(zip(names, (_json_value(v) for v in _project(values, fields))))
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            pending.append(line)
+            pending_size += len(line)
+            if pending_size >= chunk_size:
+                yield "".join(pending).encode("utf-8")
+                pending = []
+                pending_size = 0
+    if pending:
+        yield "".join(pending).encode("utf-8")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportUnavailable(
+            "Parquet 내보내기에는 pyarrow 패키지가 필요합니다. (pip install pyarrow)"
+        ) from None
+    return pyarrow, pyarrow.parquet
+
+
+def parquet_available():
+    try:
+        _require_pyarrow()
+    except ExportUnavailable:
+        return False
+    return True
+
+
+def _column_array(pa, values):
+    # 빈 칸을 뺀 값이 모두 숫자인 열만 숫자형, 나머지는 문자열 열
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return pa.array(values, type=pa.int64())
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return pa.array([None if v is None else float(v) for v in values], type=pa.float64())
+    return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def iter_parquet(sheets, chunk_size=DEFAULT_CHUNK_SIZE, spool_size=1024 * 1024):
+    """
+    sheets: [(시트 이름, fields, 행 iterable), ...]
+    모든 시트를 "시트" 열로 구분한 Parquet 파일 하나를 임시 파일(작으면 메모리)에 쓴 뒤 조각으로 내보낸다.
+    pyarrow 가 없으면 ExportUnavailable (응답을 시작하기 전에 확인하도록 생성 시점에 바로 발생).
+    """
+    pa, pq = _require_pyarrow()
+
+    # 시트마다 필드가 다르면 합친 목록 (그 시트에 없는 필드는 null)
+    names = []
+    for _, fields, _ in sheets:
+        for field, _ in fields:
+            if field not in names:
+                names.append(field)
+
+    columns = {SHEET_FIELD: []}
+    columns.update((field, []) for field in names)
+    for name, fields, rows in sheets:
+        missing = [field for field in names if field not in dict(fields)]
+        for values in rows:
+            columns[SHEET_FIELD].append(name)
+            for (field, _), value in zip(fields, _project(values, fields)):
+                columns[field].append(_json_value(value))
+            for field in missing:
+                columns[field].append(None)
+
+    table = pa.table({name: _column_array(pa, values) for name, values in columns.items()})
+    return _iter_spooled(lambda spool: pq.write_table(table, spool), chunk_size, spool_size)
+
+
+def _iter_spooled(write, chunk_size, spool_size):
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_size)
+    try:
+        write(spool)
+        spool.seek(0)
+        while True:
+            data = spool.read(chunk_size)
+            if not data:
+                break
+            yield data
+    finally:
+        spool.close()
+
+
+def iter_export(fmt, sheets, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    fmt 형식(EXPORT_FORMATS 의 키)으로 sheets [(시트 이름, fields, 행 iterable), ...] 를 bytes 조각으로 생성
+    csv 는 첫 시트 하나만 쓴다 (여러 시트는 csv.zip).
+    """
+    sheets = list(sheets)
+    if fmt == "csv":
+        if not sheets:
+            return iter(())
+        _, fields, rows = sheets[0]
+        return iter_csv(fields, rows, chunk_size)
+    if fmt == "csv.zip":
+        return iter_csv_zip(sheets, chunk_size)
+    if fmt == "jsonl":
+        return iter_jsonl(sheets, chunk_size)
+    if fmt == "parquet":
+        return iter_parquet(sheets, chunk_size)
+    raise ValueError(f"지원하지 않는 형식입니다: {fmt}")
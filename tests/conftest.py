@@ -0,0 +1,29 @@
+"""
+pytest 공통 설정
+
+저장소 루트의 모듈(xlsx_patch, formula_engine 등)을 패키지 설치 없이 가져오도록
+루트를 import 경로에 넣고, 원본 예제 워크북(data/CON-A DB1.xlsx)을 픽스처로 제공한다.
+
+    python -m pytest -q
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SAMPLE_PATH = os.path.join(ROOT, "data", "CON-A DB1.xlsx")
+
+
+@pytest.fixture(scope="session")
+def sample_path():
+    return SAMPLE_PATH
+
+
+@pytest.fixture(scope="session")
+def sample_bytes():
+    with open(SAMPLE_PATH, "rb") as f:
+        return f.read()
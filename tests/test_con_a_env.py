@@ -0,0 +1,40 @@
+"""con_a_env: 잘못된 환경 변수 값은 기본값으로"""
+import os
+import subprocess
+import sys
+
+from con_a_env import env_float, env_int
+
+
+def test_env_int(monkeypatch, capsys):
+    monkeypatch.delenv("CONA_TEST_VALUE", raising=False)
+    assert env_int("CONA_TEST_VALUE", 7) == 7
+    monkeypatch.setenv("CONA_TEST_VALUE", " 12 ")
+    assert env_int("CONA_TEST_VALUE", 7) == 12
+    monkeypatch.setenv("CONA_TEST_VALUE", "")
+    assert env_int("CONA_TEST_VALUE", 7) == 7
+    assert capsys.readouterr().out == ""
+
+    monkeypatch.setenv("CONA_TEST_VALUE", "64MB")
+    assert env_int("CONA_TEST_VALUE", 7) == 7
+    assert "CONA_TEST_VALUE" in capsys.readouterr().out
+
+
+def test_env_float(monkeypatch):
+    monkeypatch.setenv("CONA_TEST_VALUE", "0.5")
+    assert env_float("CONA_TEST_VALUE", 2.0) == 0.5
+    monkeypatch.setenv("CONA_TEST_VALUE", "fast")
+    assert env_float("CONA_TEST_VALUE", 2.0) == 2.0
+
+
+def test_modules_import_with_invalid_values():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, CONA_SESSION_MAX_BYTES="256MB", CONA_DOWNLOAD_CACHE_BYTES="x",
+               CONA_EXPORT_TTL="1h", CONA_EXPORT_WORKERS="two")
+    code = (
+        "import con_a_session, con_a_export;"
+        "print(con_a_session.DEFAULT_MAX_BYTES, con_a_export.DEFAULT_EXPORT_TTL)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == f"{256 * 1024 * 1024} 3600"
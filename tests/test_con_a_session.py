@@ -0,0 +1,215 @@
+"""con_a_session: 세션 저장 방식 (메모리 / SQLite)"""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from con_a_session import MemorySessionBackend, SessionResults, SessionStore, SQLiteSessionBackend
+
+ROW_A = (1, "A", 5, 2.5, 12.5, None, None, None, None, None, None, None)
+ROW_B = (2, "B", 10, 21, 210, None, None, None, None, None, None, "비고")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionBackend()
+    return SQLiteSessionBackend(str(tmp_path / "sessions.db"))
+
+
+def test_append_and_load(backend):
+    assert backend.load("s1") is None
+    assert backend.head("s1") is None
+    assert backend.version("s1") == 0
+
+    assert backend.append("s1", {"대가": [ROW_A], "집계": []}) == 1
+    assert backend.append("s1", {"대가": [ROW_B], "집계": [ROW_A]}) == 2
+
+    results = backend.load("s1")
+    assert results.version == 2
+    assert list(results.sheets) == ["대가", "집계"]
+    assert results.sheets["대가"] == [ROW_A, ROW_B]
+    assert results.sheets["집계"] == [ROW_A]
+    assert backend.sheet_counts("s1") == (2, {"대가": 2, "집계": 1})
+    # 다른 세션과 섞이지 않음
+    assert backend.load("s2") is None
+
+
+def test_load_is_a_snapshot(backend):
+    backend.append("s1", {"대가": [ROW_A]})
+    results = backend.load("s1")
+    backend.append("s1", {"대가": [ROW_B], "집계": [ROW_A]})
+    # 불러온 뒤 추가된 행은 이미 불러온 결과에 들어가지 않음
+    assert results.version == 1
+    assert results.sheets == {"대가": [ROW_A]}
+    assert backend.load("s1").sheets["대가"] == [ROW_A, ROW_B]
+
+
+def test_epoch_kept_until_session_is_recreated(backend):
+    backend.append("s1", {"대가": [ROW_A]})
+    version, updated_at, epoch = backend.head("s1")
+    assert version == 1 and epoch
+    assert updated_at <= time.time()
+
+    backend.append("s1", {"대가": [ROW_B]})
+    assert backend.head("s1")[2] == epoch
+    assert backend.clear("s1") is True
+    assert backend.head("s1") == (3, pytest.approx(time.time(), abs=5), epoch)
+    assert backend.load("s1").epoch == epoch
+
+    backend.append("s2", {"대가": [ROW_A]})
+    assert backend.head("s2")[2] != epoch
+
+
+def test_clear(backend):
+    assert backend.clear("s1") is False
+    backend.append("s1", {"대가": [ROW_A, ROW_B]})
+    assert backend.clear("s1") is True
+    results = backend.load("s1")
+    assert results.version == 2
+    assert results.sheets == {}
+    assert backend.sheet_counts("s1") == (2, {})
+
+    # 초기화한 뒤 다시 추가하면 행 번호가 처음부터
+    assert backend.append("s1", {"대가": [ROW_B]}) == 3
+    assert backend.page("s1", "대가", 0, 10) == (3, 1, [ROW_B])
+
+
+def test_page(backend):
+    rows = [(i,) + ROW_A[1:] for i in range(25)]
+    backend.append("s1", {"대가": rows[:10]})
+    backend.append("s1", {"대가": rows[10:]})
+    assert backend.page("s1", "대가", 0, 10) == (2, 25, rows[:10])
+    assert backend.page("s1", "대가", 20, 10) == (2, 25, rows[20:])
+    assert backend.page("s1", "대가", 30, 10) == (2, 25, [])
+    assert backend.page("s1", "집계", 0, 10) is None
+    assert backend.page("s2", "대가", 0, 10) is None
+
+
+#############################################
+# 메모리 저장소
+#############################################
+
+def test_store_mutate_remeasures_size():
+    store = SessionStore(sizeof=SessionResults.approx_size, max_entries=0, ttl_seconds=0, max_bytes=0)
+    assert store.mutate("s1", lambda results: results.append("대가", [ROW_A])) is None
+    assert store.view("s1", lambda results: results.version) is None
+    assert len(store) == 0
+
+    store.mutate("s1", lambda results: results.append("대가", [ROW_A]), factory=SessionResults)
+    before = store.resident_bytes
+    store.mutate("s1", lambda results: results.append("대가", [ROW_B] * 100))
+    assert store.resident_bytes > before
+    assert store.view("s1", lambda results: results.row_count("대가")) == 101
+
+
+def test_memory_budget_evicts_other_sessions():
+    store = SessionStore(sizeof=SessionResults.approx_size, max_entries=0, ttl_seconds=0,
+                         max_bytes=SessionResults().approx_size() * 3)
+    evicted = []
+    store.on_evict = evicted.append
+    backend = MemorySessionBackend(store)
+    backend.append("old", {"대가": [ROW_A]})
+    backend.append("new", {"대가": [ROW_A] * 1000})
+    assert evicted == ["old"]
+    assert backend.load("old") is None
+    assert backend.version("new") == 1
+
+
+#############################################
+# SQLite 전용
+#############################################
+
+def test_sqlite_shared_between_instances(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first = SQLiteSessionBackend(path)
+    second = SQLiteSessionBackend(path)
+    first.append("s1", {"대가": [ROW_A]})
+    second.append("s1", {"대가": [ROW_B]})
+    assert first.load("s1").sheets["대가"] == [ROW_A, ROW_B]
+    assert first.head("s1") == second.head("s1")
+    assert first.head("s1")[0] == 2
+
+
+def test_sqlite_concurrent_appends(tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path / "sessions.db"))
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(20):
+                backend.append("s1", {"대가": [(n, i) + ROW_A[2:]]})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    results = backend.load("s1")
+    assert results.version == 80
+    assert len(results.sheets["대가"]) == 80
+    assert len(set(results.sheets["대가"])) == 80
+
+
+def test_sqlite_purge_expired(tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path / "sessions.db"), ttl_seconds=60)
+    evicted = []
+    backend.set_evict_listener(evicted.append)
+    backend.append("old", {"대가": [ROW_A]})
+    backend.append("new", {"대가": [ROW_B]})
+    old_epoch = backend.head("old")[2]
+    backend._connect().execute("UPDATE cona_sessions SET updated_at = ? WHERE session_id = 'old'",
+                               (time.time() - 120,))
+
+    assert backend.purge_expired() == 1
+    assert evicted == ["old"]
+    assert backend.load("old") is None
+    assert backend.load("new").sheets["대가"] == [ROW_B]
+    assert backend.stats()["rows"] == 1
+
+    # 같은 세션 ID 로 다시 만들면 버전은 1부터, epoch 는 새 값
+    assert backend.append("old", {"대가": [ROW_A]}) == 1
+    assert backend.head("old")[2] != old_epoch
+
+
+def test_sqlite_purge_disabled(tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path / "sessions.db"), ttl_seconds=0)
+    backend.append("s1", {"대가": [ROW_A]})
+    backend._connect().execute("UPDATE cona_sessions SET updated_at = 0")
+    assert backend.purge_expired() == 0
+    assert backend.load("s1") is not None
+
+
+def test_sqlite_legacy_schema(tmp_path):
+    # epoch 열이 없고 sheets 에 시트 이름 목록만 저장하던 이전 파일
+    path = str(tmp_path / "sessions.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE cona_sessions (
+            session_id TEXT PRIMARY KEY, version INTEGER NOT NULL,
+            sheets TEXT NOT NULL, updated_at REAL NOT NULL
+        );
+        CREATE TABLE cona_session_rows (
+            session_id TEXT NOT NULL, sheet_name TEXT NOT NULL, seq INTEGER NOT NULL, data TEXT NOT NULL,
+            PRIMARY KEY (session_id, sheet_name, seq)
+        ) WITHOUT ROWID;
+        """
+    )
+    conn.execute("INSERT INTO cona_sessions VALUES ('s1', 3, '[\"대가\"]', ?)", (time.time(),))
+    conn.execute("INSERT INTO cona_session_rows VALUES ('s1', '대가', 0, '[1, \"A\"]')")
+    conn.commit()
+    conn.close()
+
+    backend = SQLiteSessionBackend(path)
+    assert backend.head("s1")[::2] == (3, "")
+    assert backend.sheet_counts("s1") == (3, {"대가": 1})
+    assert backend.load("s1").epoch == ""
+
+    assert backend.append("s1", {"대가": [ROW_B]}) == 4
+    assert backend.page("s1", "대가", 0, 10) == (4, 2, [(1, "A"), ROW_B])
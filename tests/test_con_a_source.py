@@ -0,0 +1,43 @@
+"""con_a_source: 원본 감시 스레드 시작 시점"""
+import os
+import shutil
+import threading
+
+import con_a_source
+from con_a_source import ensure_source_watcher, get_source_cache
+
+
+def _watchers():
+    return [t for t in threading.enumerate() if t.name == "source-watcher"]
+
+
+def test_watcher_starts_once_per_process(tmp_path, sample_path, monkeypatch):
+    monkeypatch.delenv("VERCEL", raising=False)
+    monkeypatch.setenv("CONA_SOURCE_WATCH_INTERVAL", "60")
+    path = str(tmp_path / "source.xlsx")
+    shutil.copy(sample_path, path)
+    cache = get_source_cache(path)
+    before = len(_watchers())
+    try:
+        ensure_source_watcher(path)
+        ensure_source_watcher(path)
+        assert cache.watching()
+        assert len(_watchers()) == before + 1
+
+        # fork 된 워커처럼 다른 프로세스에서 시작한 기록이면 다시 시작
+        watcher = cache._watcher
+        cache.stop_watcher()
+        con_a_source._watcher_pids[os.path.abspath(path)] = -1
+        ensure_source_watcher(path)
+        assert cache.watching()
+        assert cache._watcher is not watcher
+    finally:
+        cache.stop_watcher()
+
+
+def test_disabled_watcher(tmp_path, sample_path, monkeypatch):
+    monkeypatch.setenv("CONA_SOURCE_WATCH_INTERVAL", "0")
+    path = str(tmp_path / "source.xlsx")
+    shutil.copy(sample_path, path)
+    ensure_source_watcher(path)
+    assert not get_source_cache(path).watching()
@@ -0,0 +1,186 @@
+"""formula_engine: 파서, 의존 순서 계산, 순환 참조, fork()"""
+import io
+
+import openpyxl
+import pytest
+
+from formula_engine import (
+    CYCLE_ERROR, DIV0_ERROR, REF_ERROR, VALUE_ERROR, FormulaModel, UnsupportedFormula, parse_formula,
+)
+
+
+def _model(cells, sheetnames=("집계", "대가")):
+    """cells: {(시트, 행, 열): 값 또는 '=수식'} → FormulaModel"""
+    grids = {}
+    for (sheet, row, col), value in cells.items():
+        rows = grids.setdefault(sheet, [])
+        while len(rows) < row:
+            rows.append([])
+        values = rows[row - 1]
+        values.extend([None] * (col - len(values)))
+        values[col - 1] = value
+    return FormulaModel.from_grids(sheetnames, {name: [tuple(v) for v in rows] for name, rows in grids.items()})
+
+
+#############################################
+# 파서
+#############################################
+
+def test_parse_precedence():
+    assert parse_formula("=1+2*3", "S") == ("bin", "+", ("num", 1), ("bin", "*", ("num", 2), ("num", 3)))
+    # 단항 마이너스가 ^ 보다 먼저 (-2^2 = 4)
+    assert parse_formula("=-2^2", "S") == ("bin", "^", ("neg", ("num", 2)), ("num", 2))
+    assert parse_formula("=(1+2)*3", "S")[1] == "*"
+    assert parse_formula("=50%", "S") == ("pct", ("num", 50))
+
+
+def test_parse_references():
+    assert parse_formula("=$D$4*C4", "집계") == (
+        "bin", "*", ("ref", "집계", 4, 4), ("ref", "집계", 4, 3))
+    assert parse_formula("=대가!E5", "집계") == ("ref", "대가", 5, 5)
+    assert parse_formula("='It''s'!A1", "S") == ("ref", "It's", 1, 1)
+    assert parse_formula("=SUM(B3:A1)", "S") == ("call", "SUM", (("range", "S", 1, 1, 3, 2),))
+    assert parse_formula('="a""b"', "S") == ("str", 'a"b')
+    assert parse_formula("=#DIV/0!", "S") == ("err", DIV0_ERROR)
+
+
+@pytest.mark.parametrize("text", [
+    "D4*C4",            # '=' 없음
+    "=A1:B2",           # 함수 밖 범위
+    "=VLOOKUP(A1,B1:C2,2)",
+    "=A1&B1",
+    "=(1+2",
+    "=1+",
+])
+def test_parse_unsupported(text):
+    with pytest.raises(UnsupportedFormula):
+        parse_formula(text, "S")
+
+
+#############################################
+# 계산
+#############################################
+
+def test_arithmetic_and_errors():
+    model = _model({
+        ("집계", 1, 1): 4, ("집계", 1, 2): 0, ("집계", 1, 3): "abc", ("집계", 1, 4): " 2 ",
+        ("집계", 2, 1): "=A1/B1",
+        ("집계", 2, 2): "=A1+C1",
+        ("집계", 2, 3): "=A1*D1",
+        ("집계", 2, 4): "=Z99+1",          # 빈 칸 = 0
+        ("집계", 2, 5): "=A1/8",
+        ("집계", 2, 6): "=SUM(A1:D1, 1)",  # 범위 안의 문자열은 무시
+        ("집계", 2, 7): "=없는시트!A1",
+        ("집계", 2, 8): "=Z99",            # 빈 칸만 참조하면 0
+    })
+    assert model.value("집계", 2, 1) == DIV0_ERROR
+    assert model.value("집계", 2, 2) == VALUE_ERROR
+    assert model.value("집계", 2, 3) == 8
+    assert model.value("집계", 2, 4) == 1
+    assert model.value("집계", 2, 5) == 0.5
+    assert model.value("집계", 2, 6) == 5
+    assert model.value("집계", 2, 7) == REF_ERROR
+    assert model.value("집계", 2, 8) == 0
+
+
+def test_dependency_order():
+    # 참조하는 셀보다 먼저 나오는 수식도 순서대로 계산 (시트 이름은 대소문자 구분 없음)
+    model = _model({
+        ("집계", 1, 1): "=B1*2",
+        ("집계", 1, 2): "=대가!A1+1",
+        ("대가", 1, 1): "=대가!B1+C1",
+        ("대가", 1, 2): 3,
+        ("대가", 1, 3): 4,
+    })
+    assert model.value("대가", 1, 1) == 7
+    assert model.value("집계", 1, 2) == 8
+    assert model.value("집계", 1, 1) == 16
+
+    changed = model.update(values={("대가", 1, 3): 10})
+    assert changed == {("대가", 1, 3): 10, ("대가", 1, 1): 13, ("집계", 1, 2): 14, ("집계", 1, 1): 28}
+
+
+def test_update_only_recalculates_dependents():
+    model = _model({
+        ("집계", 1, 1): 1, ("집계", 1, 2): "=A1+1",
+        ("집계", 2, 1): 5, ("집계", 2, 2): "=A2+1",
+    })
+    changed = model.update(values={("집계", 1, 1): 2})
+    assert changed == {("집계", 1, 1): 2, ("집계", 1, 2): 3}
+    assert model.value("집계", 2, 2) == 6
+
+
+def test_cycles():
+    model = _model({
+        ("집계", 1, 1): "=B1+1",
+        ("집계", 1, 2): "=A1+1",
+        ("집계", 1, 3): 1,
+        ("집계", 1, 4): "=C1*2",
+    })
+    assert model.value("집계", 1, 1) == CYCLE_ERROR
+    assert model.value("집계", 1, 2) == CYCLE_ERROR
+    assert model.value("집계", 1, 4) == 2
+
+    # 수식을 상수로 바꾸면 순환이 풀림
+    model.update(values={("집계", 1, 2): 5})
+    assert model.value("집계", 1, 1) == 6
+
+
+def test_self_reference():
+    model = _model({("집계", 1, 1): "=A1+1"})
+    assert model.value("집계", 1, 1) == CYCLE_ERROR
+
+
+def test_unsupported_formula_uses_cached_value():
+    model = FormulaModel.from_grids(
+        ["S"], {"S": [("=VLOOKUP(1,B1:C2,2)", 3, "=A1+1")]}, {"S": [(42, 3, 43)]},
+    )
+    assert model.unsupported == {("S", 1, 1): "=VLOOKUP(1,B1:C2,2)"}
+    assert model.value("S", 1, 1) == 42
+    assert model.value("S", 1, 3) == 43
+
+
+#############################################
+# fork()
+#############################################
+
+def test_fork_leaves_original_untouched():
+    model = _model({
+        ("대가", 3, 3): 1, ("대가", 3, 4): 2, ("대가", 3, 5): "=D3*C3",
+        ("집계", 4, 4): "=대가!E3",
+    })
+    edited = model.fork()
+    edited.update(values={("대가", 3, 3): 5})
+    assert edited.value("집계", 4, 4) == 10
+    assert model.value("집계", 4, 4) == 2
+
+    # 수식 변경은 그래프를 복사한 뒤에만 적용
+    other = model.fork()
+    other.update(formulas={("집계", 4, 4): "=대가!E3*10"}, values={("대가", 3, 5): 7})
+    assert other.value("집계", 4, 4) == 70
+    assert model.formulas[("집계", 4, 4)].text == "=대가!E3"
+    assert ("대가", 3, 5) in model.formulas
+    assert model.value("집계", 4, 4) == 2
+
+    # 원본을 다시 fork 해도 앞의 수정이 섞이지 않음
+    again = model.fork()
+    again.update(values={("대가", 3, 4): 3})
+    assert again.value("집계", 4, 4) == 3
+
+
+def test_sample_workbook_matches_cached_values(sample_bytes):
+    formulas_wb = openpyxl.load_workbook(io.BytesIO(sample_bytes))
+    values_wb = openpyxl.load_workbook(io.BytesIO(sample_bytes), data_only=True)
+    grids = {ws.title: list(ws.iter_rows(values_only=True)) for ws in formulas_wb.worksheets}
+    cached = {ws.title: list(ws.iter_rows(values_only=True)) for ws in values_wb.worksheets}
+    model = FormulaModel.from_grids(formulas_wb.sheetnames, grids, cached)
+
+    assert not model.unsupported
+    for sheet, row, col in model.formulas:
+        assert model.value(sheet, row, col) == pytest.approx(cached[sheet][row - 1][col - 1]), (sheet, row, col)
+
+    # 대가!C4(수량) 변경 → 대가 계 → 집계 D4/E4/K4 로 전파
+    edited = model.fork()
+    edited.update(values={("대가", 4, 3): 0})
+    assert edited.value("집계", 4, 4) != model.value("집계", 4, 4)
+    assert edited.value("집계", 4, 5) == edited.value("집계", 4, 4) * edited.value("집계", 4, 3)
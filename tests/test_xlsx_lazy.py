@@ -0,0 +1,92 @@
+"""xlsx_lazy: openpyxl data_only 로 읽은 값과 비교"""
+import datetime as dt
+import io
+
+import openpyxl
+import pytest
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+
+from xlsx_lazy import LazyXlsxReader
+
+
+def _openpyxl_rows(data, sheet):
+    wb = openpyxl.load_workbook(io.BytesIO(data), data_only=True)
+    return tuple(tuple(cell.value for cell in row) for row in wb[sheet].iter_rows())
+
+
+def _dated_workbook(iso_dates=False, date1904=False):
+    wb = openpyxl.Workbook(iso_dates=iso_dates)
+    if date1904:
+        wb.epoch = CALENDAR_MAC_1904
+    ws = wb.active
+    ws.title = "날짜"
+    ws.append([dt.datetime(2024, 3, 1, 12, 30), dt.date(2023, 1, 2), dt.time(7, 15),
+               dt.timedelta(hours=30), 1.5, "문자"])
+    ws["G1"] = 45000
+    ws["G1"].number_format = "yyyy-mm-dd"
+    ws["H1"] = 2.25
+    ws["H1"].number_format = "[h]:mm:ss"
+    ws["I1"] = 3
+    ws["I1"].number_format = "0.00"
+    ws["B3"] = True
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def test_sample_matches_openpyxl(sample_bytes):
+    reader = LazyXlsxReader(sample_bytes)
+    assert reader.sheetnames == ["집계", "대가"]
+    for sheet in reader.sheetnames:
+        assert reader.read_sheet(sheet) == _openpyxl_rows(sample_bytes, sheet)
+
+
+def test_path_source(sample_path, sample_bytes):
+    assert LazyXlsxReader(sample_path).read_sheet("대가") == LazyXlsxReader(sample_bytes).read_sheet("대가")
+
+
+@pytest.mark.parametrize("iso_dates", [False, True])
+@pytest.mark.parametrize("date1904", [False, True])
+def test_dates_match_openpyxl(iso_dates, date1904):
+    data = _dated_workbook(iso_dates, date1904)
+    rows = LazyXlsxReader(data).read_sheet("날짜")
+    assert rows == _openpyxl_rows(data, "날짜")
+
+    first = rows[0]
+    assert first[0] == dt.datetime(2024, 3, 1, 12, 30)
+    assert first[2] == dt.time(7, 15)
+    assert first[3] == dt.timedelta(hours=30)
+    assert isinstance(first[6], dt.datetime)
+    assert first[7] == dt.timedelta(days=2, hours=6)
+    assert first[8] == 3
+
+
+def test_read_rows(sample_bytes):
+    reader = LazyXlsxReader(sample_bytes)
+    # 대가 시트는 A:J 까지만 있으므로 K열은 빈 값
+    expected = [values + (None,) * (11 - len(values)) for values in _openpyxl_rows(sample_bytes, "대가")]
+    rows = reader.read_rows("대가", [5, 3, 100], "A:K")
+    assert [row for row, _ in rows] == [5, 3, 100]
+    assert rows[0][1] == expected[4][:11]
+    assert rows[1][1] == expected[2][:11]
+    # 없는 행은 빈 값
+    assert rows[2][1] == (None,) * 11
+
+    assert reader.read_rows("대가", [4], ("C", "E")) == [(4, expected[3][2:5])]
+    assert reader.read_rows("대가", []) == []
+
+
+def test_sheet_lookup(sample_bytes):
+    reader = LazyXlsxReader(sample_bytes)
+    assert reader.read_rows(1, [3], 3) == reader.read_rows("대가", [3], 3)
+    assert reader.read_rows("대", [3], 3) == reader.read_rows("대가", [3], 3)
+    with pytest.raises(KeyError):
+        reader.read_rows("없는 시트", [1])
+
+
+def test_iter_rows_stops_at_max_row(sample_bytes):
+    reader = LazyXlsxReader(sample_bytes)
+    expected = _openpyxl_rows(sample_bytes, "집계")
+    rows = list(reader.iter_rows("집계", min_row=2, max_row=5, max_col=11))
+    assert rows == [values[:11] for values in expected[1:5]]
+    assert list(reader.iter_rows("집계", min_row=2, max_row=3, max_col=2)) == [(None, None), (None, None)]
@@ -0,0 +1,135 @@
+"""xlsx_patch: 예제 워크북을 패치한 뒤 openpyxl 로 다시 열어 확인"""
+import io
+import zipfile
+
+import openpyxl
+import pytest
+
+from xlsx_patch import KEEP_FORMULA, CellPatch, PatchNotPossible, XlsxPatch, patch_sheet_xml
+
+
+def _open(data, data_only=False):
+    return openpyxl.load_workbook(io.BytesIO(data), data_only=data_only)
+
+
+def _patched(source, sheet_patches):
+    data = XlsxPatch(source, sheet_patches).to_bytes()
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+    return data
+
+
+def _with_shared_formula(sample_bytes):
+    """집계!E4 의 공유 수식(D4*C4)을 E5 도 쓰도록 바꾼 예제 워크북"""
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(sample_bytes)) as src, \
+            zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            data = src.read(info.filename)
+            if info.filename == "xl/worksheets/sheet1.xml":
+                xml = data.decode("utf-8")
+                xml = xml.replace('<f t="shared" ref="E4" si="0">', '<f t="shared" ref="E4:E5" si="0">')
+                xml = xml.replace('<c r="E5" s="2"><f>D5*C5</f>', '<c r="E5" s="2"><f t="shared" si="0"/>')
+                data = xml.encode("utf-8")
+            dst.writestr(info, data)
+    return out.getvalue()
+
+
+def test_patch_values_and_formulas(sample_bytes):
+    data = _patched(sample_bytes, {
+        "대가": {
+            (4, 3): CellPatch(7),                             # 상수
+            (5, 5): CellPatch(99.5, formula=KEEP_FORMULA),    # 수식 유지, 계산 값만 갱신
+        },
+        "집계": {(4, 5): CellPatch(35, formula="D4*C4*2")},  # 새 수식 + 계산 값
+    })
+    values = _open(data, data_only=True)
+    formulas = _open(data)
+
+    assert values["대가"]["C4"].value == 7
+    assert values["대가"]["E5"].value == 99.5
+    assert formulas["대가"]["E5"].value == "=E3+E4"
+    assert values["집계"]["E4"].value == 35
+    assert formulas["집계"]["E4"].value == "=D4*C4*2"
+    # 패치하지 않은 셀은 그대로
+    assert formulas["집계"]["K5"].value == "=E5+G5+I5"
+    assert values["집계"]["K5"].value == 365
+
+
+def test_unpatched_entries_are_copied(sample_bytes):
+    data = _patched(sample_bytes, {"대가": {(4, 3): CellPatch(7)}})
+    with zipfile.ZipFile(io.BytesIO(sample_bytes)) as before, zipfile.ZipFile(io.BytesIO(data)) as after:
+        assert after.namelist() == before.namelist()
+        for name in before.namelist():
+            if name != "xl/worksheets/sheet2.xml":
+                assert after.read(name) == before.read(name), name
+
+
+def test_string_bool_and_error_cells(sample_bytes):
+    data = _patched(sample_bytes, {"대가": {
+        (4, 2): CellPatch(" 새 항목 <&> "),
+        (4, 3): CellPatch(True),
+        (4, 4): CellPatch("#DIV/0!", error=True),
+    }})
+    values = _open(data, data_only=True)["대가"]
+    assert values["B4"].value == " 새 항목 <&> "
+    assert values["C4"].value is True
+    assert values["D4"].value == "#DIV/0!"
+
+
+def test_insert_cell_and_row(sample_bytes):
+    data = _patched(sample_bytes, {"집계": {
+        (4, 12): CellPatch("메모"),                   # 기존 행의 범위 밖 열
+        (5, 1): CellPatch(20),                       # 기존 셀 교체
+        (8, 2): CellPatch("추가"),                   # 새 행 (마지막 행 뒤)
+        (8, 3): CellPatch(3),
+    }})
+    ws = _open(data)["집계"]
+    assert ws["L4"].value == "메모"
+    assert ws["A5"].value == 20
+    assert ws["B8"].value == "추가"
+    assert ws["C8"].value == 3
+    assert ws["K4"].value == "=E4+G4+I4"
+
+
+def test_shared_formula_master_overwrite(sample_bytes):
+    source = _with_shared_formula(sample_bytes)
+    assert _open(source)["집계"]["E5"].value == "=D5*C5"
+
+    data = _patched(source, {"집계": {(4, 5): CellPatch(99)}})
+    ws = _open(data)["집계"]
+    assert ws["E4"].value == 99
+    # 기준 셀을 덮어써도 공유 수식을 쓰던 셀은 자기 위치의 수식으로 남음
+    assert ws["E5"].value == "=D5*C5"
+
+
+def test_calc_chain_dropped_when_formula_removed(sample_bytes):
+    data = _patched(sample_bytes, {"집계": {(4, 4): CellPatch(3)}})
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert "xl/calcChain.xml" not in zf.namelist()
+        assert b"calcChain" not in zf.read("[Content_Types].xml")
+        assert b"calcChain" not in zf.read("xl/_rels/workbook.xml.rels")
+    assert _open(data)["집계"]["D4"].value == 3
+
+
+def test_calc_chain_kept_for_value_only_patch(sample_bytes):
+    data = _patched(sample_bytes, {"집계": {(4, 3): CellPatch(6)}})
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert "xl/calcChain.xml" in zf.namelist()
+
+
+def test_iter_bytes_matches_to_bytes(sample_bytes):
+    patch = XlsxPatch(sample_bytes, {"대가": {(4, 3): CellPatch(7)}})
+    assert b"".join(patch.iter_bytes(chunk_size=512)) == patch.to_bytes()
+
+
+def test_unknown_sheet(sample_bytes):
+    with pytest.raises(PatchNotPossible):
+        XlsxPatch(sample_bytes, {"없는 시트": {(1, 1): CellPatch(1)}})
+
+
+def test_patch_sheet_xml_empty_sheet_data():
+    xml = '<worksheet xmlns="x"><sheetData/></worksheet>'
+    patched, stats = patch_sheet_xml(xml, {(2, 1): CellPatch(5)})
+    assert patched == '<worksheet xmlns="x"><sheetData><row r="2"><c r="A2"><v>5</v></c></row></sheetData></worksheet>'
+    assert stats == {"cells": 1, "formula_removed": False}
@@ -0,0 +1,357 @@
+"""
+xlsx 지연 읽기
+
+openpyxl.load_workbook 은 몇 줄만 필요해도 모든 시트, 공유 문자열, 스타일을 파싱한다.
+여기서는 xlsx(zip)에서 workbook/rels 와 공유 문자열만 한 번 읽어 두고,
+요청한 시트의 XML 만 행 단위로 스트리밍 파싱하다가 마지막으로 필요한 행을 지나면 멈춘다.
+
+    reader = LazyXlsxReader("data/CON-A DB1.xlsx")
+    reader.read_rows("대가", range(3, 6), "A:K")   # [(3, (...)), (4, (...)), (5, (...))]
+
+값은 data_only=True 로 읽은 openpyxl 과 같다 (수식 셀은 저장된 계산 값).
+날짜 서식 숫자와 t="d" 셀은 openpyxl 처럼 datetime(시간 간격 서식은 timedelta)으로 바꾸며,
+이를 위해 styles.xml 의 셀 서식 목록(cellXfs/numFmts)만 한 번 읽는다.
+
+요청 처리 경로의 조회는 con_a_source 스냅샷을 쓰므로, 이 리더는 스냅샷 컴파일(read_sheet)과
+스냅샷 없이 원본에서 몇 행만 바로 볼 때(read_rows, benchmarks/bench_xlsx_reader.py)에 쓴다.
+"""
+import io
+import posixpath
+import re
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+_STYLES = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+
+_ROW = _NS_MAIN + "row"
+_CELL = _NS_MAIN + "c"
+_VALUE = _NS_MAIN + "v"
+_TEXT = _NS_MAIN + "t"
+_INLINE = _NS_MAIN + "is"
+_PHONETIC = _NS_MAIN + "rPh"
+_SHEET_DATA = _NS_MAIN + "sheetData"
+_DIMENSION = _NS_MAIN + "dimension"
+
+_CELL_REF = re.compile(r"([A-Z]+)(\d+)$")
+
+
+def _cast_number(text):
+    """openpyxl 과 같은 규칙: 소수점/지수가 있으면 float, 아니면 int"""
+    if "." in text or "E" in text or "e" in text:
+        return float(text)
+    return int(text)
+
+
+def _column_span(cols):
+    """
+    cols: 'A:K' / ('A', 'C') / 11 (A부터 개수) / None (전체)
+    → (최소 열 번호, 최대 열 번호), 1부터 시작
+    """
+    if cols is None:
+        return 1, None
+    if isinstance(cols, int):
+        return 1, cols
+    if isinstance(cols, str):
+        first, _, last = cols.partition(":")
+        return column_index_from_string(first), column_index_from_string(last or first)
+    indexes = [column_index_from_string(c) if isinstance(c, str) else int(c) for c in cols]
+    return min(indexes), max(indexes)
+
+
+def _inline_text(cell):
+    return "".join(
+        t.text or ""
+        for t in cell.iter(_TEXT)
+    )
+
+
+class LazyXlsxReader:
+    """xlsx 파일(경로 또는 bytes)에서 필요한 시트/행만 읽는 리더"""
+
+    def __init__(self, source):
+        self.source = source
+        self._lock = threading.Lock()
+        self._sheets = None           # [(시트 이름, zip 내부 경로), ...]
+        self._styles_path = None
+        self._epoch = CALENDAR_WINDOWS_1900
+        self._shared_strings = None
+        self._date_styles = None      # (날짜 서식 스타일 번호 set, 시간 간격 서식 스타일 번호 set)
+
+    def _open(self):
+        # 호출마다 새로 열어서 여러 스레드가 동시에 읽어도 파일 위치가 섞이지 않게 함
+        if isinstance(self.source, (bytes, bytearray)):
+            return zipfile.ZipFile(io.BytesIO(self.source))
+        return zipfile.ZipFile(self.source)
+
+    #############################################
+    # workbook / rels / 공유 문자열 / 날짜 서식 (한 번만)
+    #############################################
+
+    def _load_sheets(self, zf):
+        workbook_path = "xl/workbook.xml"
+        try:
+            root_rels = ET.fromstring(zf.read("_rels/.rels"))
+            for rel in root_rels.iter(_NS_PKG_REL + "Relationship"):
+                if rel.get("Type") == _OFFICE_DOCUMENT:
+                    workbook_path = rel.get("Target").lstrip("/")
+                    break
+        except KeyError:
+            pass
+
+        base = posixpath.dirname(workbook_path)
+        rels_path = posixpath.join(base, "_rels", posixpath.basename(workbook_path) + ".rels")
+        targets = {}
+        for rel in ET.fromstring(zf.read(rels_path)).iter(_NS_PKG_REL + "Relationship"):
+            target = rel.get("Target")
+            if target.startswith("/"):
+                target = target.lstrip("/")
+            else:
+                target = posixpath.normpath(posixpath.join(base, target))
+            targets[rel.get("Id")] = target
+            if rel.get("Type") == _STYLES:
+                self._styles_path = target
+
+        workbook = ET.fromstring(zf.read(workbook_path))
+        properties = workbook.find(_NS_MAIN + "workbookPr")
+        if properties is not None and properties.get("date1904") in ("1", "true"):
+            self._epoch = CALENDAR_MAC_1904
+
+        sheets = []
+        for sheet in workbook.iter(_NS_MAIN + "sheet"):
+            sheets.append((sheet.get("name"), targets[sheet.get(_NS_REL + "id")]))
+        return sheets
+
+    def _load_shared_strings(self, zf):
+        strings = []
+        try:
+            f = zf.open("xl/sharedStrings.xml")
+        except KeyError:
+            return strings
+        with f:
+            for _, elem in ET.iterparse(f):
+                if elem.tag != _NS_MAIN + "si":
+                    continue
+                # 후리가나(rPh) 안의 텍스트는 제외 (openpyxl 과 동일)
+                phonetic = {id(t) for ph in elem.iter(_PHONETIC) for t in ph.iter(_TEXT)}
+                strings.append("".join(
+                    t.text or "" for t in elem.iter(_TEXT) if id(t) not in phonetic
+                ))
+                elem.clear()
+        return strings
+
+    def _load_date_styles(self, zf):
+        """openpyxl Stylesheet 과 같은 규칙으로 날짜/시간 간격 서식인 cellXfs 번호를 찾음"""
+        date_styles, timedelta_styles = set(), set()
+        if self._styles_path is None:
+            return date_styles, timedelta_styles
+        try:
+            root = ET.fromstring(zf.read(self._styles_path))
+        except KeyError:
+            return date_styles, timedelta_styles
+        custom = {
+            int(fmt.get("numFmtId")): fmt.get("formatCode")
+            for fmt in root.iter(_NS_MAIN + "numFmt")
+        }
+        cell_xfs = root.find(_NS_MAIN + "cellXfs")
+        if cell_xfs is None:
+            return date_styles, timedelta_styles
+        for index, xf in enumerate(cell_xfs.iter(_NS_MAIN + "xf")):
+            fmt_id = int(xf.get("numFmtId", 0))
+            fmt = custom[fmt_id] if fmt_id in custom else builtin_format_code(fmt_id)
+            if is_date_format(fmt):
+                date_styles.add(index)
+            if is_timedelta_format(fmt):
+                timedelta_styles.add(index)
+        return date_styles, timedelta_styles
+
+    def _ensure_sheets(self, zf):
+        if self._sheets is None:
+            with self._lock:
+                if self._sheets is None:
+                    self._sheets = self._load_sheets(zf)
+        return self._sheets
+
+    def _ensure_shared_strings(self, zf):
+        if self._shared_strings is None:
+            with self._lock:
+                if self._shared_strings is None:
+                    self._shared_strings = self._load_shared_strings(zf)
+        return self._shared_strings
+
+    def _ensure_date_styles(self, zf):
+        if self._date_styles is None:
+            self._ensure_sheets(zf)
+            with self._lock:
+                if self._date_styles is None:
+                    self._date_styles = self._load_date_styles(zf)
+        return self._date_styles
+
+    @property
+    def sheetnames(self):
+        with self._open() as zf:
+            return [name for name, _ in self._ensure_sheets(zf)]
+
+    def _find_sheet(self, zf, sheet_match):
+        """
+        sheet_match: 시트 이름(정확히 일치 우선, 없으면 이름에 포함) 또는 0부터 시작하는 시트 순서
+        """
+        sheets = self._ensure_sheets(zf)
+        if isinstance(sheet_match, int):
+            return sheets[sheet_match]
+        for name, path in sheets:
+            if name == sheet_match:
+                return name, path
+        for name, path in sheets:
+            if sheet_match in name:
+                return name, path
+        raise KeyError(f"시트를 찾을 수 없습니다: {sheet_match}")
+
+    #############################################
+    # 시트 스트리밍
+    #############################################
+
+    def _cell_value(self, cell, zf):
+        kind = cell.get("t", "n")
+        if kind == "inlineStr":
+            inline = cell.find(_INLINE)
+            return _inline_text(inline) if inline is not None else None
+        value = cell.findtext(_VALUE)
+        if value is None or (value == "" and kind != "str"):
+            return None
+        if kind == "s":
+            return self._ensure_shared_strings(zf)[int(value)]
+        if kind == "b":
+            return value == "1"
+        if kind in ("str", "e"):
+            return value
+        if kind == "d":
+            return from_ISO8601(value)
+        number = _cast_number(value)
+        date_styles, timedelta_styles = self._ensure_date_styles(zf)
+        style = int(cell.get("s") or 0)
+        if style not in date_styles:
+            return number
+        try:
+            return from_excel(number, self._epoch, timedelta=style in timedelta_styles)
+        except (OverflowError, ValueError):
+            # 날짜 범위를 벗어난 일련번호 (openpyxl 은 경고와 함께 오류 값으로 읽음)
+            return "#VALUE!"
+
+    def _iter_sheet(self, zf, path, min_row, max_row, min_col, max_col):
+        """
+        (행 번호, {열 번호: 값}) 를 행 순서대로 생성. max_row 를 지나면 파싱을 멈춘다.
+        첫 항목으로 (None, dimension 최대 (행, 열)) 을 한 번 내보낸다.
+        """
+        with zf.open(path) as f:
+            sheet_data = None
+            row_num = 0
+            dimension_sent = False
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == _SHEET_DATA:
+                        sheet_data = elem
+                        if not dimension_sent:
+                            dimension_sent = True
+                            yield None, (0, 0)
+                    continue
+                if elem.tag == _DIMENSION and not dimension_sent:
+                    dimension_sent = True
+                    last = elem.get("ref", "").rpartition(":")[2]
+                    match = _CELL_REF.match(last)
+                    yield None, ((int(match.group(2)), column_index_from_string(match.group(1)))
+                                 if match else (0, 0))
+                    continue
+                if elem.tag != _ROW:
+                    continue
+
+                row_num = int(elem.get("r") or row_num + 1)
+                if max_row is not None and row_num > max_row:
+                    return
+                if row_num >= min_row:
+                    values = {}
+                    col_num = 0
+                    for cell in elem.iter(_CELL):
+                        ref = cell.get("r")
+                        match = _CELL_REF.match(ref) if ref else None
+                        col_num = column_index_from_string(match.group(1)) if match else col_num + 1
+                        if col_num < min_col or (max_col is not None and col_num > max_col):
+                            continue
+                        value = self._cell_value(cell, zf)
+                        if value is not None:
+                            values[col_num] = value
+                    yield row_num, values
+
+                # 처리한 행은 버려서 시트 크기와 관계없이 메모리 일정
+                elem.clear()
+                if sheet_data is not None:
+                    sheet_data.clear()
+
+    def read_rows(self, sheet_match, rows, cols=None):
+        """
+        rows: 행 번호 iterable (1부터), cols: 'A:K' / 11 / None
+        → [(행 번호, 값 튜플), ...] 요청한 행 순서대로. 빈 칸/없는 행은 None
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+        min_col, max_col = _column_span(cols)
+        wanted = set(rows)
+        found = {}
+        with self._open() as zf:
+            _, path = self._find_sheet(zf, sheet_match)
+            width = max_col
+            for row_num, values in self._iter_sheet(zf, path, min(wanted), max(wanted), min_col, max_col):
+                if row_num is None:
+                    continue
+                if row_num in wanted:
+                    found[row_num] = values
+        if width is None:
+            width = max((max(v) for v in found.values() if v), default=min_col - 1)
+        span = range(min_col, width + 1)
+        return [
+            (row_num, tuple(found.get(row_num, {}).get(c) for c in span))
+            for row_num in rows
+        ]
+
+    def iter_rows(self, sheet_match, min_row=1, max_row=None, max_col=None):
+        """
+        ws.iter_rows(min_row, max_row, max_col, values_only=True) 처럼 행 튜플 생성 (A열부터).
+        max_col 을 주지 않으면 시트 전체 폭(dimension 과 실제 셀 중 큰 값)에 맞춘다.
+        """
+        with self._open() as zf:
+            _, path = self._find_sheet(zf, sheet_match)
+            parsed = self._iter_sheet(zf, path, min_row, max_row, 1, max_col)
+            _, (dim_rows, dim_cols) = next(parsed, (None, (0, 0)))
+            if max_col is None:
+                # 전체 폭을 알아야 하므로 시트를 끝까지 읽은 뒤 내보냄
+                rows = list(parsed)
+                width = max([dim_cols] + [max(v) for _, v in rows if v])
+                last = max([dim_rows] + [r for r, _ in rows]) if max_row is None else max_row
+            else:
+                rows = parsed
+                width = max_col
+                last = max_row
+            expected = min_row
+            for row_num, values in rows:
+                # 중간에 빠진 행은 빈 행으로 채움
+                while expected < row_num:
+                    yield (None,) * width
+                    expected += 1
+                yield tuple(values.get(c) for c in range(1, width + 1))
+                expected = row_num + 1
+            while last is not None and expected <= last:
+                yield (None,) * width
+                expected += 1
+
+    def read_sheet(self, sheet_match):
+        """시트 전체 값 행 튜플 (openpyxl read_only + values_only 와 같은 모양)"""
+        return tuple(self.iter_rows(sheet_match))
@@ -0,0 +1,465 @@
+"""
+xlsx 템플릿 패치
+
+원본 xlsx(zip)를 항목 단위로 그대로 복사하면서, 수정한 셀이 있는 시트 XML 의
+해당 행 <c> 요소만 다시 쓴다. 나머지 항목은 압축된 바이트를 풀지 않고 그대로 옮기므로
+처리 시간은 워크북 크기가 아니라 수정한 셀 수에 비례하고, 서식/차트/조건부 서식 등
+openpyxl 이 지원하지 않는 기능도 원본 그대로 남는다.
+
+    patch = XlsxPatch("data/CON-A DB1.xlsx", {
+        "대가": {(7, 3): CellPatch(7),                       # 상수
+                 (7, 5): CellPatch(21, formula=KEEP_FORMULA),  # 기존 수식 유지, 계산 값만 갱신
+                 (7, 7): CellPatch(21, formula="F7*C7")},      # 새 수식 + 계산 값
+    })
+    for chunk in patch.iter_bytes():
+        ...
+
+공유 수식의 기준 셀을 바꾸면 그 공유 수식을 쓰는 셀들만 각자의 수식으로 풀어 쓴다.
+패치할 수 없는 구조(zip64, 행 번호 없는 행 등)면
+PatchNotPossible 을 올리므로 호출하는 쪽에서 openpyxl 저장으로 대신한다.
+"""
+import io
+import math
+import posixpath
+import re
+import struct
+import zipfile
+import zlib
+from collections import namedtuple
+from xml.sax.saxutils import escape, unescape
+
+from openpyxl.formula.translate import Translator
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+from xlsx_stream import DEFAULT_CHUNK_SIZE
+
+# 기존 <f> 요소를 그대로 두고 계산 값(<v>)만 바꿀 때 사용
+KEEP_FORMULA = object()
+
+# value: 셀 값 (숫자/문자열/bool/None, 수식 셀이면 계산 값)
+# formula: None(상수 셀) / KEEP_FORMULA / '=' 없는 수식 문자열
+# error: 값이 엑셀 오류(#DIV/0! 등)면 True
+CellPatch = namedtuple("CellPatch", "value formula error", defaults=(None, False))
+
+
+class PatchNotPossible(Exception):
+    """이 방식으로 패치할 수 없는 파일 (호출하는 쪽에서 openpyxl 로 대신 저장)"""
+
+
+_ROW = re.compile(r'<(?P<p>\w+:)?row\b(?P<attrs>[^>]*?)(?:/>|>(?P<body>.*?)</(?P=p)?row>)', re.S)
+_CELL = re.compile(r'<(?P<p>\w+:)?c\b(?P<attrs>[^>]*?)(?:/>|>(?P<body>.*?)</(?P=p)?c>)', re.S)
+_FORMULA = re.compile(r'<(?P<p>\w+:)?f\b(?P<attrs>[^>]*?)(?:/>|>(?P<body>.*?)</(?P=p)?f>)', re.S)
+_ATTR = re.compile(r'(\w+(?::\w+)?)="([^"]*)"')
+_SPANS_ATTR = re.compile(r'\s+spans="[^"]*"')
+_CELL_REF = re.compile(r'([A-Z]+)(\d+)$')
+_SHEET_DATA_END = re.compile(r'</(?:\w+:)?sheetData>')
+_SHEET_DATA_EMPTY = re.compile(r'<(?P<p>\w+:)?sheetData\s*/>')
+_ILLEGAL_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_LOCAL_SIG = b"PK\x03\x04"
+_CENTRAL_SIG = b"PK\x01\x02"
+_END_SIG = b"PK\x05\x06"
+_DESCRIPTOR_SIG = b"PK\x07\x08"
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+
+def _attrs(text):
+    return dict(_ATTR.findall(text))
+
+
+def _format_number(value):
+    if isinstance(value, float) and value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+def _cell_xml(prefix, ref, style, patch, original_formula):
+    """새 <c> 요소 (스타일 s 속성은 원본 유지)"""
+    attrs = f' r="{ref}"'
+    if style is not None:
+        attrs += f' s="{style}"'
+
+    formula_xml = ''
+    if patch.formula is KEEP_FORMULA:
+        formula_xml = original_formula or ''
+    elif patch.formula is not None:
+        formula_xml = f'<{prefix}f>{escape(patch.formula)}</{prefix}f>'
+
+    value = patch.value
+    if patch.error:
+        return f'<{prefix}c{attrs} t="e">{formula_xml}<{prefix}v>{escape(str(value))}</{prefix}v></{prefix}c>'
+    if value is None or value == '':
+        return f'<{prefix}c{attrs}>{formula_xml}</{prefix}c>' if formula_xml or style is not None else ''
+    if isinstance(value, bool):
+        return f'<{prefix}c{attrs} t="b">{formula_xml}<{prefix}v>{int(value)}</{prefix}v></{prefix}c>'
+    if isinstance(value, (int, float)) and math.isfinite(value):
+        return f'<{prefix}c{attrs}>{formula_xml}<{prefix}v>{_format_number(value)}</{prefix}v></{prefix}c>'
+    text = _ILLEGAL_XML_CHARS.sub("", str(value))
+    if formula_xml:
+        # 수식 결과 문자열은 t="str"
+        return f'<{prefix}c{attrs} t="str">{formula_xml}<{prefix}v>{escape(text)}</{prefix}v></{prefix}c>'
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return (f'<{prefix}c{attrs} t="inlineStr"><{prefix}is><{prefix}t{space}>{escape(text)}'
+            f'</{prefix}t></{prefix}is></{prefix}c>')
+
+
+def _patch_row(row_num, prefix, body, patches, stats):
+    """
+    행 본문(<c> 목록)에서 patches {열 번호: CellPatch} 에 해당하는 셀만 교체/추가
+    → (새 본문, 새 셀을 추가했는지)
+    """
+    pending = dict(patches)
+    inserted = False
+    out = []
+    pos = 0
+    for match in _CELL.finditer(body):
+        attrs = _attrs(match.group("attrs"))
+        ref = attrs.get("r")
+        ref_match = _CELL_REF.match(ref or "")
+        if ref_match is None:
+            raise PatchNotPossible(f"{row_num}행에 위치(r) 없는 셀이 있습니다")
+        col = column_index_from_string(ref_match.group(1))
+
+        # 이 셀보다 앞 열에 새로 넣을 셀
+        for new_col in sorted(c for c in pending if c < col):
+            out.append(body[pos:match.start()])
+            pos = match.start()
+            out.append(_cell_xml(prefix, f"{get_column_letter(new_col)}{row_num}", None, pending.pop(new_col), None))
+            stats["cells"] += 1
+            inserted = True
+
+        patch = pending.pop(col, None)
+        if patch is None:
+            continue
+
+        cell_body = match.group("body") or ''
+        formula = _FORMULA.search(cell_body)
+        original_formula = formula.group() if formula else None
+        if original_formula and patch.formula is None:
+            # 수식 → 상수: calcChain 에 남은 항목을 지워야 함
+            stats["formula_removed"] = True
+
+        out.append(body[pos:match.start()])
+        out.append(_cell_xml(prefix, ref, attrs.get("s"), patch, original_formula))
+        pos = match.end()
+        stats["cells"] += 1
+
+    out.append(body[pos:])
+    for new_col in sorted(pending):
+        out.append(_cell_xml(prefix, f"{get_column_letter(new_col)}{row_num}", None, pending[new_col], None))
+        stats["cells"] += 1
+        inserted = True
+    return "".join(out), inserted
+
+
+def _cell_refs(xml):
+    """시트 XML 의 (셀 위치, <c> match) 생성"""
+    for match in _CELL.finditer(xml):
+        ref = _attrs(match.group("attrs")).get("r")
+        if ref and _CELL_REF.match(ref):
+            yield ref, match
+
+
+def _broken_shared_formulas(xml, patches):
+    """
+    수식을 바꾸거나 지우는 셀이 공유 수식의 기준 셀이면 → {si: (기준 셀 위치, 수식)}
+    (기준 셀이 바뀌면 같은 si 를 쓰는 다른 셀의 수식이 사라짐)
+    """
+    broken = {}
+    for ref, match in _cell_refs(xml):
+        formula = _FORMULA.search(match.group("body") or '')
+        if formula is None or not formula.group("body"):
+            continue
+        attrs = _attrs(formula.group("attrs"))
+        if attrs.get("t") != "shared" or "ref" not in attrs:
+            continue
+        ref_match = _CELL_REF.match(ref)
+        patch = patches.get((int(ref_match.group(2)), column_index_from_string(ref_match.group(1))))
+        if patch is not None and patch.formula is not KEEP_FORMULA:
+            broken[attrs.get("si")] = (ref, unescape(formula.group("body")))
+    return broken
+
+
+def _expand_shared_formulas(xml, broken):
+    """broken 공유 수식을 쓰는 셀의 <f t="shared" si=../> 를 각 셀 위치로 옮긴 일반 수식으로 바꿈"""
+    out = []
+    pos = 0
+    for ref, match in _cell_refs(xml):
+        body = match.group("body") or ''
+        formula = _FORMULA.search(body)
+        if formula is None:
+            continue
+        attrs = _attrs(formula.group("attrs"))
+        if attrs.get("t") != "shared" or attrs.get("si") not in broken:
+            continue
+        origin, text = broken[attrs["si"]]
+        if ref != origin:
+            text = Translator("=" + text, origin=origin).translate_formula(ref)[1:]
+        prefix = formula.group("p") or ''
+        start = match.start("body")
+        out.append(xml[pos:start + formula.start()])
+        out.append(f'<{prefix}f>{escape(text)}</{prefix}f>')
+        pos = start + formula.end()
+    out.append(xml[pos:])
+    return "".join(out)
+
+
+def patch_sheet_xml(xml, patches):
+    """
+    시트 XML 문자열에서 patches {(행, 열): CellPatch} 에 해당하는 행만 다시 쓴 XML 반환
+    (다른 행과 시트 설정은 글자 그대로 유지)
+    """
+    broken = _broken_shared_formulas(xml, patches) if "shared" in xml else {}
+    if broken:
+        xml = _expand_shared_formulas(xml, broken)
+
+    by_row = {}
+    for (row, col), patch in patches.items():
+        by_row.setdefault(row, {})[col] = patch
+    stats = {"cells": 0, "formula_removed": False}
+
+    out = []
+    pos = 0
+    prefix = ''
+    for match in _ROW.finditer(xml):
+        prefix = match.group("p") or ''
+        attrs = _attrs(match.group("attrs"))
+        if "r" not in attrs:
+            raise PatchNotPossible("행 번호(r) 없는 행이 있습니다")
+        row_num = int(attrs["r"])
+
+        # 이 행보다 앞에 새로 넣을 행
+        for new_row in sorted(r for r in by_row if r < row_num):
+            out.append(xml[pos:match.start()])
+            pos = match.start()
+            body, _ = _patch_row(new_row, prefix, '', by_row.pop(new_row), stats)
+            out.append(f'<{prefix}row r="{new_row}">{body}</{prefix}row>')
+
+        row_patches = by_row.pop(row_num, None)
+        if row_patches is None:
+            continue
+        body, inserted = _patch_row(row_num, prefix, match.group("body") or '', row_patches, stats)
+        row_attrs = match.group("attrs")
+        if inserted:
+            # 새 셀이 기존 열 범위(spans) 밖일 수 있으므로 선택 속성인 spans 는 뺌
+            row_attrs = _SPANS_ATTR.sub('', row_attrs)
+        out.append(xml[pos:match.start()])
+        out.append(f'<{prefix}row{row_attrs}>{body}</{prefix}row>')
+        pos = match.end()
+
+    rest = xml[pos:]
+    if by_row:
+        rows = "".join(
+            f'<{prefix}row r="{row}">{_patch_row(row, prefix, "", by_row[row], stats)[0]}</{prefix}row>'
+            for row in sorted(by_row)
+        )
+        end = _SHEET_DATA_END.search(rest)
+        if end is not None:
+            rest = rest[:end.start()] + rows + rest[end.start():]
+        else:
+            empty = _SHEET_DATA_EMPTY.search(rest)
+            if empty is None:
+                raise PatchNotPossible("sheetData 를 찾을 수 없습니다")
+            p = empty.group("p") or ''
+            rest = rest[:empty.start()] + f'<{p}sheetData>{rows}</{p}sheetData>' + rest[empty.end():]
+    out.append(rest)
+    return "".join(out), stats
+
+
+#############################################
+# zip 항목 복사
+#############################################
+
+def _dos_datetime(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (
+        (year - 1980) << 9 | month << 5 | day,
+        hour << 11 | minute << 5 | second // 2,
+    )
+
+
+class _Entry:
+    """출력 zip 항목 (원본 바이트 그대로 복사하거나 새로 압축한 데이터)"""
+
+    __slots__ = ("info", "name_bytes", "raw_span", "data", "crc", "compress_size",
+                 "file_size", "flag_bits", "compress_type", "offset")
+
+    def __init__(self, info):
+        self.info = info
+        self.name_bytes = info.filename.encode("utf-8" if info.flag_bits & 0x800 else "cp437")
+        self.raw_span = None     # 원본 파일에서 복사할 (시작, 길이)
+        self.data = None         # 새로 압축한 데이터
+        self.crc = info.CRC
+        self.compress_size = info.compress_size
+        self.file_size = info.file_size
+        self.flag_bits = info.flag_bits
+        self.compress_type = info.compress_type
+        self.offset = 0
+
+
+class XlsxPatch:
+    """원본 xlsx 에 셀 패치를 적용한 새 xlsx (생성 시 패치 가능 여부를 미리 확인)"""
+
+    def __init__(self, source, sheet_patches, compresslevel=6):
+        """
+        source: 원본 xlsx 경로 또는 bytes
+        sheet_patches: {시트 이름: {(행, 열): CellPatch}}
+        패치할 수 없으면 여기서 PatchNotPossible 을 올린다 (응답을 보내기 시작하기 전)
+        """
+        self.source = source
+        self.compresslevel = compresslevel
+        self.cells_patched = 0
+        with zipfile.ZipFile(self._open()) as zf:
+            infos = zf.infolist()
+            for info in infos:
+                if max(info.file_size, info.compress_size, info.header_offset) >= _ZIP64_LIMIT:
+                    raise PatchNotPossible("zip64 항목은 지원하지 않습니다")
+            sheet_paths = self._sheet_paths(zf)
+
+            replaced = {}
+            formula_removed = False
+            for sheet_name, patches in sheet_patches.items():
+                if not patches:
+                    continue
+                if sheet_name not in sheet_paths:
+                    raise PatchNotPossible(f"시트를 찾을 수 없습니다: {sheet_name}")
+                part = sheet_paths[sheet_name]
+                xml, stats = patch_sheet_xml(zf.read(part).decode("utf-8"), patches)
+                replaced[part] = xml.encode("utf-8")
+                self.cells_patched += stats["cells"]
+                formula_removed = formula_removed or stats["formula_removed"]
+
+            dropped = set()
+            if formula_removed and "xl/calcChain.xml" in zf.NameToInfo:
+                # 수식이 없어진 셀이 calcChain 에 남아 있으면 엑셀이 복구 메시지를 띄우므로
+                # calcChain 을 빼고 엑셀이 열 때 다시 만들게 함
+                dropped.add("xl/calcChain.xml")
+                for part in ("[Content_Types].xml", "xl/_rels/workbook.xml.rels"):
+                    text = zf.read(part).decode("utf-8")
+                    text = re.sub(r'<[^<>]*calcChain[^<>]*/>', '', text)
+                    replaced[part] = text.encode("utf-8")
+
+            self._entries = []
+            for info in infos:
+                if info.filename in dropped:
+                    continue
+                entry = _Entry(info)
+                if info.filename in replaced:
+                    self._compress(entry, replaced[info.filename])
+                self._entries.append(entry)
+
+        # 복사할 항목의 원본 위치 (로컬 헤더 + 데이터 + 데이터 디스크립터)
+        with self._open() as f:
+            for entry in self._entries:
+                if entry.data is None:
+                    entry.raw_span = self._raw_span(f, entry.info)
+
+    def _open(self):
+        if isinstance(self.source, (bytes, bytearray)):
+            return io.BytesIO(self.source)
+        return open(self.source, "rb")
+
+    @staticmethod
+    def _sheet_paths(zf):
+        """시트 이름 → zip 안의 시트 XML 경로 (workbook.xml + rels)"""
+        rels = zf.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+        targets = {}
+        for match in re.finditer(r'<(?:\w+:)?Relationship\b([^>]*)/?>', rels):
+            attrs = _attrs(match.group(1))
+            target = attrs.get("Target", "")
+            target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(
+                posixpath.join("xl", target))
+            targets[attrs.get("Id")] = target
+
+        workbook = zf.read("xl/workbook.xml").decode("utf-8")
+        paths = {}
+        for match in re.finditer(r'<(?:\w+:)?sheet\b([^>]*)/?>', workbook):
+            attrs = _attrs(match.group(1))
+            rel_id = next((v for k, v in attrs.items() if k.endswith(":id")), None)
+            name = attrs.get("name", "")
+            # workbook.xml 의 시트 이름은 XML 이스케이프되어 있음
+            name = name.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"') \
+                .replace("&apos;", "'").replace("&amp;", "&")
+            if rel_id in targets:
+                paths[name] = targets[rel_id]
+        return paths
+
+    def _compress(self, entry, data):
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -15)
+        entry.data = compressor.compress(data) + compressor.flush()
+        entry.crc = zlib.crc32(data)
+        entry.compress_size = len(entry.data)
+        entry.file_size = len(data)
+        entry.compress_type = 8
+        entry.flag_bits = entry.info.flag_bits & 0x800   # 파일 이름 UTF-8 표시만 유지
+
+    @staticmethod
+    def _raw_span(f, info):
+        f.seek(info.header_offset)
+        header = f.read(_LOCAL_HEADER.size)
+        if len(header) != _LOCAL_HEADER.size or header[:4] != _LOCAL_SIG:
+            raise PatchNotPossible(f"로컬 헤더를 읽을 수 없습니다: {info.filename}")
+        fields = _LOCAL_HEADER.unpack(header)
+        name_len, extra_len = fields[-2], fields[-1]
+        length = _LOCAL_HEADER.size + name_len + extra_len + info.compress_size
+        if info.flag_bits & 0x08:
+            # 데이터 뒤의 디스크립터 (서명은 있을 수도 없을 수도 있음)
+            f.seek(info.header_offset + length)
+            length += 16 if f.read(4) == _DESCRIPTOR_SIG else 12
+        return info.header_offset, length
+
+    def _local_header(self, entry):
+        date, time = _dos_datetime(entry.info.date_time)
+        return _LOCAL_HEADER.pack(
+            _LOCAL_SIG, 20, 0, entry.flag_bits, entry.compress_type, time, date,
+            entry.crc, entry.compress_size, entry.file_size, len(entry.name_bytes), 0,
+        ) + entry.name_bytes
+
+    def _central_record(self, entry):
+        info = entry.info
+        date, time = _dos_datetime(info.date_time)
+        extra = info.extra if entry.data is None else b""
+        comment = info.comment or b""
+        return _CENTRAL_HEADER.pack(
+            _CENTRAL_SIG, info.create_version, info.create_system,
+            max(info.extract_version, 20) if entry.data is not None else info.extract_version,
+            info.reserved, entry.flag_bits, entry.compress_type, time, date,
+            entry.crc, entry.compress_size, entry.file_size,
+            len(entry.name_bytes), len(extra), len(comment), 0,
+            info.internal_attr, info.external_attr, entry.offset,
+        ) + entry.name_bytes + extra + comment
+
+    def iter_bytes(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """패치된 xlsx 를 조각 단위로 생성 (복사 항목은 압축을 풀지 않고 그대로 전송)"""
+        offset = 0
+        with self._open() as f:
+            for entry in self._entries:
+                entry.offset = offset
+                if entry.data is not None:
+                    header = self._local_header(entry)
+                    yield header
+                    yield entry.data
+                    offset += len(header) + len(entry.data)
+                    continue
+                start, length = entry.raw_span
+                f.seek(start)
+                remaining = length
+                while remaining:
+                    data = f.read(min(chunk_size, remaining))
+                    if not data:
+                        raise IOError("원본 파일이 예상보다 짧습니다")
+                    remaining -= len(data)
+                    yield data
+                offset += length
+
+        central = b"".join(self._central_record(entry) for entry in self._entries)
+        yield central
+        yield _END_RECORD.pack(
+            _END_SIG, 0, 0, len(self._entries), len(self._entries), len(central), offset, 0,
+        )
+
+    def to_bytes(self):
+        return b"".join(self.iter_bytes())
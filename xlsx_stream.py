@@ -0,0 +1,204 @@
+"""
+xlsx 스트리밍 생성
+
+openpyxl 로 워크북 전체를 메모리에 만든 뒤 BytesIO 에 저장하는 대신,
+SpreadsheetML(시트 XML)을 행 단위로 직접 써서 zip 조각이 만들어지는 대로 내보낸다.
+행 수와 관계없이 메모리 사용량이 거의 일정하고, 첫 바이트가 바로 전송된다.
+"""
+import math
+import re
+import tempfile
+import unicodedata
+import zipfile
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+
+from openpyxl.utils import get_column_letter
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# 한 번에 내보낼 조각 크기 (바이트)
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# XML 1.0 에서 허용되지 않는 제어 문자
+_ILLEGAL_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetData>'
+)
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+class ChunkSink:
+    """zipfile 이 쓰는 바이트를 모아 두었다가 조각 단위로 꺼내는 버퍼 (tell/seek 없음)"""
+
+    def __init__(self):
+        self._parts = []
+        self.size = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        self.size = 0
+        return data
+
+
+def _cell_xml(ref, value):
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)) and not (isinstance(value, float) and not math.isfinite(value)):
+        return f'<c r="{ref}"><v>{value!r}</v></c>'
+    text = _ILLEGAL_XML_CHARS.sub("", str(value))
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<c r="{ref}" t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+
+def _row_xml(row_num, values, columns):
+    cells = [
+        _cell_xml(f"{columns[col_idx]}{row_num}", value)
+        for col_idx, value in enumerate(values)
+        if value is not None and value != ''
+    ]
+    if not cells:
+        return ''
+    return f'<row r="{row_num}">{"".join(cells)}</row>'
+
+
+def iter_xlsx(sheets, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    sheets: [(시트 이름, 헤더 목록, 행 iterable), ...]
+    1행에 헤더, 2행부터 데이터를 쓴 xlsx 파일을 bytes 조각으로 생성한다.
+    None/빈 문자열 칸은 비워 둔다.
+    """
+    sheets = list(sheets)
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        overrides = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(sheets) + 1)
+        )
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES_HEAD + overrides + "</Types>")
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(
+                f'<sheet name={quoteattr(name)} sheetId="{i}" r:id="rId{i}"/>'
+                for i, (name, _, _) in enumerate(sheets, start=1)
+            )
+            + '</sheets></workbook>'
+        ))
+        zf.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(
+                f'<Relationship Id="rId{i}" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                f'Target="worksheets/sheet{i}.xml"/>'
+                for i in range(1, len(sheets) + 1)
+            )
+            + f'<Relationship Id="rId{len(sheets) + 1}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+            'Target="styles.xml"/>'
+            '</Relationships>'
+        ))
+        zf.writestr("xl/styles.xml", _STYLES)
+        yield sink.drain()
+
+        for i, (_, headers, rows) in enumerate(sheets, start=1):
+            columns = [get_column_letter(c) for c in range(1, max(len(headers), 1) + 1)]
+            with zf.open(f"xl/worksheets/sheet{i}.xml", "w", force_zip64=True) as entry:
+                entry.write(_SHEET_HEAD.encode("utf-8"))
+                entry.write(_row_xml(1, headers, columns).encode("utf-8"))
+                pending = []
+                pending_size = 0
+                for row_num, values in enumerate(rows, start=2):
+                    if len(values) > len(columns):
+                        columns += [get_column_letter(c) for c in range(len(columns) + 1, len(values) + 1)]
+                    xml = _row_xml(row_num, values, columns)
+                    pending.append(xml)
+                    pending_size += len(xml)
+                    if pending_size >= chunk_size:
+                        entry.write("".join(pending).encode("utf-8"))
+                        pending = []
+                        pending_size = 0
+                        if sink.size >= chunk_size:
+                            yield sink.drain()
+                entry.write(("".join(pending) + _SHEET_TAIL).encode("utf-8"))
+            yield sink.drain()
+    # 중앙 디렉터리
+    yield sink.drain()
+
+
+def iter_saved_workbook(wb, chunk_size=DEFAULT_CHUNK_SIZE, spool_size=1024 * 1024):
+    """
+    openpyxl 워크북을 임시 파일(작으면 메모리)에 저장한 뒤 조각 단위로 내보낸다.
+    템플릿 워크북을 수정해서 내려주는 경우처럼 직접 XML 을 쓸 수 없을 때 사용.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_size)
+    try:
+        wb.save(spool)
+        spool.seek(0)
+        while True:
+            data = spool.read(chunk_size)
+            if not data:
+                break
+            yield data
+    finally:
+        spool.close()
+
+
+def attachment_headers(filename):
+    """다운로드 응답 헤더 (한글 파일명은 RFC 5987 filename* 로 함께 전달)"""
+    ascii_name = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+    ascii_name = ascii_name.replace('"', "").replace("\\", "") or "download"
+    value = f'attachment; filename="{ascii_name}"'
+    if ascii_name != filename:
+        value += f"; filename*=UTF-8''{quote(filename, safe='')}"
+    return {"Content-Disposition": value}
+
@@ -0,0 +1,30 @@
+"""
+시트 범위 단위 읽기
+
+ws.cell(row=..., column=...) 와 get_column_letter() 를 행 × 열 만큼 호출하는 대신
+iter_rows(values_only=True) 로 범위를 한 번에 읽는다 (con_a_source 의 수식 원문 읽기).
+열 이름(A, B, C ...)은 미리 만들어 둔 표를 사용한다 (cursor_excel0113 의 선택 범위/조회 결과).
+쓰기는 openpyxl 워크시트를 거치지 않고 xlsx_stream / xlsx_patch 가 맡는다.
+"""
+from openpyxl.utils import get_column_letter
+
+# A ~ ZZ (702개) 열 이름
+COLUMN_LETTERS = tuple(get_column_letter(i) for i in range(1, 703))
+
+
+def column_labels(count, start=1):
+    """start 열부터 count 개의 열 이름 튜플 (예: column_labels(3, 2) → ('B', 'C', 'D'))"""
+    end = start - 1 + count
+    if end <= len(COLUMN_LETTERS):
+        return COLUMN_LETTERS[start - 1:end]
+    return tuple(get_column_letter(i) for i in range(start, end + 1))
+
+
+def read_range(ws, min_row=1, max_row=None, min_col=1, max_col=None):
+    """
+    시트 범위의 값 행 튜플 목록 (ws.iter_rows(values_only=True) 한 번으로 읽음)
+    max_row/max_col 을 주지 않으면 시트 끝까지
+    """
+    return list(ws.iter_rows(
+        min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col, values_only=True,
+    ))